@@ -0,0 +1,338 @@
+"""
+Optional async read path for the web app (WEB_ASYNC=1, see gunicorn.conf.py).
+
+The hot JSON read endpoints are answered on the event loop with asyncpg
+and a per-worker connection pool, so one worker keeps many queries in
+flight instead of parking a thread on each. They share the same SQL,
+pagination, response cache and dataset version as web_app, so responses
+match the sync path. The /api/events stream is served here too,
+as a coroutine instead of a thread per client. Every other route (pages,
+exports, pipeline jobs, stats, metrics) is passed through to the Flask
+app unchanged.
+
+Requires asyncpg, uvicorn and asgiref:
+
+    gunicorn -c gunicorn.conf.py          # with WEB_ASYNC=1
+"""
+
+import asyncio
+import functools
+import json
+import logging
+import os
+import re
+import time
+from urllib.parse import parse_qsl
+
+import asyncpg
+from asgiref.wsgi import WsgiToAsgi
+from werkzeug.http import http_date, parse_date, parse_etags
+
+from etl.events import format_sse
+from etl.compression import EncodedBody, choose_encoding, compress, is_compressible
+from etl.metrics import observe
+from etl.pagination import PaginationError
+from etl.search import SearchError, build_search, parse_search, shape_results
+from etl.streaming import dumps
+from web_app import (
+    ACTOR_BY_ID_SQL, ACTOR_BY_NAME_SQL, ACTOR_RATINGS_PAGES, FILMS_PAGES, TOP_ACTORS_FIELDS,
+    SSE_KEEPALIVE_SECONDS, SSE_MAX_CLIENTS, SSE_MAX_SECONDS, SSE_RETRY_MS,
+    actor_card, app, dataset_version, event_bus, normalize_actor_name, response_cache, top_actors,
+    version_validators,
+)
+
+logger = logging.getLogger(__name__)
+
+WEB_ASYNC_POOL_MIN = int(os.getenv('WEB_ASYNC_POOL_MIN', '2'))
+WEB_ASYNC_POOL_SIZE = int(os.getenv('WEB_ASYNC_POOL_SIZE', '20'))
+
+flask_app = WsgiToAsgi(app)
+
+_pool = None
+
+
+async def _init_connection(conn):
+    # Decode json columns (the actor filmography) like psycopg2 does
+    await conn.set_type_codec('json', schema='pg_catalog', encoder=json.dumps, decoder=json.loads)
+
+
+async def get_pool():
+    """Create this worker's asyncpg pool on first use (inside its event loop)"""
+    global _pool
+    if _pool is None:
+        from etl.load import DB_HOST, DB_PORT, DB_NAME, DB_USER, DB_PASSWORD
+        _pool = await asyncpg.create_pool(
+            host=DB_HOST, port=int(DB_PORT), database=DB_NAME, user=DB_USER, password=DB_PASSWORD,
+            min_size=WEB_ASYNC_POOL_MIN, max_size=WEB_ASYNC_POOL_SIZE, init=_init_connection,
+        )
+    return _pool
+
+
+_PARAM = re.compile(r'%\((\w+)\)s|%%')
+
+
+@functools.lru_cache(maxsize=256)
+def _positional(sql):
+    """Rewrite psycopg2 %(name)s placeholders as asyncpg $n; returns (sql, names)"""
+    names = []
+
+    def replace(match):
+        name = match.group(1)
+        if name is None:
+            return '%'
+        if name not in names:
+            names.append(name)
+        return f'${names.index(name) + 1}'
+
+    return _PARAM.sub(replace, sql), tuple(names)
+
+
+async def fetch_rows(query, params=None):
+    """Run a (small) query and return its rows as a list of dicts"""
+    sql, names = _positional(query)
+    args = [params[name] for name in names]
+    start = time.perf_counter()
+    async with (await get_pool()).acquire() as conn:
+        records = await conn.fetch(sql, *args)
+    observe('db_query_seconds', time.perf_counter() - start, op='select')
+    return [dict(record) for record in records]
+
+
+# ==================== Handlers ====================
+# Each takes (args, headers, **path params) and returns (status, body, headers)
+
+def _json(body, status=200, headers=None):
+    return status, dumps(body), headers or {}
+
+
+async def _keyset_page(query, args):
+    limit, after, fields = query.parse(args)
+    sql, params = query.build(limit, after, fields)
+    return query.page(await fetch_rows(sql, params), limit, fields)
+
+
+async def get_actor_ratings(args, headers):
+    try:
+        return _json(await _keyset_page(ACTOR_RATINGS_PAGES, args))
+    except PaginationError as e:
+        return _json({'error': str(e)}, 400)
+
+
+async def get_films(args, headers):
+    try:
+        return _json(await _keyset_page(FILMS_PAGES, args))
+    except PaginationError as e:
+        return _json({'error': str(e)}, 400)
+
+
+async def _in_thread(func, *args):
+    # Snapshot reads are in-memory except once per dataset version
+    return await asyncio.get_running_loop().run_in_executor(None, func, *args)
+
+
+async def current_version():
+    """dataset_version.current() off the loop whenever it would read Postgres (listener down)"""
+    if dataset_version.needs_read():
+        return await _in_thread(dataset_version.current)
+    return dataset_version.current()
+
+
+async def get_top_actors(args, headers):
+    rows = await _in_thread(top_actors, 10)
+    return _json([{field: row[field] for field in TOP_ACTORS_FIELDS} for row in rows])
+
+
+async def _actor_detail(sql, params, headers):
+    rows = await fetch_rows(sql, params)
+    if not rows:
+        return _json({'error': 'Actor not found'}, 404)
+    return _actor_document(rows[0], headers)
+
+
+def _actor_document(actor, headers):
+    etag = f"actor-{actor['actor_id']}-{actor['last_updated'].timestamp():.6f}"
+    validators = {'ETag': f'"{etag}"', 'Last-Modified': http_date(actor['last_updated'])}
+    if parse_etags(headers.get('if-none-match')).contains(etag):
+        return 304, b'', validators
+    return _json(actor, headers=validators)
+
+
+async def get_actor_by_id(args, headers, actor_id):
+    card = await _in_thread(actor_card, int(actor_id))
+    if card is not None:
+        return _actor_document(card, headers)
+    return await _actor_detail(ACTOR_BY_ID_SQL, {'actor_id': int(actor_id)}, headers)
+
+
+async def get_actor_detail(args, headers, actor_name):
+    return await _actor_detail(ACTOR_BY_NAME_SQL, {'name': normalize_actor_name(actor_name)}, headers)
+
+
+async def search(args, headers):
+    try:
+        term, types, limit = parse_search(args)
+    except SearchError as e:
+        return _json({'error': str(e)}, 400)
+    sql, params = build_search(term, types, limit)
+    return _json({'query': term, 'items': shape_results(await fetch_rows(sql, params))})
+
+
+# Endpoint names match the Flask views, so both paths share cache entries
+ROUTES = [
+    (re.compile(r'^/api/actor-ratings$'), 'get_actor_ratings', get_actor_ratings),
+    (re.compile(r'^/api/films$'), 'get_films', get_films),
+    (re.compile(r'^/api/top-actors$'), 'get_top_actors', get_top_actors),
+    (re.compile(r'^/api/actor/(?P<actor_id>\d+)$'), 'get_actor_by_id', get_actor_by_id),
+    (re.compile(r'^/api/actor/(?P<actor_name>[^/]+)$'), 'get_actor_detail', get_actor_detail),
+    (re.compile(r'^/api/search$'), 'search', search),
+]
+
+
+def _match(path):
+    for pattern, endpoint, handler in ROUTES:
+        match = pattern.match(path)
+        if match:
+            return endpoint, handler, match.groupdict()
+    return None
+
+
+def _not_modified(headers, etag, weak, last_modified):
+    """True when the client's If-None-Match / If-Modified-Since validators still match"""
+    if_none_match = headers.get('if-none-match')
+    if if_none_match:
+        etags = parse_etags(if_none_match)
+        return etags.contains_weak(etag) if weak else etags.contains(etag)
+    since = parse_date(headers.get('if-modified-since'))
+    return since is not None and last_modified is not None and last_modified.replace(microsecond=0) <= since
+
+
+def _send_cached(entry, headers, cache_status):
+    """Like web_app.send_cached: precompressed variant, validators, 304 when they match"""
+    encoded, mimetype, (etag, weak), last_modified = entry
+    extra = {
+        'ETag': f'W/"{etag}"' if weak else f'"{etag}"',
+        'Last-Modified': http_date(last_modified),
+        'Cache-Control': 'no-cache',
+        'X-Cache': cache_status,
+    }
+    if encoded.variants:
+        extra['Vary'] = 'Accept-Encoding'
+    if _not_modified(headers, etag, weak, last_modified):
+        return 304, b'', mimetype, extra
+    encoding, body = encoded.negotiate(headers.get('accept-encoding'))
+    if encoding:
+        extra['Content-Encoding'] = encoding
+    return 200, body, mimetype, extra
+
+
+async def _handle(scope, endpoint, handler, kwargs):
+    """Run a handler through the response cache, like web_app.cached"""
+    pairs = parse_qsl(scope['query_string'].decode('latin-1'), keep_blank_values=True)
+    args = {}
+    for name, value in pairs:
+        args.setdefault(name, value)
+    headers = {name.decode('latin-1').lower(): value.decode('latin-1') for name, value in scope['headers']}
+    # Same key shape as web_app.cached (path params as the view would receive them)
+    view_kwargs = {name: int(value) if name == 'actor_id' else value for name, value in kwargs.items()}
+    key = (endpoint, tuple(sorted(view_kwargs.items())), tuple(sorted(pairs)))
+
+    version = await current_version()
+    if version is not None:
+        version_tag, version_modified = version_validators(version)
+        if parse_etags(headers.get('if-none-match')).contains_weak(version_tag):
+            return 304, b'', 'application/json', {
+                'ETag': f'W/"{version_tag}"', 'Last-Modified': http_date(version_modified),
+                'Cache-Control': 'no-cache', 'X-Cache': 'HIT'}
+        entry = response_cache.get(key, version)
+        if entry is not None:
+            return _send_cached(entry, headers, 'HIT')
+
+    try:
+        status, body, extra = await handler(args, headers, **kwargs)
+    except Exception as e:
+        logger.error(f"Error: {e}")
+        status, body, extra = _json({'error': str(e)}, 500)
+    if version is not None and status == 200:
+        etag = (extra['ETag'].strip('"'), False) if 'ETag' in extra else (version_tag, True)
+        last_modified = parse_date(extra['Last-Modified']) if 'Last-Modified' in extra else version_modified
+        encoded = EncodedBody(body, 'application/json')
+        entry = (encoded, 'application/json', etag, last_modified)
+        response_cache.set(key, version, entry, encoded.size)
+        return _send_cached(entry, headers, 'MISS')
+    extra['X-Cache'] = 'MISS'
+    if status == 200 and is_compressible('application/json', len(body)):
+        extra['Vary'] = 'Accept-Encoding'
+        encoding = choose_encoding(headers.get('accept-encoding'))
+        if encoding:
+            body = compress(body, encoding)
+            extra['Content-Encoding'] = encoding
+    return status, body, 'application/json', extra
+
+
+async def events_stream(scope, receive, send):
+    """/api/events without a thread per client: the bus hands events to this loop"""
+    headers = {name.decode('latin-1').lower(): value.decode('latin-1') for name, value in scope['headers']}
+    if event_bus.subscriber_count >= SSE_MAX_CLIENTS:
+        status, body, extra = _json({'error': 'Too many live connections, retry later'}, 503)
+        await send({'type': 'http.response.start', 'status': status,
+                    'headers': [(b'content-type', b'application/json')]})
+        await send({'type': 'http.response.body', 'body': body})
+        return
+    # Make sure this worker's listener (which feeds the bus) is running
+    await current_version()
+    loop = asyncio.get_running_loop()
+    subscription = event_bus.subscribe_async(loop, headers.get('last-event-id'))
+
+    async def wait_for_disconnect():
+        while (await receive())['type'] != 'http.disconnect':
+            pass
+
+    disconnected = asyncio.ensure_future(wait_for_disconnect())
+    try:
+        await send({'type': 'http.response.start', 'status': 200, 'headers': [
+            (b'content-type', b'text/event-stream'), (b'cache-control', b'no-cache'), (b'x-accel-buffering', b'no')]})
+        await send({'type': 'http.response.body', 'body': f"retry: {SSE_RETRY_MS}\n\n".encode(), 'more_body': True})
+        deadline = loop.time() + SSE_MAX_SECONDS
+        while loop.time() < deadline and not disconnected.done():
+            event = await subscription.get(timeout=SSE_KEEPALIVE_SECONDS)
+            chunk = format_sse(event) if event else ": keepalive\n\n"
+            await send({'type': 'http.response.body', 'body': chunk.encode('utf-8'), 'more_body': True})
+        if not disconnected.done():
+            await send({'type': 'http.response.body', 'body': b''})
+    finally:
+        disconnected.cancel()
+        subscription.close()
+
+
+async def _lifespan(receive, send):
+    global _pool
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            if _pool is not None:
+                await _pool.close()
+                _pool = None
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def application(scope, receive, send):
+    """ASGI entry point: async JSON reads, everything else via the Flask app"""
+    if scope['type'] == 'lifespan':
+        return await _lifespan(receive, send)
+    if scope['type'] == 'http' and scope['path'] == '/api/events':
+        return await events_stream(scope, receive, send)
+    route = _match(scope['path']) if scope['type'] == 'http' and scope['method'] in ('GET', 'HEAD') else None
+    if route is None:
+        return await flask_app(scope, receive, send)
+
+    endpoint, handler, kwargs = route
+    start = time.perf_counter()
+    status, body, mimetype, extra = await _handle(scope, endpoint, handler, kwargs)
+    headers = [(b'content-type', mimetype.encode()), (b'content-length', str(len(body)).encode())]
+    headers += [(name.lower().encode(), value.encode()) for name, value in extra.items()]
+    await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+    await send({'type': 'http.response.body', 'body': b'' if scope['method'] == 'HEAD' else body})
+    observe('web_request_seconds', time.perf_counter() - start, endpoint=endpoint, status=status)
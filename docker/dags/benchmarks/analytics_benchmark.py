@@ -0,0 +1,95 @@
+#!/usr/bin/env python
+"""
+Time etl.analytics recomputes on a synthetic catalog of millions of links.
+
+Builds a RatingMatrix in memory (no database needed) with --films films,
+--actors actors and --links actor-film links (a few prolific actors, a
+long tail of one-film actors), then reports the median time of each
+aggregate over --repeat runs:
+
+    full:      every film (what calculate_actor_ratings stores)
+    masked:    only films from 2000 on, minus 100 excluded films
+    weighted:  recency-weighted mean (10 year half-life)
+    shrunk:    mean shrunk towards the catalog mean (5 pseudo-films)
+
+Usage:
+    python benchmarks/analytics_benchmark.py [--links N ...] [--repeat N] [--json PATH]
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+# Add the dags directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from etl.analytics import RatingMatrix
+
+
+def build(links, seed=42):
+    """Synthetic matrix with links / 10 films and links / 4 actors"""
+    rng = np.random.default_rng(seed)
+    films = max(links // 10, 1)
+    actors = max(links // 4, 1)
+    ratings = np.round(rng.uniform(1, 10, films), 1)
+    ratings[rng.random(films) < 0.05] = np.nan
+    years = rng.integers(1950, 2025, films).astype(np.float64)
+    # Zipf-like actor popularity: a few prolific actors, a long tail
+    link_actors = np.minimum(rng.zipf(1.3, links), actors)
+    link_films = rng.integers(0, films, links)
+    return RatingMatrix.from_links(link_actors, link_films, np.arange(films), ratings, years)
+
+
+def median_ms(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark in-memory actor rating aggregates')
+    parser.add_argument('--links', type=int, nargs='+', default=[1000000, 5000000], help='actor-film links')
+    parser.add_argument('--repeat', type=int, default=5, help='runs per aggregate (median reported)')
+    parser.add_argument('--json', help='write results to this file')
+    args = parser.parse_args()
+
+    results = []
+    for links in args.links:
+        print("=" * 60)
+        print(f"ANALYTICS BENCHMARK ({links} links)")
+        print("=" * 60)
+        start = time.perf_counter()
+        matrix = build(links)
+        build_ms = (time.perf_counter() - start) * 1000
+        print(f"Built {matrix.n_actors} actors × {matrix.n_films} films ({matrix.n_links} links) in {build_ms:.0f}ms\n")
+
+        excluded = matrix.film_ids[:100]
+        variants = {
+            'full': lambda: matrix.aggregate(),
+            'masked': lambda: matrix.aggregate(mask=matrix.film_mask(min_year=2000, exclude=excluded)),
+            'weighted': lambda: matrix.aggregate(weights=matrix.recency_weights(10)),
+            'shrunk': lambda: matrix.aggregate(shrinkage=5),
+        }
+        print(f"{'aggregate':<10} | {'median ms':>10}")
+        for name, func in variants.items():
+            elapsed = median_ms(func, args.repeat)
+            results.append({'links': matrix.n_links, 'actors': matrix.n_actors, 'films': matrix.n_films,
+                            'aggregate': name, 'median_ms': round(elapsed, 2), 'build_ms': round(build_ms, 1)})
+            print(f"{name:<10} | {elapsed:>10.2f}")
+        print()
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'repeat': args.repeat, 'results': results}, f, indent=2)
+        print(f"Results written to {args.json}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python
+"""
+Time the co-star graph (etl.costars) on a synthetic catalog.
+
+Generates --films films with --cast actors each, drawn from --actors actors
+(a few Zipf-popular actors plus a uniform long tail), then reports:
+
+    build:         edge list and CSR arrays from every cast
+    incremental:   re-casting --changed films, merged as removed/added pairs
+    collaborators: top 10 co-stars of random actors (p50/p95/p99)
+    path:          bidirectional BFS between random actors (p50/p95/p99)
+
+No database needed.
+
+Usage:
+    python benchmarks/costar_benchmark.py [--films N] [--actors N] [--cast N] [--changed N] [--queries N] [--json PATH]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+# Add the dags directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from etl.costars import CostarGraph, cast_pairs, edge_keys, merge_edges
+
+
+def random_casts(films, actors, cast, rng):
+    """(film_ids, actor_ids) link arrays grouped by film, without repeated actors per film"""
+    film_ids = np.repeat(np.arange(1, films + 1), cast)
+    # 30% of roles go to Zipf-popular actors, the rest uniformly to the long tail
+    popular = rng.random(films * cast) < 0.3
+    actor_ids = np.where(popular, np.minimum(rng.zipf(1.5, films * cast), actors),
+                         rng.integers(1, actors + 1, films * cast))
+    keys = np.unique(film_ids.astype(np.int64) * (actors + 1) + actor_ids)
+    return keys // (actors + 1), keys % (actors + 1)
+
+
+def percentile(sorted_values, pct):
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def timings(func, arguments):
+    values = []
+    for args in arguments:
+        start = time.perf_counter()
+        func(*args)
+        values.append((time.perf_counter() - start) * 1000)
+    values.sort()
+    return {f'p{pct}_ms': round(percentile(values, pct), 3) for pct in (50, 95, 99)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the co-star graph')
+    parser.add_argument('--films', type=int, default=200000, help='synthetic films')
+    parser.add_argument('--actors', type=int, default=500000, help='synthetic actors')
+    parser.add_argument('--cast', type=int, default=10, help='actors per film')
+    parser.add_argument('--changed', type=int, default=1000, help='films re-cast for the incremental update')
+    parser.add_argument('--queries', type=int, default=500, help='queries per kind')
+    parser.add_argument('--json', help='write results to this file')
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    film_ids, actor_ids = random_casts(args.films, args.actors, args.cast, rng)
+
+    print("=" * 60)
+    print(f"CO-STAR GRAPH BENCHMARK ({args.films} films, {len(film_ids)} links)")
+    print("=" * 60)
+
+    start = time.perf_counter()
+    sources, targets = cast_pairs(film_ids, actor_ids)
+    no_edges = np.array([], dtype=np.int64)
+    keys, weights = merge_edges(no_edges, no_edges, edge_keys(sources, targets))
+    graph = CostarGraph(keys, weights)
+    build_ms = (time.perf_counter() - start) * 1000
+    print(f"Build:         {build_ms:.0f}ms ({graph.n_actors} actors, {graph.n_edges} edges)")
+
+    # Re-cast the first --changed films: old pairs out, new pairs in
+    changed = film_ids <= args.changed
+    new_films, new_actors = random_casts(args.changed, args.actors, args.cast, rng)
+    start = time.perf_counter()
+    old_sources, old_targets = cast_pairs(film_ids[changed], actor_ids[changed])
+    new_sources, new_targets = cast_pairs(new_films, new_actors)
+    keys, weights = merge_edges(keys, weights, edge_keys(new_sources, new_targets), edge_keys(old_sources, old_targets))
+    graph = CostarGraph(keys, weights)
+    incremental_ms = (time.perf_counter() - start) * 1000
+    print(f"Incremental:   {incremental_ms:.0f}ms ({args.changed} films re-cast)")
+
+    picks = graph.actor_ids[rng.integers(0, graph.n_actors, (args.queries, 2))]
+    collaborators = timings(graph.collaborators, [(int(a), 10) for a, _ in picks])
+    paths = timings(graph.shortest_path, [(int(a), int(b)) for a, b in picks])
+    for name, result in (('collaborators', collaborators), ('path', paths)):
+        print(f"{name + ':':<14} p50 {result['p50_ms']}ms | p95 {result['p95_ms']}ms | p99 {result['p99_ms']}ms")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'films': args.films, 'links': len(film_ids), 'actors': graph.n_actors, 'edges': graph.n_edges,
+                       'build_ms': round(build_ms, 1), 'incremental_ms': round(incremental_ms, 1),
+                       'collaborators': collaborators, 'path': paths}, f, indent=2)
+        print(f"\nResults written to {args.json}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,171 @@
+#!/usr/bin/env python
+"""
+Import-time and DAG parse-time report for the scheduler and the web app.
+
+Runs each target module in a fresh interpreter under `python -X importtime`,
+then prints the total import time and the heaviest imports (cumulative
+microseconds, same columns as the importtime output). For the DAG file it
+also measures a full parse through Airflow's DagBag when Airflow is
+installed, which is what the scheduler pays on every re-parse.
+
+Usage:
+    python benchmarks/import_time.py [--top N] [--budget-ms MS] [--json PATH] [module ...]
+
+Exits non-zero when a target exceeds --budget-ms.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+DAGS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_TARGETS = ['trending_movies_dag', 'web_app']
+
+_DAGBAG_SNIPPET = '''
+import json, time
+from airflow.models import DagBag
+start = time.perf_counter()
+bag = DagBag(dag_folder={path!r}, include_examples=False)
+elapsed = time.perf_counter() - start
+print(json.dumps({{"parse_ms": round(elapsed * 1000, 1), "dags": len(bag.dags), "errors": list(bag.import_errors.values())}}))
+'''
+
+
+def _env():
+    env = dict(os.environ)
+    env['PYTHONPATH'] = DAGS_DIR + os.pathsep + env.get('PYTHONPATH', '')
+    return env
+
+
+def parse_importtime(stderr):
+    """Return [(self_us, cumulative_us, depth, module)] from -X importtime output"""
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        try:
+            self_us, cumulative_us, name = line[len('import time:'):].split('|', 2)
+        except ValueError:
+            continue
+        depth = (len(name) - len(name.lstrip(' ')) - 1) // 2
+        entries.append((int(self_us), int(cumulative_us), depth, name.strip()))
+    return entries
+
+
+def _subtree(entries, target_index):
+    """
+    Entries imported on behalf of the target.
+
+    importtime prints children before their parent, so the target's subtree
+    is the contiguous run of deeper entries just above it. Without a target
+    (failed import) every entry is returned.
+    """
+    if target_index is None:
+        return entries
+    target_depth = entries[target_index][2]
+    start = target_index
+    while start > 0 and entries[start - 1][2] > target_depth:
+        start -= 1
+    return [e for e in entries[start:target_index] if e[2] == target_depth + 1]
+
+
+def measure_import(module):
+    """Import `module` in a fresh interpreter and return its import-time profile"""
+    start = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=DAGS_DIR, env=_env(), capture_output=True, text=True,
+    )
+    wall_ms = (time.perf_counter() - start) * 1000
+    entries = parse_importtime(proc.stderr)
+    target_index = next((i for i in range(len(entries) - 1, -1, -1) if entries[i][3] == module), None)
+    target = entries[target_index] if target_index is not None else None
+    errors = [line for line in proc.stderr.splitlines() if not line.startswith('import time:')]
+    return {
+        'module': module,
+        'ok': proc.returncode == 0,
+        'error': errors[-1] if proc.returncode != 0 and errors else None,
+        'import_ms': round(target[1] / 1000, 1) if target else None,
+        'wall_ms': round(wall_ms, 1),
+        'entries': _subtree(entries, target_index),
+    }
+
+
+def measure_dag_parse(module):
+    """Parse the DAG file through Airflow's DagBag; None when Airflow is missing"""
+    path = os.path.join(DAGS_DIR, f'{module}.py')
+    proc = subprocess.run(
+        [sys.executable, '-c', _DAGBAG_SNIPPET.format(path=path)],
+        cwd=DAGS_DIR, env=_env(), capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        return None
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def heaviest(entries, top):
+    """Direct imports of the target ordered by cumulative time"""
+    return sorted(entries, key=lambda e: e[1], reverse=True)[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('modules', nargs='*', default=DEFAULT_TARGETS)
+    parser.add_argument('--top', type=int, default=10, help='number of heaviest imports to list')
+    parser.add_argument('--budget-ms', type=float, help='fail when import (or DAG parse) time exceeds this')
+    parser.add_argument('--json', help='write results to this file')
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("IMPORT-TIME REPORT")
+    print("=" * 60)
+
+    results = []
+    over_budget = False
+    for module in args.modules:
+        result = measure_import(module)
+        if module.endswith('_dag'):
+            result['dag_parse'] = measure_dag_parse(module)
+
+        print("\n[{}]".format(module))
+        if not result['ok']:
+            print("  - Import failed: {}".format(result['error']))
+        print("  - Import time: {} ms (interpreter wall {} ms)".format(result['import_ms'], result['wall_ms']))
+        if result.get('dag_parse'):
+            print("  - DagBag parse: {parse_ms} ms, {dags} DAG(s), {errors} error(s)".format(
+                parse_ms=result['dag_parse']['parse_ms'],
+                dags=result['dag_parse']['dags'],
+                errors=len(result['dag_parse']['errors']),
+            ))
+        elif module.endswith('_dag'):
+            print("  - DagBag parse: skipped (Airflow not installed)")
+
+        print("  {:>12} | {:>12} | {}".format('self [us]', 'cumul [us]', 'imported package'))
+        for self_us, cumulative_us, _, name in heaviest(result['entries'], args.top):
+            print("  {:>12} | {:>12} | {}".format(self_us, cumulative_us, name))
+
+        measured = (result.get('dag_parse') or {}).get('parse_ms') or result['import_ms']
+        if args.budget_ms is not None and measured is not None and measured > args.budget_ms:
+            print("  ✗ Over budget: {} ms > {} ms".format(measured, args.budget_ms))
+            over_budget = True
+
+        result['heaviest'] = [
+            {'module': name, 'self_us': self_us, 'cumulative_us': cumulative_us}
+            for self_us, cumulative_us, _, name in heaviest(result['entries'], args.top)
+        ]
+        del result['entries']
+        results.append(result)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+        print("\nResults written to {}".format(args.json))
+
+    sys.exit(1 if over_budget else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,356 @@
+#!/usr/bin/env python
+"""
+Load-test the web app's read endpoints at several catalog sizes.
+
+For each --sizes value (number of films) it:
+
+    1. resets a dedicated database (LOAD_TEST_DB_NAME, default
+       imdb_reddit_loadtest, created when missing) with init.sql, so the
+       real data is untouched
+    2. seeds a synthetic catalog server-side with generate_series: the
+       films, ACTORS_PER_FILM x as many actors and --cast links per film
+    3. runs the real ratings step (calculate_actor_ratings, including its
+       dataset version bump and leaderboard snapshot)
+    4. starts gunicorn (gunicorn.conf.py) against that database
+    5. drives every route at each --concurrency level for --duration
+       seconds from keep-alive client threads
+
+and reports p50/p95/p99 latency, requests/sec and error rate per route.
+Responses include the app's response cache, as in production. Results
+are written as JSON (by default to docker/data/load_tests/, named by
+commit) so runs can be compared; --baseline prints the change against an
+earlier results file.
+
+--url skips steps 1-4 and drives a server that is already running (the
+catalog size is then reported as 0). Needs the DB_* settings of etl.load.
+
+Usage:
+    python benchmarks/load_test.py [--sizes N ...] [--concurrency N ...] [--duration S]
+                                   [--routes NAME ...] [--url URL] [--json PATH] [--baseline PATH]
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+import urllib.parse
+from datetime import datetime, timezone
+
+DAGS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, DAGS_DIR)
+
+INIT_SQL = os.path.join(os.path.dirname(DAGS_DIR), 'init.sql')
+RESULTS_DIR = os.path.join(os.path.dirname(DAGS_DIR), 'data', 'load_tests')
+LOAD_TEST_DB_NAME = os.getenv('LOAD_TEST_DB_NAME', 'imdb_reddit_loadtest')
+
+ACTORS_PER_FILM = 2
+PAGE_LIMITS = (20, 50, 100)
+SAMPLE_NAMES = 500
+SERVER_START_TIMEOUT = 60
+
+SEED_SQL = '''
+    INSERT INTO films (imdb_id, title, rating, year)
+        SELECT 'tt' || lpad(i::text, 8, '0'), 'Film ' || i,
+               round((random() * 9 + 1)::numeric, 1), 1950 + i %% 75
+        FROM generate_series(1, %(films)s) AS i;
+    INSERT INTO actors (name)
+        SELECT 'Actor ' || i FROM generate_series(1, %(actors)s) AS i;
+    INSERT INTO actor_film (actor_id, film_id)
+        SELECT DISTINCT 1 + (f.film_id * 7919 + k * 104729) %% %(actors)s, f.film_id
+        FROM films f, generate_series(0, %(cast)s - 1) AS k
+    ON CONFLICT DO NOTHING;
+    ANALYZE films;
+    ANALYZE actors;
+    ANALYZE actor_film;
+'''
+
+# name -> callable(rng, actor_names) returning the request path
+ROUTES = {
+    'index': lambda rng, names: '/',
+    'actor_ratings': lambda rng, names: f"/api/actor-ratings?limit={rng.choice(PAGE_LIMITS)}",
+    'top_actors': lambda rng, names: '/api/top-actors',
+    'films': lambda rng, names: f"/api/films?limit={rng.choice(PAGE_LIMITS)}",
+    'actor': lambda rng, names: f"/api/actor/{urllib.parse.quote(rng.choice(names), safe='')}",
+    'stats': lambda rng, names: '/api/stats',
+}
+
+
+def percentile(sorted_values, pct):
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=DAGS_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+# ==================== SEEDING ====================
+
+def ensure_database():
+    """Create LOAD_TEST_DB_NAME when it does not exist yet"""
+    import psycopg2
+    from etl import load
+
+    conn = psycopg2.connect(host=load.DB_HOST, port=load.DB_PORT, database='postgres',
+                            user=load.DB_USER, password=load.DB_PASSWORD)
+    conn.autocommit = True
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT 1 FROM pg_database WHERE datname = %s", (LOAD_TEST_DB_NAME,))
+            if cursor.fetchone() is None:
+                cursor.execute(f'CREATE DATABASE "{LOAD_TEST_DB_NAME}"')
+                print(f"Created database {LOAD_TEST_DB_NAME}")
+    finally:
+        conn.close()
+
+
+def seed_catalog(films, cast):
+    """Reset the schema, seed `films` films and compute ratings; returns a sample of actor names"""
+    from etl.calculate_actor_ratings import calculate_actor_ratings
+    from etl.load import get_db_connection
+
+    with open(INIT_SQL, encoding='utf-8-sig') as f:
+        schema = f.read()
+
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(schema)
+            cursor.execute(SEED_SQL, {'films': films, 'actors': films * ACTORS_PER_FILM, 'cast': cast})
+        conn.commit()
+    finally:
+        conn.close()
+
+    calculate_actor_ratings()
+
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT actor_name FROM actor_ratings ORDER BY random() LIMIT %s", (SAMPLE_NAMES,))
+            return [row[0] for row in cursor.fetchall()]
+    finally:
+        conn.close()
+
+
+# ==================== SERVER ====================
+
+def start_server(port, workers, use_async):
+    env = dict(os.environ, PORT=str(port), DB_NAME=LOAD_TEST_DB_NAME, WEB_WORKERS=str(workers),
+               WEB_ASYNC='1' if use_async else '0')
+    process = subprocess.Popen([sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py'], cwd=DAGS_DIR, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + SERVER_START_TIMEOUT
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"gunicorn exited with code {process.returncode}")
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=2)
+            conn.request('GET', '/api/stats')
+            if conn.getresponse().status == 200:
+                conn.close()
+                return process
+        except OSError:
+            pass
+        time.sleep(0.5)
+    stop_server(process)
+    raise RuntimeError(f"gunicorn did not answer on port {port} within {SERVER_START_TIMEOUT}s")
+
+
+def stop_server(process):
+    process.terminate()
+    try:
+        process.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+
+# ==================== DRIVER ====================
+
+def client(host, port, make_path, seed, deadline, timeout, samples):
+    """Send requests over one keep-alive connection until deadline; appends (seconds, ok) to samples"""
+    rng = random.Random(seed)
+    headers = {'Accept-Encoding': 'gzip'}
+    conn = http.client.HTTPConnection(host, port, timeout=timeout)
+    while time.monotonic() < deadline:
+        start = time.perf_counter()
+        try:
+            conn.request('GET', make_path(rng), headers=headers)
+            response = conn.getresponse()
+            response.read()
+            ok = response.status < 400
+        except (OSError, http.client.HTTPException):
+            ok = False
+            conn.close()
+            conn = http.client.HTTPConnection(host, port, timeout=timeout)
+        samples.append((time.perf_counter() - start, ok))
+    conn.close()
+
+
+def drive(url, route, names, concurrency, duration, timeout):
+    """Run one route at one concurrency level and summarize it"""
+    parsed = urllib.parse.urlsplit(url)
+    make_path = ROUTES[route]
+    samples = []
+    deadline = time.monotonic() + duration
+    threads = [
+        threading.Thread(target=client, args=(parsed.hostname, parsed.port or 80,
+                                              lambda rng: make_path(rng, names), i, deadline, timeout, samples))
+        for i in range(concurrency)
+    ]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    latencies = sorted(seconds * 1000 for seconds, _ in samples)
+    errors = sum(1 for _, ok in samples if not ok)
+    result = {'route': route, 'concurrency': concurrency, 'requests': len(samples), 'errors': errors,
+              'error_rate': round(errors / len(samples), 4) if samples else 0.0,
+              'rps': round(len(samples) / elapsed, 1)}
+    for pct in (50, 95, 99):
+        result[f'p{pct}_ms'] = round(percentile(latencies, pct), 2) if latencies else None
+    result['max_ms'] = round(latencies[-1], 2) if latencies else None
+    return result
+
+
+def warm_up(url, names, routes, timeout):
+    """One request per route (and per sampled actor name) so measurements do not start on cold caches"""
+    parsed = urllib.parse.urlsplit(url)
+    conn = http.client.HTTPConnection(parsed.hostname, parsed.port or 80, timeout=timeout)
+    for route in routes:
+        rng = random.Random(0)
+        for _ in range(len(names) if route == 'actor' else 1):
+            try:
+                conn.request('GET', ROUTES[route](rng, names))
+                conn.getresponse().read()
+            except (OSError, http.client.HTTPException):
+                conn.close()
+                conn = http.client.HTTPConnection(parsed.hostname, parsed.port or 80, timeout=timeout)
+    conn.close()
+
+
+def sample_names(url, timeout):
+    """Actor names from the server's first /api/actor-ratings page (for --url runs)"""
+    parsed = urllib.parse.urlsplit(url)
+    conn = http.client.HTTPConnection(parsed.hostname, parsed.port or 80, timeout=timeout)
+    try:
+        conn.request('GET', f"/api/actor-ratings?limit={SAMPLE_NAMES}&fields=actor_name")
+        items = json.loads(conn.getresponse().read())['items']
+    finally:
+        conn.close()
+    return [item['actor_name'] for item in items] or ['Actor 1']
+
+
+def print_results(size, results):
+    print(f"\n{'route':<14} | {'conc':>4} | {'requests':>8} | {'rps':>8} | {'p50 ms':>7} | {'p95 ms':>7} | {'p99 ms':>7} | {'errors':>6}")
+    print("-" * 84)
+    for r in results:
+        print(f"{r['route']:<14} | {r['concurrency']:>4} | {r['requests']:>8} | {r['rps']:>8} | "
+              f"{r['p50_ms']:>7} | {r['p95_ms']:>7} | {r['p99_ms']:>7} | {r['error_rate']:>6.1%}")
+
+
+def load_baseline(path):
+    with open(path) as f:
+        return {(r['size'], r['route'], r['concurrency']): r for r in json.load(f)['results']}
+
+
+def compare(results, baseline, baseline_path):
+    """Print rps and p95 change for every (size, route, concurrency) also present in the baseline"""
+    print("\n" + "=" * 60)
+    print(f"CHANGE AGAINST {baseline_path}")
+    print("=" * 60)
+    print(f"{'size':>8} | {'route':<14} | {'conc':>4} | {'rps':>8} | {'p95':>8}")
+    for r in results:
+        old = baseline.get((r['size'], r['route'], r['concurrency']))
+        if old is None or not old['rps'] or not old['p95_ms'] or r['p95_ms'] is None:
+            continue
+        rps_change = (r['rps'] - old['rps']) / old['rps']
+        p95_change = (r['p95_ms'] - old['p95_ms']) / old['p95_ms']
+        print(f"{r['size']:>8} | {r['route']:<14} | {r['concurrency']:>4} | {rps_change:>+8.1%} | {p95_change:>+8.1%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load-test the web app read endpoints')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000], help='catalog sizes (films)')
+    parser.add_argument('--cast', type=int, default=8, help='actors linked to each film')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 8, 32], help='concurrent clients')
+    parser.add_argument('--duration', type=float, default=10, help='seconds per route and concurrency level')
+    parser.add_argument('--routes', nargs='+', choices=list(ROUTES), default=list(ROUTES))
+    parser.add_argument('--timeout', type=float, default=10, help='per-request timeout in seconds')
+    parser.add_argument('--port', type=int, default=5055, help='port for the gunicorn started by this script')
+    parser.add_argument('--workers', type=int, default=4, help='gunicorn workers (WEB_WORKERS)')
+    parser.add_argument('--async', dest='use_async', action='store_true', help='serve with WEB_ASYNC=1')
+    parser.add_argument('--url', help='drive an already running server instead of seeding and starting one')
+    parser.add_argument('--json', help=f'write results to this file (default: {RESULTS_DIR}/<commit>-<time>.json)')
+    parser.add_argument('--baseline', help='earlier results file to compare against')
+    args = parser.parse_args()
+
+    # Read first: --json may overwrite the same file
+    baseline = load_baseline(args.baseline) if args.baseline else None
+
+    if args.url is None:
+        # Before etl.load is imported: every connection it opens goes to the load-test database
+        os.environ['DB_NAME'] = LOAD_TEST_DB_NAME
+        ensure_database()
+
+    results = []
+    for size in ([0] if args.url else args.sizes):
+        print("=" * 60)
+        print(f"LOAD TEST ({size} films)" if size else f"LOAD TEST ({args.url})")
+        print("=" * 60)
+        server = None
+        if args.url:
+            url = args.url
+            names = sample_names(url, args.timeout)
+        else:
+            start = time.perf_counter()
+            names = seed_catalog(size, args.cast)
+            print(f"Seeded {size} films, {size * ACTORS_PER_FILM} actors and rated them in "
+                  f"{time.perf_counter() - start:.1f}s")
+            server = start_server(args.port, args.workers, args.use_async)
+            url = f"http://127.0.0.1:{args.port}"
+        try:
+            warm_up(url, names, args.routes, args.timeout)
+            size_results = []
+            for route in args.routes:
+                for concurrency in args.concurrency:
+                    result = dict(size=size, **drive(url, route, names, concurrency, args.duration, args.timeout))
+                    size_results.append(result)
+            print_results(size, size_results)
+            results.extend(size_results)
+        finally:
+            if server is not None:
+                stop_server(server)
+
+    generated_at = datetime.now(timezone.utc)
+    commit = git_commit()
+    if args.json is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        args.json = os.path.join(RESULTS_DIR, f"{commit or 'unknown'}-{generated_at:%Y%m%dT%H%M%S}.json")
+    with open(args.json, 'w') as f:
+        json.dump({
+            'generated_at': generated_at.isoformat(),
+            'commit': commit,
+            'settings': {'sizes': args.sizes if args.url is None else [0], 'cast': args.cast,
+                         'concurrency': args.concurrency, 'duration': args.duration,
+                         'workers': args.workers, 'async': args.use_async, 'url': args.url},
+            'results': results,
+        }, f, indent=2)
+    print(f"\nResults written to {args.json}")
+
+    if baseline is not None:
+        compare(results, baseline, args.baseline)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,130 @@
+#!/usr/bin/env python
+"""
+Measure /api/search query latency at catalog scale.
+
+Seeds --actors synthetic actor names and --films titles into TEMP tables
+named like the real ones (temp tables shadow them for this session only,
+so the real data is untouched). The temp tables get the same trigram GIN
+indexes as init.sql. Then it runs a mix of prefix, substring and misspelled
+queries through etl.search and reports p50/p95/p99 latency per kind.
+Needs the pg_trgm extension (created by init.sql) and the DB_* settings
+of etl.load.
+
+Usage:
+    python benchmarks/search_benchmark.py [--actors N] [--films N] [--queries N] [--json PATH]
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+# Add the dags directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from etl.search import SEARCH_TYPES, build_search
+
+FIRST = ['Tom', 'Emma', 'Leonardo', 'Scarlett', 'Denzel', 'Meryl', 'Cillian', 'Florence', 'Keanu', 'Zendaya',
+         'Morgan', 'Natalie', 'Joaquin', 'Viola', 'Christian', 'Saoirse', 'Idris', 'Margot', 'Oscar', 'Tilda']
+LAST = ['Hardy', 'Stone', 'Washington', 'Streep', 'Murphy', 'Pugh', 'Reeves', 'Freeman', 'Portman', 'Phoenix',
+        'Davis', 'Bale', 'Ronan', 'Elba', 'Robbie', 'Isaac', 'Swinton', 'Johansson', 'Kaluuya', 'Blanchett']
+WORDS = ['Dark', 'Night', 'Last', 'Lost', 'Silent', 'Iron', 'Golden', 'Winter', 'Shadow', 'River',
+         'Empire', 'Dream', 'Storm', 'Star', 'City', 'Garden', 'Code', 'Echo', 'Signal', 'Harbor']
+
+SEED_SQL = '''
+    CREATE TEMP TABLE actors (actor_id INT PRIMARY KEY, name TEXT NOT NULL);
+    CREATE TEMP TABLE actor_ratings (actor_id INT PRIMARY KEY, average_rating FLOAT, total_films INT);
+    CREATE TEMP TABLE films (film_id INT PRIMARY KEY, title TEXT NOT NULL, rating FLOAT, year INT);
+    INSERT INTO actors
+        SELECT i, (%(first)s::text[])[1 + i %% 20] || ' ' || (%(last)s::text[])[1 + (i / 20) %% 20] || ' ' || i
+        FROM generate_series(1, %(actors)s) AS i;
+    INSERT INTO actor_ratings SELECT actor_id, round((random() * 9 + 1)::numeric, 2), 1 + actor_id %% 30 FROM actors;
+    INSERT INTO films
+        SELECT i, 'The ' || (%(words)s::text[])[1 + i %% 20] || ' ' || (%(words)s::text[])[1 + (i / 20) %% 20] || ' ' || i,
+               round((random() * 9 + 1)::numeric, 1), 1950 + i %% 75
+        FROM generate_series(1, %(films)s) AS i;
+    CREATE INDEX ON actors USING GIN (lower(name) gin_trgm_ops);
+    CREATE INDEX ON films USING GIN (lower(title) gin_trgm_ops);
+    ANALYZE actors;
+    ANALYZE actor_ratings;
+    ANALYZE films;
+'''
+
+
+def misspell(word, rng):
+    """Swap two neighbouring letters, as a typing slip would"""
+    if len(word) < 4:
+        return word
+    i = rng.randrange(1, len(word) - 2)
+    return word[:i] + word[i + 1] + word[i] + word[i + 2:]
+
+
+def make_queries(count, rng):
+    """(kind, term) pairs: prefixes, substrings and misspelled full names"""
+    queries = []
+    for _ in range(count):
+        first, last, word = rng.choice(FIRST), rng.choice(LAST), rng.choice(WORDS)
+        queries.append(('prefix', f"{first} {last[:3]}".lower()))
+        queries.append(('substring', f"{word} {rng.choice(WORDS)}".lower()))
+        queries.append(('typo', f"{misspell(first, rng)} {misspell(last, rng)}".lower()))
+    return queries
+
+
+def percentile(sorted_values, pct):
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark /api/search queries')
+    parser.add_argument('--actors', type=int, default=300000, help='synthetic actor names')
+    parser.add_argument('--films', type=int, default=100000, help='synthetic film titles')
+    parser.add_argument('--queries', type=int, default=200, help='queries per kind')
+    parser.add_argument('--limit', type=int, default=10, help='results per query')
+    parser.add_argument('--json', help='write results to this file')
+    args = parser.parse_args()
+
+    from etl.load import get_db_connection
+    conn = get_db_connection()
+    cursor = conn.cursor()
+
+    print("=" * 60)
+    print(f"SEARCH BENCHMARK ({args.actors} actors, {args.films} films)")
+    print("=" * 60)
+    start = time.perf_counter()
+    cursor.execute(SEED_SQL, {'first': FIRST, 'last': LAST, 'words': WORDS,
+                              'actors': args.actors, 'films': args.films})
+    print(f"Seeded and indexed in {time.perf_counter() - start:.1f}s\n")
+
+    rng = random.Random(42)
+    timings = {}
+    for kind, term in make_queries(args.queries, rng):
+        sql, params = build_search(term, list(SEARCH_TYPES), args.limit)
+        start = time.perf_counter()
+        cursor.execute(sql, params)
+        cursor.fetchall()
+        timings.setdefault(kind, []).append((time.perf_counter() - start) * 1000)
+
+    results = []
+    print(f"{'kind':<10} | {'queries':>7} | {'p50 ms':>7} | {'p95 ms':>7} | {'p99 ms':>7}")
+    for kind, values in timings.items():
+        values.sort()
+        result = {'kind': kind, 'queries': len(values),
+                  'p50_ms': round(percentile(values, 50), 2),
+                  'p95_ms': round(percentile(values, 95), 2),
+                  'p99_ms': round(percentile(values, 99), 2)}
+        results.append(result)
+        print(f"{kind:<10} | {result['queries']:>7} | {result['p50_ms']:>7} | {result['p95_ms']:>7} | {result['p99_ms']:>7}")
+
+    conn.rollback()
+    conn.close()
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'actors': args.actors, 'films': args.films, 'results': results}, f, indent=2)
+        print(f"\nResults written to {args.json}")
+
+
+if __name__ == '__main__':
+    main()
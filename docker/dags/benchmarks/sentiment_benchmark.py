@@ -0,0 +1,116 @@
+#!/usr/bin/env python
+"""
+Benchmark sentiment backends on the bundled labeled sample.
+
+For every registered backend reports throughput (comments/sec), peak Python
+memory while scoring, accuracy against the labels and agreement with the
+baseline backend (TextBlob when installed).
+
+Usage:
+    python benchmarks/sentiment_benchmark.py [--repeat N] [--baseline NAME] [--json PATH]
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+# Add the dags directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from etl.sentiment_backends import available_backends, get_backend
+
+SAMPLE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'sentiment_labeled.csv')
+
+# Polarity band treated as neutral when turning scores into labels
+NEUTRAL_BAND = 0.05
+
+
+def load_sample(path=SAMPLE_PATH):
+    """Return (texts, labels) from the labeled CSV"""
+    with open(path, newline='', encoding='utf-8') as f:
+        rows = list(csv.DictReader(f))
+    return [row['text'] for row in rows], [row['label'] for row in rows]
+
+
+def to_label(polarity):
+    if polarity > NEUTRAL_BAND:
+        return 'positive'
+    if polarity < -NEUTRAL_BAND:
+        return 'negative'
+    return 'neutral'
+
+
+def benchmark_backend(name, texts, repeat):
+    """Score the sample `repeat` times; return labels plus throughput and memory figures"""
+    backend = get_backend(name)
+    corpus = texts * repeat
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    backend.score_batch(corpus)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    predictions = [to_label(p) for p in backend.score_batch(texts)]
+    return {
+        'backend': name,
+        'comments': len(corpus),
+        'seconds': round(elapsed, 4),
+        'comments_per_sec': round(len(corpus) / elapsed, 1) if elapsed else None,
+        'peak_memory_kb': round(peak / 1024, 1),
+        'predictions': predictions,
+    }
+
+
+def agreement(a, b):
+    return round(sum(x == y for x, y in zip(a, b)) / len(a), 3) if a else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=50, help='times the sample is scored for throughput')
+    parser.add_argument('--baseline', default='textblob', help='backend the others are compared with')
+    parser.add_argument('--json', help='write results to this file')
+    args = parser.parse_args()
+
+    texts, labels = load_sample()
+    print("=" * 60)
+    print("SENTIMENT BACKEND BENCHMARK ({} labeled comments x {})".format(len(texts), args.repeat))
+    print("=" * 60)
+
+    results = []
+    for name in available_backends():
+        try:
+            results.append(benchmark_backend(name, texts, args.repeat))
+        except ImportError as e:
+            print("  - {}: skipped ({})".format(name, e))
+
+    baseline = next((r for r in results if r['backend'] == args.baseline), None)
+    if baseline is None:
+        print("  - Baseline '{}' unavailable, agreement uses the labels only".format(args.baseline))
+
+    print("\n{:<10} {:>14} {:>12} {:>10} {:>10}".format('Backend', 'Comments/sec', 'Peak KB', 'Accuracy', 'Agreement'))
+    print("-" * 60)
+    for result in results:
+        result['accuracy'] = agreement(result['predictions'], labels)
+        result['baseline_agreement'] = agreement(result['predictions'], baseline['predictions']) if baseline else None
+        print("{:<10} {:>14} {:>12} {:>10} {:>10}".format(
+            result['backend'],
+            result['comments_per_sec'],
+            result['peak_memory_kb'],
+            result['accuracy'],
+            result['baseline_agreement'] if baseline else 'n/a',
+        ))
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump([{k: v for k, v in r.items() if k != 'predictions'} for r in results], f, indent=2)
+        print("\nResults written to {}".format(args.json))
+
+
+if __name__ == '__main__':
+    main()
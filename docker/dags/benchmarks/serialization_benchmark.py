@@ -0,0 +1,125 @@
+#!/usr/bin/env python
+"""
+Compare the pandas read path with the streaming JSON path on large results.
+
+Each path runs in a fresh interpreter so peak RSS (ru_maxrss) is measured
+in isolation. The query reads a synthetic result of --rows rows generated
+server-side with generate_series (ints, floats, numerics, text and
+timestamps), so no tables are needed; only a reachable Postgres using the
+DB_* settings of etl.load.
+
+    pandas:    pd.read_sql -> df.to_dict('records') -> json.dumps
+    streaming: server-side cursor -> etl.streaming.json_array_chunks
+
+Usage:
+    python benchmarks/serialization_benchmark.py [--rows N ...] [--json PATH]
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+DAGS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, DAGS_DIR)
+
+PATHS = ['pandas', 'streaming']
+
+QUERY = '''
+    SELECT i AS actor_id,
+           'Actor ' || i AS actor_name,
+           (i % 40) + 1 AS total_films,
+           ROUND((random() * 9 + 1)::numeric, 2) AS average_rating,
+           random() * 10 AS max_rating,
+           now() - (i || ' minutes')::interval AS last_updated
+    FROM generate_series(1, %(rows)s) AS i
+'''
+
+
+def _rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_pandas(conn, rows):
+    import pandas as pd
+    from etl.streaming import json_default
+    df = pd.read_sql(QUERY, conn, params={'rows': rows})
+    body = json.dumps(df.to_dict('records'), default=json_default).encode('utf-8')
+    return len(body)
+
+
+def run_streaming(conn, rows):
+    from etl.streaming import iter_rows, json_array_chunks
+    return sum(len(chunk) for chunk in json_array_chunks(iter_rows(conn, QUERY, {'rows': rows})))
+
+
+def worker(path, rows):
+    """Measure one path in this process and print a JSON result line"""
+    from etl.load import get_db_connection
+    if path == 'pandas':
+        import pandas  # noqa: F401 - import cost is reported separately
+    else:
+        import etl.streaming  # noqa: F401
+    conn = get_db_connection()
+    baseline_mb = _rss_mb()
+    start = time.perf_counter()
+    size = (run_pandas if path == 'pandas' else run_streaming)(conn, rows)
+    elapsed = time.perf_counter() - start
+    conn.close()
+    print(json.dumps({
+        'path': path,
+        'rows': rows,
+        'latency_ms': round(elapsed * 1000, 1),
+        'peak_rss_mb': round(_rss_mb(), 1),
+        'peak_rss_delta_mb': round(_rss_mb() - baseline_mb, 1),
+        'bytes': size,
+    }))
+
+
+def measure(path, rows):
+    proc = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), '--worker', path, '--rows', str(rows)],
+        capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        return {'path': path, 'rows': rows, 'error': (proc.stderr.strip().splitlines() or ['failed'])[-1]}
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[10000, 100000, 500000])
+    parser.add_argument('--worker', choices=PATHS, help=argparse.SUPPRESS)
+    parser.add_argument('--json', help='write results to this file')
+    args = parser.parse_args()
+
+    if args.worker:
+        worker(args.worker, args.rows[0])
+        return
+
+    print("=" * 60)
+    print("SERIALIZATION BENCHMARK (pandas vs streaming)")
+    print("=" * 60)
+    print("{:>9} | {:>10} | {:>11} | {:>12} | {:>10}".format('rows', 'path', 'latency ms', 'peak RSS MB', 'RSS +MB'))
+
+    results = []
+    for rows in args.rows:
+        for path in PATHS:
+            result = measure(path, rows)
+            results.append(result)
+            if 'error' in result:
+                print("{:>9} | {:>10} | error: {}".format(rows, path, result['error']))
+                continue
+            print("{:>9} | {:>10} | {:>11} | {:>12} | {:>10}".format(
+                rows, path, result['latency_ms'], result['peak_rss_mb'], result['peak_rss_delta_mb']))
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+        print("\nResults written to {}".format(args.json))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,132 @@
+#!/usr/bin/env python
+"""
+Time similar films by shared cast (etl.similarity) on a synthetic catalog.
+
+Generates --films films with about --cast actors each, drawn from --actors
+actors. Films come in franchises (2.5 films on average) sharing most of a core cast,
+so there are real neighbours to find. Reports the time of each stage:
+
+    signatures: MinHash of every cast
+    lsh:        candidate pairs from the banded signatures
+    jaccard:    exact overlap of every candidate
+    top_k:      best SIMILAR_FILMS_K films per film
+
+and the recall of the top-k lists against an exact search (every film
+sharing an actor) for --sample random films: over all exact neighbours,
+and over those at least --reliable similar (LSH finds weaker pairs only
+by chance).
+
+No database needed.
+
+Usage:
+    python benchmarks/similarity_benchmark.py [--films N] [--actors N] [--cast N] [--sample N] [--reliable S] [--json PATH]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+# Add the dags directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from etl.similarity import (SIMILAR_FILMS_K, SIMILARITY_MIN_JACCARD, cast_sets, jaccard, lsh_candidates,
+                            minhash_signatures, top_similar)
+
+
+def random_casts(films, actors, cast, rng):
+    """(film_ids, actor_ids) links; films of one franchise share about 2/3 of a core cast"""
+    franchise = np.cumsum(rng.random(films) < 0.4)
+    cores = rng.integers(1, actors + 1, (franchise[-1] + 1, cast))
+    film_ids = np.repeat(np.arange(1, films + 1), cast)
+    shared = rng.random(films * cast) < 0.67
+    actor_ids = np.where(shared, cores[franchise].ravel(), rng.integers(1, actors + 1, films * cast))
+    return film_ids, actor_ids
+
+
+def exact_top(indptr, actor_ids, film, by_actor_indptr, by_actor_films, k):
+    """Exact top-k of one film as {position: similarity} (similarity, then shared actors, then position)"""
+    cast = actor_ids[indptr[film]:indptr[film + 1]]
+    others = np.concatenate([by_actor_films[by_actor_indptr[a]:by_actor_indptr[a + 1]] for a in cast])
+    others = others[others != film]
+    if not len(others):
+        return {}
+    candidates, shared = np.unique(others, return_counts=True)
+    sizes = indptr[candidates + 1] - indptr[candidates]
+    similarity = shared / (len(cast) + sizes - shared)
+    keep = similarity >= SIMILARITY_MIN_JACCARD
+    candidates, shared, similarity = candidates[keep], shared[keep], similarity[keep]
+    order = np.lexsort((candidates, -shared, -similarity))[:k]
+    return dict(zip(candidates[order].tolist(), similarity[order].tolist()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark similar films by shared cast')
+    parser.add_argument('--films', type=int, default=200000, help='synthetic films')
+    parser.add_argument('--actors', type=int, default=500000, help='synthetic actors')
+    parser.add_argument('--cast', type=int, default=10, help='actors per film')
+    parser.add_argument('--sample', type=int, default=500, help='films checked against an exact search')
+    parser.add_argument('--reliable', type=float, default=0.2, help='similarity from which recall should be near 1')
+    parser.add_argument('--json', help='write results to this file')
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    films, indptr, actor_ids = cast_sets(*random_casts(args.films, args.actors, args.cast, rng))
+
+    print("=" * 60)
+    print(f"SIMILAR FILMS BENCHMARK ({len(films)} films, {len(actor_ids)} links)")
+    print("=" * 60)
+
+    stages = {}
+    start = time.perf_counter()
+    signatures = minhash_signatures(indptr, actor_ids)
+    stages['signatures'] = time.perf_counter()
+    left, right = lsh_candidates(signatures)
+    stages['lsh'] = time.perf_counter()
+    shared, similarity = jaccard(indptr, actor_ids, left, right)
+    stages['jaccard'] = time.perf_counter()
+    film, other, rank, shared, similarity = top_similar(left, right, shared, similarity)
+    stages['top_k'] = time.perf_counter()
+
+    timings = {}
+    previous = start
+    for name, end in stages.items():
+        timings[f'{name}_ms'] = round((end - previous) * 1000, 1)
+        previous = end
+    total_ms = round((previous - start) * 1000, 1)
+    for name, value in timings.items():
+        print(f"{name[:-3] + ':':<12} {value:.0f}ms")
+    print(f"{'total:':<12} {total_ms:.0f}ms ({len(left)} candidate pairs, {len(film)} rows kept)")
+
+    # Exact neighbours through an actor -> films index
+    order = np.argsort(actor_ids, kind='stable')
+    by_actor_films = np.repeat(np.arange(len(films)), np.diff(indptr))[order]
+    by_actor_indptr = np.searchsorted(actor_ids[order], np.arange(actor_ids.max() + 2))
+    found = {}
+    for position, neighbour in zip(film.tolist(), other.tolist()):
+        found.setdefault(position, set()).add(neighbour)
+    expected, hits = [0, 0], [0, 0]
+    for position in rng.choice(len(films), min(args.sample, len(films)), replace=False).tolist():
+        exact = exact_top(indptr, actor_ids, position, by_actor_indptr, by_actor_films, SIMILAR_FILMS_K)
+        kept = found.get(position, set())
+        for neighbour, value in exact.items():
+            for level, counted in enumerate((True, value >= args.reliable)):
+                expected[level] += counted
+                hits[level] += counted and neighbour in kept
+    recall = [hit / total if total else 1.0 for hit, total in zip(hits, expected)]
+    print(f"{'recall:':<12} {recall[0]:.3f} ({hits[0]}/{expected[0]} exact top-{SIMILAR_FILMS_K} neighbours "
+          f"of {args.sample} films)")
+    print(f"{'recall >= ' + str(args.reliable) + ':':<12} {recall[1]:.3f} ({hits[1]}/{expected[1]})")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'films': len(films), 'links': len(actor_ids), 'candidates': len(left), 'rows': len(film),
+                       **timings, 'total_ms': total_ms, 'recall': round(recall[0], 4),
+                       'reliable': args.reliable, 'reliable_recall': round(recall[1], 4)}, f, indent=2)
+        print(f"\nResults written to {args.json}")
+
+
+if __name__ == '__main__':
+    main()
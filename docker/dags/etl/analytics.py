@@ -0,0 +1,278 @@
+"""
+In-memory actor x film rating matrix for analytics and what-if recomputes.
+
+`actor_film` and `films` are read once into a CSR (compressed sparse row)
+matrix: one row per actor, one column per film. Links are stored in
+actor order, so each actor's films are the contiguous slice
+film_index[indptr[i]:indptr[i + 1]], and per-film vectors hold the
+ratings and years. Actor aggregates (count, mean, min, max, plus weighted
+and shrunk means) are then computed with NumPy segment reductions
+(ufunc.reduceat) over all links at once, instead of a new SQL join per
+question:
+
+    matrix = RatingMatrix.load(cursor)
+    matrix.aggregate()                                           # what calculate_actor_ratings stores
+    matrix.aggregate(mask=matrix.film_mask(min_year=2000))       # only films after 2000
+    matrix.aggregate(mask=matrix.film_mask(exclude=[film_id]))   # without one film
+    matrix.aggregate(weights=matrix.recency_weights(10))         # recent films count more
+    matrix.aggregate(shrinkage=5)                                # few films pull towards the mean
+
+write_ratings() stores an aggregate in actor_ratings in bulk.
+"""
+
+import logging
+import os
+import time
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Actors per UPSERT statement in write_ratings()
+ANALYTICS_WRITE_BATCH = int(os.getenv('ANALYTICS_WRITE_BATCH', '50000'))
+
+AGGREGATE_FIELDS = ('actor_id', 'total_films', 'rated_films', 'average_rating', 'min_rating', 'max_rating')
+
+
+def _film_columns(film_ids, link_film_ids):
+    """Column of each linked film in the sorted film_ids (-1 when not loaded)"""
+    if not len(film_ids) or not len(link_film_ids):
+        return np.full(len(link_film_ids), -1, dtype=np.int64)
+    top = int(max(film_ids[-1], link_film_ids.max()))
+    if film_ids[0] >= 0 and link_film_ids.min() >= 0 and top < 4 * len(film_ids) + 1024:
+        # SERIAL ids are dense: a lookup table beats a binary search per link
+        lookup = np.full(top + 1, -1, dtype=np.int64)
+        lookup[film_ids] = np.arange(len(film_ids))
+        return lookup[link_film_ids]
+    columns = np.minimum(np.searchsorted(film_ids, link_film_ids), len(film_ids) - 1)
+    return np.where(film_ids[columns] == link_film_ids, columns, -1)
+
+
+class RatingMatrix:
+    """
+    Actor x film links in CSR form plus per-film rating and year vectors.
+
+    Args:
+        actor_ids: sorted actor ids, one per row
+        indptr: row offsets into film_index (len(actor_ids) + 1 entries);
+            every row holds at least one link
+        film_index: column (position in film_ids) of each link
+        film_ids: sorted film ids, one per column
+        ratings: film ratings (NaN when unknown)
+        years: film years (NaN when unknown)
+
+    The matrix is read-only: per-link copies of the ratings are gathered
+    once here, since the gather costs more than the reductions themselves.
+    """
+
+    def __init__(self, actor_ids, indptr, film_index, film_ids, ratings, years):
+        self.actor_ids = actor_ids
+        self.indptr = indptr
+        self.film_index = film_index
+        self.film_ids = film_ids
+        self.ratings = ratings
+        self.years = years
+
+        self._link_ratings = ratings[film_index]
+        self._link_rated = ~np.isnan(self._link_ratings)
+        self._link_values = np.where(self._link_rated, self._link_ratings, 0.0)
+
+    @classmethod
+    def from_links(cls, link_actor_ids, link_film_ids, film_ids, ratings, years):
+        """Build the matrix from (actor_id, film_id) link arrays and per-film arrays in any order"""
+        film_ids = np.asarray(film_ids, dtype=np.int64)
+        order = np.argsort(film_ids, kind='stable')
+        film_ids = film_ids[order]
+        ratings = np.asarray(ratings, dtype=np.float64)[order]
+        years = np.asarray(years, dtype=np.float64)[order]
+
+        link_actor_ids = np.asarray(link_actor_ids, dtype=np.int64)
+        link_film_ids = np.asarray(link_film_ids, dtype=np.int64)
+        columns = _film_columns(film_ids, link_film_ids)
+        # Links to films that are not loaded are dropped
+        known = columns >= 0
+        link_actor_ids, columns = link_actor_ids[known], columns[known]
+
+        # Sorting one (actor, column) key is much faster than a lexsort;
+        # repeated pairs are dropped, they would double count
+        width = max(len(film_ids), 1)
+        keys = np.sort(link_actor_ids * width + columns)
+        if len(keys):
+            keys = keys[np.r_[True, keys[1:] != keys[:-1]]]
+        link_actor_ids, columns = np.divmod(keys, width)
+
+        starts = np.flatnonzero(np.r_[True, link_actor_ids[1:] != link_actor_ids[:-1]]) if len(keys) else keys
+        actor_ids = link_actor_ids[starts]
+        indptr = np.append(starts, len(columns)).astype(np.int64)
+        return cls(actor_ids, indptr, columns.astype(np.int64), film_ids, ratings, years)
+
+    @classmethod
+    def load(cls, cursor):
+        """Read films and actor_film once through an open cursor"""
+        start = time.perf_counter()
+        cursor.execute("SELECT film_id, rating, year FROM films")
+        # None becomes NaN in a float array
+        films = np.array(cursor.fetchall(), dtype=np.float64).reshape(-1, 3)
+        cursor.execute("SELECT actor_id, film_id FROM actor_film")
+        links = np.array(cursor.fetchall(), dtype=np.int64).reshape(-1, 2)
+        matrix = cls.from_links(links[:, 0], links[:, 1], films[:, 0].astype(np.int64), films[:, 1], films[:, 2])
+        logger.info(f"✓ Loaded rating matrix: {matrix.n_actors} actors × {matrix.n_films} films, "
+                    f"{matrix.n_links} links in {(time.perf_counter() - start) * 1000:.0f}ms")
+        return matrix
+
+    @property
+    def n_actors(self):
+        return len(self.actor_ids)
+
+    @property
+    def n_films(self):
+        return len(self.film_ids)
+
+    @property
+    def n_links(self):
+        return len(self.film_index)
+
+    # ==================== FILM SELECTIONS ====================
+
+    def film_mask(self, min_year=None, max_year=None, exclude=None, min_rating=None):
+        """
+        Boolean vector over films selecting the ones to aggregate.
+
+        Args:
+            min_year / max_year: inclusive year bounds (films without a year are left out when set)
+            exclude: film ids to leave out
+            min_rating: lowest rating kept (unrated films are left out when set)
+        """
+        mask = np.ones(self.n_films, dtype=bool)
+        with np.errstate(invalid='ignore'):
+            if min_year is not None:
+                mask &= self.years >= min_year
+            if max_year is not None:
+                mask &= self.years <= max_year
+            if min_rating is not None:
+                mask &= self.ratings >= min_rating
+        if exclude is not None:
+            mask &= ~np.isin(self.film_ids, np.asarray(list(exclude), dtype=np.int64))
+        return mask
+
+    def recency_weights(self, half_life_years, reference_year=None):
+        """
+        Per-film weights halving every `half_life_years` before reference_year
+        (default: the newest film). Films without a year weigh as much as the oldest.
+        """
+        known = ~np.isnan(self.years)
+        if not known.any():
+            return np.ones(self.n_films)
+        reference = np.nanmax(self.years) if reference_year is None else reference_year
+        years = np.where(known, self.years, np.nanmin(self.years))
+        return 0.5 ** (np.maximum(reference - years, 0) / half_life_years)
+
+    # ==================== AGGREGATES ====================
+
+    def aggregate(self, mask=None, weights=None, shrinkage=0.0, prior=None):
+        """
+        Per-actor aggregates over the selected films.
+
+        Args:
+            mask: boolean vector over films (see film_mask); default all films
+            weights: non-negative per-film weights for the mean (see recency_weights)
+            shrinkage: pseudo-count pulling each mean towards `prior`:
+                (sum(w * r) + shrinkage * prior) / (sum(w) + shrinkage)
+            prior: the mean shrunk towards; default the weighted mean of all selected ratings
+
+        Returns:
+            dict of equal-length arrays keyed by AGGREGATE_FIELDS, one entry
+            per actor with at least one selected film. total_films counts the
+            selected films, rated or not (as calculate_actor_ratings does);
+            the rating fields are NaN for actors with no rated film.
+        """
+        if self.n_links == 0:
+            return {field: np.array([], dtype=np.float64 if field.endswith('rating') else np.int64)
+                    for field in AGGREGATE_FIELDS}
+
+        starts = self.indptr[:-1]
+        ratings, rated, values = self._link_ratings, self._link_rated, self._link_values
+        if mask is None:
+            total = np.diff(self.indptr)
+        else:
+            selected = mask[self.film_index]
+            total = np.add.reduceat(selected, starts, dtype=np.int64)
+            rated = rated & selected
+            values = values * selected
+            ratings = np.where(selected, ratings, np.nan)
+
+        rated_count = np.add.reduceat(rated, starts, dtype=np.int64)
+        if weights is None:
+            weight_sum = rated_count.astype(np.float64)
+            weighted_sum = np.add.reduceat(values, starts)
+        else:
+            link_weights = np.where(rated, weights[self.film_index], 0.0)
+            weight_sum = np.add.reduceat(link_weights, starts)
+            weighted_sum = np.add.reduceat(link_weights * values, starts)
+
+        if shrinkage and prior is None:
+            prior = weighted_sum.sum() / weight_sum.sum() if weight_sum.sum() else 0.0
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = (weighted_sum + shrinkage * (prior or 0.0)) / (weight_sum + shrinkage)
+        mean[rated_count == 0] = np.nan
+
+        # fmin/fmax skip NaN (unrated or unselected films); all-NaN segments stay NaN
+        minimum = np.fmin.reduceat(ratings, starts)
+        maximum = np.fmax.reduceat(ratings, starts)
+
+        keep = total > 0
+        return {
+            'actor_id': self.actor_ids[keep],
+            'total_films': total[keep],
+            'rated_films': rated_count[keep],
+            'average_rating': mean[keep],
+            'min_rating': minimum[keep],
+            'max_rating': maximum[keep],
+        }
+
+
+def top_actors(aggregates, limit=10):
+    """Positions of the `limit` best average ratings (unrated actors last, ties by actor_id desc)"""
+    average = np.nan_to_num(aggregates['average_rating'], nan=-1.0)
+    order = np.lexsort((-aggregates['actor_id'], -average))
+    return order[:limit]
+
+
+def _nullable(values):
+    return [None if np.isnan(value) else float(value) for value in values]
+
+
+def write_ratings(cursor, aggregates):
+    """
+    UPSERT aggregates into actor_ratings, ANALYTICS_WRITE_BATCH actors per
+    statement (array parameters unnested server-side; names joined from actors).
+
+    Returns:
+        number of rows written
+    """
+    written = 0
+    for offset in range(0, len(aggregates['actor_id']), ANALYTICS_WRITE_BATCH):
+        batch = {field: values[offset:offset + ANALYTICS_WRITE_BATCH] for field, values in aggregates.items()}
+        cursor.execute('''
+            INSERT INTO actor_ratings (actor_id, actor_name, total_films, average_rating, min_rating, max_rating)
+            SELECT a.actor_id, a.name, data.total_films, data.average_rating, data.min_rating, data.max_rating
+            FROM unnest(%s::int[], %s::int[], %s::float8[], %s::float8[], %s::float8[])
+                 AS data (actor_id, total_films, average_rating, min_rating, max_rating)
+            JOIN actors a ON a.actor_id = data.actor_id
+            ON CONFLICT (actor_id) DO UPDATE
+            SET actor_name = EXCLUDED.actor_name,
+                total_films = EXCLUDED.total_films,
+                average_rating = EXCLUDED.average_rating,
+                min_rating = EXCLUDED.min_rating,
+                max_rating = EXCLUDED.max_rating,
+                last_updated = CURRENT_TIMESTAMP
+        ''', (
+            batch['actor_id'].tolist(),
+            batch['total_films'].tolist(),
+            # Rounded like ROUND(AVG(rating), 2) in the SQL ratings step
+            _nullable(np.round(batch['average_rating'], 2)),
+            _nullable(batch['min_rating']),
+            _nullable(batch['max_rating']),
+        ))
+        written += max(cursor.rowcount, 0)
+    return written
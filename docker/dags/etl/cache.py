@@ -0,0 +1,209 @@
+"""
+Versioned response cache for the web app's read endpoints.
+
+Responses are cached per (endpoint, arguments) together with the dataset
+version they were computed from. The version lives in the dataset_version
+table and is bumped by calculate_actor_ratings; each web worker learns
+about new versions through Postgres LISTEN/NOTIFY on a background thread,
+so between pipeline runs read requests are answered from memory without
+touching the database. When the listener is down the version is re-read
+at most every DATASET_VERSION_TTL seconds.
+"""
+
+import logging
+import os
+import select
+import threading
+import time
+from collections import OrderedDict
+
+from etl.metrics import incr
+
+logger = logging.getLogger(__name__)
+
+CACHE_MAX_ENTRIES = int(os.getenv('CACHE_MAX_ENTRIES', '256'))
+CACHE_MAX_BYTES = int(os.getenv('CACHE_MAX_BYTES', str(32 * 1024 * 1024)))
+# How stale the version may be when it has to be polled (listener down)
+DATASET_VERSION_TTL = float(os.getenv('DATASET_VERSION_TTL', '5'))
+
+VERSION_CHANNEL = 'dataset_version'
+
+
+class ResponseCache:
+    """Thread-safe LRU of (version, value, size) bounded by entry count and total bytes"""
+
+    def __init__(self, max_entries=None, max_bytes=None):
+        self.max_entries = max_entries or CACHE_MAX_ENTRIES
+        self.max_bytes = max_bytes or CACHE_MAX_BYTES
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key, version):
+        """Value cached for key at this version, or None (entries of other versions are dropped)"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                result = 'miss'
+            elif entry[0] != version:
+                self._remove(key)
+                entry, result = None, 'stale'
+            else:
+                self._entries.move_to_end(key)
+                result = 'hit'
+        incr('web_cache_requests_total', result=result)
+        return entry[1] if entry else None
+
+    def set(self, key, version, value, size):
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (version, value, size)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                incr('web_cache_evictions_total')
+
+    def _remove(self, key):
+        _, _, size = self._entries.pop(key)
+        self._bytes -= size
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._entries), 'bytes': self._bytes,
+                    'max_entries': self.max_entries, 'max_bytes': self.max_bytes}
+
+
+class DatasetVersion:
+    """
+    Current dataset version as seen by this process.
+
+    A daemon thread (started on first use, so it survives gunicorn's
+    pre-fork) LISTENs on the dataset_version channel and updates the
+    in-memory value on every NOTIFY. While the listener is not connected,
+    current() falls back to reading the table, at most every ttl seconds.
+
+    The same connection can LISTEN on further channels (add_channel) and
+    callbacks can be told about version changes (on_change); both should be
+    registered before the listener starts.
+    """
+
+    def __init__(self, connect, ttl=None):
+        self._connect = connect
+        self.ttl = DATASET_VERSION_TTL if ttl is None else ttl
+        self._version = None
+        self._checked_at = 0.0
+        self._listening = False
+        self._listener = None
+        self._lock = threading.Lock()
+        self._channels = {}
+        self._callbacks = []
+
+    def add_channel(self, channel, handler):
+        """Also LISTEN on channel; handler(payload) runs on the listener thread"""
+        self._channels[channel] = handler
+
+    def on_change(self, callback):
+        """Call callback(old_version, new_version) whenever the version changes"""
+        self._callbacks.append(callback)
+
+    @staticmethod
+    def _read(cursor):
+        cursor.execute("SELECT version FROM dataset_version")
+        row = cursor.fetchone()
+        return row[0] if row else None
+
+    def _set(self, version):
+        with self._lock:
+            old = self._version
+            self._version = version
+            self._checked_at = time.monotonic()
+        if version != old:
+            logger.info(f"🔄 Dataset version {old} -> {version}")
+            for callback in self._callbacks:
+                try:
+                    callback(old, version)
+                except Exception as e:
+                    logger.warning(f"⚠ Dataset version callback failed: {e}")
+
+    def _ensure_listener(self):
+        if self._listener is None or not self._listener.is_alive():
+            self._listener = threading.Thread(target=self._listen, name='dataset-version-listener', daemon=True)
+            self._listener.start()
+
+    def _listen(self):
+        while True:
+            conn = None
+            try:
+                conn = self._connect()
+                conn.autocommit = True
+                cursor = conn.cursor()
+                cursor.execute(f"LISTEN {VERSION_CHANNEL}")
+                for channel in self._channels:
+                    cursor.execute(f"LISTEN {channel}")
+                # Read after LISTEN so no bump can slip in between
+                self._set(self._read(cursor))
+                self._listening = True
+                while True:
+                    if select.select([conn], [], [], 60) == ([], [], []):
+                        # Idle: make sure the connection is still alive
+                        cursor.execute("SELECT 1")
+                        continue
+                    conn.poll()
+                    while conn.notifies:
+                        notify = conn.notifies.pop(0)
+                        if notify.channel == VERSION_CHANNEL:
+                            self._set(int(notify.payload))
+                        else:
+                            self._dispatch(notify.channel, notify.payload)
+            except Exception as e:
+                self._listening = False
+                logger.warning(f"⚠ Dataset version listener disconnected: {e}")
+                time.sleep(5)
+            finally:
+                if conn is not None:
+                    try:
+                        conn.close()
+                    except Exception:
+                        pass
+
+    def _dispatch(self, channel, payload):
+        try:
+            self._channels[channel](payload)
+        except Exception as e:
+            logger.warning(f"⚠ Handler for {channel} failed: {e}")
+
+    def needs_read(self):
+        """Whether current() would query Postgres (listener down and the last read older than ttl)"""
+        return not self._listening and time.monotonic() - self._checked_at >= self.ttl
+
+    def current(self):
+        """
+        Dataset version to serve with; None when it cannot be determined.
+
+        Blocks on a database read (and runs the on_change callbacks) when
+        needs_read(); async callers run it in a thread then.
+        """
+        self._ensure_listener()
+        if self._listening:
+            return self._version
+        if time.monotonic() - self._checked_at >= self.ttl:
+            try:
+                conn = self._connect()
+                try:
+                    self._set(self._read(conn.cursor()))
+                finally:
+                    conn.close()
+            except Exception as e:
+                logger.warning(f"⚠ Could not read dataset version: {e}")
+                with self._lock:
+                    self._version = None
+                    self._checked_at = time.monotonic()
+        return self._version
@@ -3,10 +3,12 @@ Calculate average actor ratings based on all films they acted in.
 This script aggregates film ratings by actor using SQL joins through the M2M junction table.
 """
 
-import psycopg2
-from psycopg2 import sql
 import logging
 import os
+import time
+
+from etl.metrics import count_items, db_cursor_factory, timed
+from etl.snapshots import write_snapshot
 
 logger = logging.getLogger(__name__)
 
@@ -17,16 +19,23 @@ DB_NAME = os.getenv('DB_NAME', 'imdb_reddit')
 DB_USER = os.getenv('DB_USER', 'postgres')
 DB_PASSWORD = os.getenv('DB_PASSWORD', 'postgres')
 
+# 'sql' aggregates with one join in Postgres; 'matrix' loads the links into
+# etl.analytics.RatingMatrix and writes the aggregates back in bulk
+RATINGS_ENGINE = os.getenv('RATINGS_ENGINE', 'sql')
+
 
 def get_db_connection():
     """Create and return a database connection"""
+    import psycopg2
+    
     try:
         conn = psycopg2.connect(
             host=DB_HOST,
             port=DB_PORT,
             database=DB_NAME,
             user=DB_USER,
-            password=DB_PASSWORD
+            password=DB_PASSWORD,
+            cursor_factory=db_cursor_factory()
         )
         return conn
     except Exception as e:
@@ -34,6 +43,64 @@ def get_db_connection():
         raise
 
 
+def _calculate_with_sql(cursor):
+    """Aggregate with one M2M join and UPSERT in Postgres; returns rows written"""
+    cursor.execute('''
+        WITH actor_statistics AS (
+            SELECT 
+                a.actor_id,
+                a.name as actor_name,
+                COUNT(DISTINCT f.film_id) as total_films,
+                ROUND(AVG(f.rating)::numeric, 2) as average_rating,
+                MIN(f.rating) as min_rating,
+                MAX(f.rating) as max_rating
+            FROM actors a
+            INNER JOIN actor_film af ON a.actor_id = af.actor_id
+            INNER JOIN films f ON af.film_id = f.film_id
+            GROUP BY a.actor_id, a.name
+            HAVING COUNT(DISTINCT f.film_id) > 0
+            ORDER BY average_rating DESC
+        )
+        INSERT INTO actor_ratings (actor_id, actor_name, total_films, average_rating, min_rating, max_rating)
+        SELECT actor_id, actor_name, total_films, average_rating, min_rating, max_rating
+        FROM actor_statistics
+        ON CONFLICT (actor_id) DO UPDATE
+        SET actor_name = EXCLUDED.actor_name,
+            total_films = EXCLUDED.total_films,
+            average_rating = EXCLUDED.average_rating,
+            min_rating = EXCLUDED.min_rating,
+            max_rating = EXCLUDED.max_rating,
+            last_updated = CURRENT_TIMESTAMP
+    ''')
+    
+    return max(cursor.rowcount, 0)
+
+
+def _calculate_with_matrix(cursor):
+    """Aggregate in memory with etl.analytics and write back in bulk; returns rows written"""
+    from etl.analytics import RatingMatrix, write_ratings
+    
+    matrix = RatingMatrix.load(cursor)
+    start = time.perf_counter()
+    aggregates = matrix.aggregate()
+    logger.info(f"✓ Aggregated {matrix.n_links} links in {(time.perf_counter() - start) * 1000:.1f}ms")
+    return write_ratings(cursor, aggregates)
+
+
+def _delete_unlinked(cursor):
+    """
+    Drop the ratings of actors left without any film link. Incremental cast
+    syncs remove links without resetting the schema, and the UPSERTs above
+    only touch actors that still have films. Returns rows deleted.
+    """
+    cursor.execute('''
+        DELETE FROM actor_ratings r
+        WHERE NOT EXISTS (SELECT 1 FROM actor_film af WHERE af.actor_id = r.actor_id)
+    ''')
+    return max(cursor.rowcount, 0)
+
+
+@timed('calculate_actor_ratings')
 def calculate_actor_ratings():
     """
     Calculate and store average ratings for each actor based on their filmography.
@@ -41,8 +108,13 @@ def calculate_actor_ratings():
     Algorithm:
     1. Join actors -> actor_film junction -> films
     2. GROUP BY actor and calculate AVG, MIN, MAX of film ratings
-    3. UPSERT results into actor_ratings table
-    4. Display top 10 actors
+       (with RATINGS_ENGINE=matrix: load the links once into a CSR
+       matrix and aggregate them with NumPy instead)
+    3. UPSERT results into actor_ratings table, and delete the rows of
+       actors who no longer have any film
+    4. Bump the dataset version (invalidates web response caches) and write
+       its leaderboard snapshot
+    5. Display top 10 actors
     """
     conn = get_db_connection()
     cursor = conn.cursor()
@@ -50,58 +122,29 @@ def calculate_actor_ratings():
     try:
         logger.info("📊 Starting actor ratings calculation...")
         
-        # Main calculation query with M2M joins
         logger.info("🔍 Calculating average ratings for each actor...")
-        cursor.execute('''
-            WITH actor_statistics AS (
-                SELECT 
-                    a.actor_id,
-                    a.name as actor_name,
-                    COUNT(DISTINCT f.film_id) as total_films,
-                    ROUND(AVG(f.rating)::numeric, 2) as average_rating,
-                    MIN(f.rating) as min_rating,
-                    MAX(f.rating) as max_rating
-                FROM actors a
-                INNER JOIN actor_film af ON a.actor_id = af.actor_id
-                INNER JOIN films f ON af.film_id = f.film_id
-                GROUP BY a.actor_id, a.name
-                HAVING COUNT(DISTINCT f.film_id) > 0
-                ORDER BY average_rating DESC
-            )
-            INSERT INTO actor_ratings (actor_id, actor_name, total_films, average_rating, min_rating, max_rating)
-            SELECT actor_id, actor_name, total_films, average_rating, min_rating, max_rating
-            FROM actor_statistics
-            ON CONFLICT (actor_id) DO UPDATE
-            SET actor_name = EXCLUDED.actor_name,
-                total_films = EXCLUDED.total_films,
-                average_rating = EXCLUDED.average_rating,
-                min_rating = EXCLUDED.min_rating,
-                max_rating = EXCLUDED.max_rating,
-                last_updated = CURRENT_TIMESTAMP
-        ''')
+        if RATINGS_ENGINE == 'matrix':
+            count_items('calculate_actor_ratings', _calculate_with_matrix(cursor))
+        else:
+            count_items('calculate_actor_ratings', _calculate_with_sql(cursor))
+        removed = _delete_unlinked(cursor)
+        if removed:
+            logger.info(f"✓ Removed ratings of {removed} actors without films")
         
+        # Publish a new dataset version in the same transaction; web caches drop their entries on commit
+        cursor.execute("SELECT bump_dataset_version()")
+        version = cursor.fetchone()[0]
+        # ...together with its leaderboard snapshot, so readers never see one without the other
+        snapshot = write_snapshot(cursor, version)
         conn.commit()
-        logger.info("✓ Actor ratings calculated and stored")
+        logger.info(f"✓ Actor ratings calculated and stored (dataset version {version})")
         
-        # Display top 10 actors
+        # Display top 10 actors (from the snapshot just written)
         logger.info("\n🏆 TOP 10 ACTORS BY AVERAGE RATING:\n")
-        cursor.execute('''
-            SELECT 
-                actor_name,
-                total_films,
-                average_rating,
-                min_rating,
-                max_rating
-            FROM actor_ratings
-            WHERE average_rating IS NOT NULL
-            ORDER BY average_rating DESC
-            LIMIT 10
-        ''')
-        
-        results = cursor.fetchall()
+        results = [row for row in snapshot['leaderboard'] if row['average_rating'] is not None][:10]
         if results:
-            for rank, (name, films, avg, min_r, max_r) in enumerate(results, 1):
-                logger.info(f"{rank}. {name:<30} | Films: {films} | Avg: {avg}/10 | Range: {min_r}-{max_r}")
+            for rank, row in enumerate(results, 1):
+                logger.info(f"{rank}. {row['actor_name']:<30} | Films: {row['total_films']} | Avg: {row['average_rating']}/10 | Range: {row['min_rating']}-{row['max_rating']}")
         else:
             logger.warning("No actor ratings found. Make sure films and actors are linked.")
         
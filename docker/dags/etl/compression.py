@@ -0,0 +1,106 @@
+"""
+Response compression for the web app.
+
+Bodies of at least COMPRESS_MIN_BYTES are compressed with brotli (when the
+`brotli` package is installed) or gzip, whichever the client accepts and
+prefers. Cached responses are compressed once, when they are stored, and
+every variant is kept next to the original, so a cache hit only picks
+the right variant and does no compression work.
+"""
+
+import gzip
+import os
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESS_MIN_BYTES = int(os.getenv('COMPRESS_MIN_BYTES', '1024'))
+GZIP_LEVEL = int(os.getenv('COMPRESS_GZIP_LEVEL', '6'))
+BROTLI_QUALITY = int(os.getenv('COMPRESS_BROTLI_QUALITY', '5'))
+
+COMPRESSIBLE_MIMETYPES = ('application/json', 'text/html', 'text/plain', 'text/css', 'application/javascript')
+
+
+def available_encodings():
+    """Content codings this process can produce, best first"""
+    return ['br', 'gzip'] if brotli is not None else ['gzip']
+
+
+def compress(body, encoding):
+    if encoding == 'br':
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    if encoding == 'gzip':
+        # mtime=0 keeps the output (and so any ETag over it) stable
+        return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+    raise ValueError(f"Unsupported encoding '{encoding}'")
+
+
+def _parse_accept_encoding(header):
+    """[(name, q)] of every entry of an Accept-Encoding header, in header order"""
+    entries = []
+    for part in (header or '').split(','):
+        name, _, params = part.strip().partition(';')
+        name = name.strip().lower()
+        if not name:
+            continue
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        entries.append((name, quality))
+    return entries
+
+
+def accepted_encodings(header):
+    """Encodings from an Accept-Encoding header with q > 0, by descending q"""
+    entries = _parse_accept_encoding(header)
+    accepted = sorted((-quality, position, name) for position, (name, quality) in enumerate(entries) if quality > 0)
+    return [name for _, _, name in accepted]
+
+
+def choose_encoding(header, offered=None):
+    """Best encoding the client accepts among `offered` (default: all available), or None"""
+    offered = available_encodings() if offered is None else offered
+    # '*' stands for the codings the header does not name: never one refused with q=0
+    named = {name for name, _ in _parse_accept_encoding(header)}
+    for name in accepted_encodings(header):
+        if name == '*':
+            unnamed = [encoding for encoding in offered if encoding not in named]
+            if unnamed:
+                return unnamed[0]
+        elif name in offered:
+            return name
+    return None
+
+
+def is_compressible(mimetype, size):
+    return size >= COMPRESS_MIN_BYTES and mimetype in COMPRESSIBLE_MIMETYPES
+
+
+class EncodedBody:
+    """A response body plus its precompressed variants (only those smaller than the original)"""
+
+    def __init__(self, body, mimetype):
+        self.variants = {}
+        if is_compressible(mimetype, len(body)):
+            for encoding in available_encodings():
+                compressed = compress(body, encoding)
+                if len(compressed) < len(body):
+                    self.variants[encoding] = compressed
+        self.body = body
+
+    @property
+    def size(self):
+        return len(self.body) + sum(len(data) for data in self.variants.values())
+
+    def negotiate(self, accept_encoding):
+        """(encoding or None, bytes) to send for this Accept-Encoding header"""
+        encoding = choose_encoding(accept_encoding, list(self.variants))
+        if encoding is None:
+            return None, self.body
+        return encoding, self.variants[encoding]
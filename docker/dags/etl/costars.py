@@ -0,0 +1,303 @@
+"""
+Co-star collaboration graph.
+
+Actors are nodes; two actors are linked when they share a film, weighted by
+the number of films they share. The graph is held in memory as CSR arrays
+(sorted actor ids, row offsets, neighbour positions, weights), so an actor's
+co-stars are one contiguous slice and degrees of separation are a
+bidirectional BFS over integer arrays instead of recursive SQL joins.
+
+CostarIndex keeps the graph current per dataset version. It remembers each
+film's cast and a signature of it (link count and newest actor_film_id);
+on refresh it re-reads only the films whose signature changed and merges
+the pairs of their old casts (removed) and new casts (added) into the
+sorted edge list.
+"""
+
+import logging
+import threading
+import time
+
+import numpy as np
+
+from etl.params import COLLABORATORS_DEFAULT_LIMIT, COSTAR_MAX_DEPTH
+
+logger = logging.getLogger(__name__)
+
+_EMPTY = np.array([], dtype=np.int64)
+
+
+def _segments(starts, sizes):
+    """Positions covered by the slices [start, start + size), concatenated"""
+    total = int(sizes.sum())
+    offsets = np.repeat(np.cumsum(sizes) - sizes, sizes)
+    return np.repeat(starts, sizes) + np.arange(total) - offsets
+
+
+def _positions(sorted_ids, ids):
+    """Index of each of ids (all present) in sorted_ids"""
+    if len(sorted_ids) and sorted_ids[0] >= 0 and sorted_ids[-1] < 4 * len(sorted_ids) + 1024:
+        # SERIAL ids are dense: a lookup table beats a binary search per id
+        lookup = np.zeros(int(sorted_ids[-1]) + 1, dtype=np.int32)
+        lookup[sorted_ids] = np.arange(len(sorted_ids), dtype=np.int32)
+        return lookup[ids]
+    return np.searchsorted(sorted_ids, ids).astype(np.int32)
+
+
+def cast_pairs(film_ids, actor_ids):
+    """
+    Ordered co-star pairs (a, b), a != b, of every film.
+
+    Args:
+        film_ids, actor_ids: link arrays grouped by film (equal film_ids adjacent)
+
+    Returns:
+        (source actor ids, target actor ids)
+    """
+    if not len(film_ids):
+        return _EMPTY, _EMPTY
+    starts = np.flatnonzero(np.r_[True, film_ids[1:] != film_ids[:-1]])
+    sizes = np.diff(np.append(starts, len(film_ids)))
+    # Each link is paired with every link of its film, itself included
+    per_link = np.repeat(sizes, sizes)
+    sources = np.repeat(actor_ids, per_link)
+    targets = actor_ids[_segments(np.repeat(starts, sizes), per_link)]
+    keep = sources != targets
+    return sources[keep], targets[keep]
+
+
+def edge_keys(sources, targets):
+    """One sortable int64 key per directed edge (actor ids are 32-bit SERIALs)"""
+    return (sources.astype(np.int64) << 32) | targets.astype(np.int64)
+
+
+def _run_lengths(keys):
+    """(distinct keys, occurrences) of an unsorted key array"""
+    keys = np.sort(keys)
+    if not len(keys):
+        return keys, np.array([], dtype=np.int32)
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    return keys[starts], np.diff(np.append(starts, len(keys))).astype(np.int32)
+
+
+def merge_edges(keys, weights, added, removed=_EMPTY):
+    """
+    Apply co-star pair changes to a sorted edge list.
+
+    Args:
+        keys, weights: current edges (see edge_keys) and shared film counts
+        added / removed: one key per shared film gained / lost (repeats allowed)
+
+    Returns:
+        (keys, weights) with edges whose count dropped to 0 removed. Only the
+        changes are sorted; existing edges are updated on a copy and new ones
+        inserted at their sorted positions.
+    """
+    added, added_counts = _run_lengths(added)
+    removed, removed_counts = _run_lengths(removed)
+    if not len(keys):
+        return added, added_counts
+
+    weights = weights.copy()
+    # Removed pairs were counted when their films were added, so they exist
+    weights[np.searchsorted(keys, removed)] -= removed_counts
+
+    positions = np.searchsorted(keys, added)
+    found = positions < len(keys)
+    found[found] = keys[positions[found]] == added[found]
+    weights[positions[found]] += added_counts[found]
+    new = ~found
+    keys = np.insert(keys, positions[new], added[new])
+    weights = np.insert(weights, positions[new], added_counts[new])
+    keep = weights > 0
+    return keys[keep], weights[keep]
+
+
+class CostarGraph:
+    """
+    Immutable co-star graph in CSR form.
+
+    Args:
+        keys: sorted edge keys (see edge_keys), both directions of every edge
+        weights: shared film count of each edge
+    """
+
+    def __init__(self, keys, weights):
+        self.keys = keys
+        self.weights = weights
+        sources = keys >> 32
+        starts = np.flatnonzero(np.r_[True, sources[1:] != sources[:-1]]) if len(keys) else _EMPTY
+        self.actor_ids = sources[starts]
+        self.indptr = np.append(starts, len(keys)).astype(np.int64)
+        # The graph is symmetric, so every target is also a row
+        self.neighbors = _positions(self.actor_ids, keys & 0xFFFFFFFF)
+
+    @property
+    def n_actors(self):
+        return len(self.actor_ids)
+
+    @property
+    def n_edges(self):
+        return len(self.keys) // 2
+
+    def _node(self, actor_id):
+        node = int(np.searchsorted(self.actor_ids, actor_id))
+        if node < self.n_actors and self.actor_ids[node] == actor_id:
+            return node
+        return None
+
+    def collaborators(self, actor_id, limit=COLLABORATORS_DEFAULT_LIMIT):
+        """[(co-star actor_id, shared films)] by most shared films, then actor_id"""
+        node = self._node(actor_id)
+        if node is None:
+            return []
+        start, end = self.indptr[node], self.indptr[node + 1]
+        neighbors = self.actor_ids[self.neighbors[start:end]]
+        weights = self.weights[start:end]
+        order = np.lexsort((neighbors, -weights))[:limit]
+        return [(int(neighbors[i]), int(weights[i])) for i in order]
+
+    def _expand(self, frontier, parents):
+        """Visit the unvisited neighbours of frontier; returns the new frontier"""
+        starts = self.indptr[frontier]
+        sizes = self.indptr[frontier + 1] - starts
+        reached = self.neighbors[_segments(starts, sizes)]
+        via = np.repeat(frontier, sizes)
+        fresh = parents[reached] < 0
+        reached = reached[fresh]
+        # Any parent on the previous level will do, so duplicates may overwrite each other
+        parents[reached] = via[fresh]
+        reached = np.sort(reached)
+        return reached[np.r_[True, reached[1:] != reached[:-1]]] if len(reached) else reached
+
+    def shortest_path(self, source_id, target_id, max_depth=COSTAR_MAX_DEPTH):
+        """
+        Fewest-hops chain of co-stars from source to target (both included),
+        by bidirectional BFS that always grows the smaller frontier; None when
+        either actor has no co-stars or they are more than max_depth hops apart.
+        """
+        source, target = self._node(source_id), self._node(target_id)
+        if source is None or target is None:
+            return None
+        if source == target:
+            return [int(source_id)]
+
+        forward = np.full(self.n_actors, -1, dtype=np.int32)
+        backward = np.full(self.n_actors, -1, dtype=np.int32)
+        forward[source], backward[target] = source, target
+        forward_frontier = np.array([source], dtype=np.int64)
+        backward_frontier = np.array([target], dtype=np.int64)
+
+        for _ in range(max_depth):
+            if not len(forward_frontier) or not len(backward_frontier):
+                return None
+            if len(forward_frontier) <= len(backward_frontier):
+                forward_frontier = self._expand(forward_frontier, forward)
+                meeting = forward_frontier[backward[forward_frontier] >= 0]
+            else:
+                backward_frontier = self._expand(backward_frontier, backward)
+                meeting = backward_frontier[forward[backward_frontier] >= 0]
+            if len(meeting):
+                return self._path(int(meeting[0]), forward, backward)
+        return None
+
+    def _path(self, meeting, forward, backward):
+        path = [meeting]
+        while forward[path[0]] != path[0]:
+            path.insert(0, int(forward[path[0]]))
+        while backward[path[-1]] != path[-1]:
+            path.append(int(backward[path[-1]]))
+        return [int(self.actor_ids[node]) for node in path]
+
+
+def _group_casts(rows):
+    """{film_id: sorted actor id array} from (film_id, actor_id) rows"""
+    links = np.array(rows, dtype=np.int64).reshape(-1, 2)
+    links = links[np.lexsort((links[:, 1], links[:, 0]))]
+    if not len(links):
+        return {}
+    starts = np.flatnonzero(np.r_[True, links[1:, 0] != links[:-1, 0]])
+    return {int(links[start, 0]): actors
+            for start, actors in zip(starts, np.split(links[:, 1], starts[1:]))}
+
+
+def _pairs_of(casts):
+    if not casts:
+        return _EMPTY, _EMPTY
+    film_ids = np.concatenate([np.full(len(actors), film_id) for film_id, actors in casts.items()])
+    return cast_pairs(film_ids, np.concatenate(list(casts.values())))
+
+
+class CostarIndex:
+    """
+    The co-star graph of the current dataset version, kept in memory and
+    refreshed incrementally when the version changes.
+
+    Args:
+        connection: context manager factory yielding a database connection
+    """
+
+    def __init__(self, connection):
+        self._connection = connection
+        self._version = None
+        self._graph = None
+        self._keys = _EMPTY
+        self._weights = _EMPTY
+        self._casts = {}
+        self._signatures = {}
+        self._marker = None
+        self._lock = threading.Lock()
+
+    def get(self, version):
+        """The graph for version (refreshed first when it is new), or None when unavailable"""
+        if version is None:
+            return self._graph
+        with self._lock:
+            if version != self._version:
+                try:
+                    with self._connection() as conn:
+                        with conn.cursor() as cursor:
+                            self._refresh(cursor)
+                    self._version = version
+                except Exception as e:
+                    logger.warning(f"⚠ Could not refresh the co-star graph: {e}")
+            return self._graph
+
+    def _refresh(self, cursor):
+        start = time.perf_counter()
+        # Any statement on actor_film moves its table_stats row
+        cursor.execute("SELECT row_count, last_updated FROM table_stats WHERE table_name = 'actor_film'")
+        marker = cursor.fetchone()
+        if self._graph is not None and marker == self._marker:
+            return
+
+        cursor.execute("SELECT film_id, COUNT(*), MAX(actor_film_id) FROM actor_film GROUP BY film_id")
+        signatures = {film_id: (count, newest) for film_id, count, newest in cursor.fetchall()}
+        changed = [film_id for film_id, signature in signatures.items() if self._signatures.get(film_id) != signature]
+        removed = [film_id for film_id in self._signatures if film_id not in signatures]
+
+        if self._graph is not None and not changed and not removed:
+            self._marker = marker
+            return
+
+        if self._graph is None:
+            cursor.execute("SELECT film_id, actor_id FROM actor_film")
+        else:
+            cursor.execute("SELECT film_id, actor_id FROM actor_film WHERE film_id = ANY(%s)", (changed,))
+        new_casts = _group_casts(cursor.fetchall())
+        old_casts = {film_id: self._casts[film_id] for film_id in changed + removed if film_id in self._casts}
+
+        old_sources, old_targets = _pairs_of(old_casts)
+        new_sources, new_targets = _pairs_of(new_casts)
+        self._keys, self._weights = merge_edges(self._keys, self._weights,
+                                                edge_keys(new_sources, new_targets), edge_keys(old_sources, old_targets))
+
+        for film_id in removed:
+            self._casts.pop(film_id, None)
+        self._casts.update(new_casts)
+        self._signatures = signatures
+        self._marker = marker
+        self._graph = CostarGraph(self._keys, self._weights)
+        logger.info(f"✓ Co-star graph: {self._graph.n_actors} actors, {self._graph.n_edges} edges "
+                    f"({len(changed)} films changed, {len(removed)} removed) in "
+                    f"{(time.perf_counter() - start) * 1000:.0f}ms")
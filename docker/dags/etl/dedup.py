@@ -0,0 +1,150 @@
+"""
+Comment deduplication - runs between reddit_extract and sentiment.
+
+Drops exact duplicates (same text after normalization) by hash, then
+near-duplicates (quoted replies, copy-pasta with small edits) by 64-bit
+SimHash. Near-duplicate candidates are found with LSH banding: the
+fingerprint is split into max_distance + 1 bands, and by the pigeonhole
+principle two fingerprints within max_distance bits share at least one
+band exactly. Only comments sharing a band are compared, which keeps the
+stage roughly linear in the number of comments.
+"""
+
+import functools
+import hashlib
+import logging
+import os
+import re
+
+from etl.metrics import count_items, incr, timed
+
+logger = logging.getLogger(__name__)
+
+# Maximum Hamming distance (out of 64 bits) for two comments to count as near-duplicates
+DEDUP_MAX_DISTANCE = int(os.getenv('DEDUP_MAX_DISTANCE', '3'))
+
+FINGERPRINT_BITS = 64
+
+_URL_RE = re.compile(r'https?://\S+')
+_WORD_RE = re.compile(r'[a-z0-9]+')
+
+
+def _comment_text(comment):
+    return comment.get('text', '') if isinstance(comment, dict) else str(comment)
+
+
+@functools.lru_cache(maxsize=65536)
+def _hash64(value):
+    return int.from_bytes(hashlib.blake2b(value.encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+def normalize_text(text):
+    """
+    Lowercase, drop Reddit quote lines ('> ...') and URLs, keep only words.
+
+    A reply that only quotes another comment keeps its quoted text so it
+    still matches the original.
+    """
+    own_lines = [line for line in text.splitlines() if not line.lstrip().startswith('>')]
+    body = '\n'.join(own_lines) if any(line.strip() for line in own_lines) else text
+    return ' '.join(_WORD_RE.findall(_URL_RE.sub(' ', body.lower())))
+
+
+def simhash(normalized, shingle_size=1):
+    """64-bit SimHash over word shingles of an already normalized text"""
+    words = normalized.split()
+    if len(words) >= shingle_size:
+        features = [' '.join(words[i:i + shingle_size]) for i in range(len(words) - shingle_size + 1)]
+    else:
+        features = words or [normalized]
+
+    # Count set bits per position column-wise over the binary strings (done in C by
+    # zip/str.count) instead of looping over 64 bits per feature in Python
+    rows = [format(_hash64(feature), '064b') for feature in features]
+    half = len(rows) / 2
+    bits = ''.join('1' if column.count('1') > half else '0' for column in zip(*rows))
+    return int(bits, 2)
+
+
+def hamming_distance(a, b):
+    return bin(a ^ b).count('1')
+
+
+def _bands(fingerprint, band_count):
+    """
+    Split a fingerprint into band_count (index, value) pieces covering all 64
+    bits. Widths differ by at most one bit, so every band holds real bits
+    (equal ceil(64 / n)-bit bands leave the last ones empty from 17 bands on,
+    and every fingerprint would share those buckets).
+    """
+    bounds = [i * FINGERPRINT_BITS // band_count for i in range(band_count + 1)]
+    return [(i, (fingerprint >> bounds[i]) & ((1 << (bounds[i + 1] - bounds[i])) - 1)) for i in range(band_count)]
+
+
+@timed('dedup')
+def dedupe_comments(comments, max_distance=None):
+    """
+    Remove exact and near-duplicate comments, keeping the first occurrence.
+
+    Args:
+        comments: list of comment dicts with 'text' key (or plain strings)
+        max_distance: SimHash Hamming distance at or under which two comments
+            are near-duplicates; 0 disables near-duplicate removal.
+            Defaults to DEDUP_MAX_DISTANCE.
+
+    Returns:
+        dict with:
+            - comments: the kept comments, in their original order
+            - total: number of comments received
+            - dropped_exact: exact duplicates removed
+            - dropped_near: near-duplicates removed
+    """
+    if max_distance is None:
+        max_distance = DEDUP_MAX_DISTANCE
+    # Pigeonhole needs max_distance + 1 non-empty bands
+    if not 0 <= max_distance < FINGERPRINT_BITS:
+        raise ValueError(f"max_distance must be between 0 and {FINGERPRINT_BITS - 1}, got {max_distance}")
+    band_count = max_distance + 1
+
+    kept = []
+    seen_exact = set()
+    buckets = {}
+    dropped_exact = 0
+    dropped_near = 0
+
+    for comment in comments or []:
+        normalized = normalize_text(_comment_text(comment))
+
+        digest = hashlib.blake2b(normalized.encode('utf-8'), digest_size=16).digest()
+        if digest in seen_exact:
+            dropped_exact += 1
+            continue
+        seen_exact.add(digest)
+
+        if max_distance > 0:
+            fingerprint = simhash(normalized)
+            bands = _bands(fingerprint, band_count)
+            candidates = set()
+            for band in bands:
+                candidates.update(buckets.get(band, ()))
+            if any(hamming_distance(fingerprint, other) <= max_distance for other in candidates):
+                dropped_near += 1
+                continue
+            for band in bands:
+                buckets.setdefault(band, []).append(fingerprint)
+
+        kept.append(comment)
+
+    total = len(kept) + dropped_exact + dropped_near
+    count_items('dedup', total)
+    incr('dedup_dropped_total', dropped_exact, kind='exact')
+    incr('dedup_dropped_total', dropped_near, kind='near')
+    if dropped_exact or dropped_near:
+        logger.info(f"🧹 Dedup: kept {len(kept)}/{total} comments ({dropped_exact} exact, {dropped_near} near-duplicates dropped)")
+
+    return {
+        'comments': kept,
+        'total': total,
+        'dropped_exact': dropped_exact,
+        'dropped_near': dropped_near
+    }
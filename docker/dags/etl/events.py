@@ -0,0 +1,200 @@
+"""
+Live updates for the web app: an in-process event bus plus the
+leaderboard differ that feeds it.
+
+Every web worker has one EventBus. Server-sent event streams (/api/events)
+subscribe to it; publishers are the dataset-version listener (leaderboard
+diffs after each ratings run) and the pipeline job worker (stage progress,
+relayed between workers through Postgres NOTIFY). A subscriber gets its
+own bounded queue, so a slow client only drops its own events, never
+blocks a publisher.
+"""
+
+import itertools
+import logging
+import os
+import queue
+import threading
+import uuid
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+EVENTS_QUEUE_SIZE = int(os.getenv('EVENTS_QUEUE_SIZE', '256'))
+EVENTS_REPLAY_SIZE = int(os.getenv('EVENTS_REPLAY_SIZE', '100'))
+LEADERBOARD_SIZE = int(os.getenv('LEADERBOARD_SIZE', '50'))
+
+# Postgres channel relaying job progress between web workers
+EVENTS_CHANNEL = 'pipeline_events'
+
+
+class Event:
+    """One published event; id is unique within this process (used for SSE resume)"""
+
+    __slots__ = ('id', 'name', 'data')
+
+    def __init__(self, event_id, name, data):
+        self.id = event_id
+        self.name = name
+        self.data = data
+
+
+class Subscription:
+    """A subscriber's queue; deliver() never blocks (events are dropped when full)"""
+
+    def __init__(self, bus, max_size):
+        self._bus = bus
+        self._queue = queue.Queue(max_size)
+        self.dropped = 0
+
+    def deliver(self, event):
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            self.dropped += 1
+
+    def get(self, timeout=None):
+        """Next event, or None after timeout seconds without one"""
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        self._bus.unsubscribe(self)
+
+
+class AsyncSubscription(Subscription):
+    """Subscription for an asyncio consumer; events are handed to its loop thread-safely"""
+
+    def __init__(self, bus, max_size, loop):
+        super().__init__(bus, max_size)
+        import asyncio
+        self._loop = loop
+        self._async_queue = asyncio.Queue(max_size)
+
+    def deliver(self, event):
+        try:
+            self._loop.call_soon_threadsafe(self._put, event)
+        except RuntimeError:
+            # Loop already closed: the stream is gone
+            self.close()
+
+    def _put(self, event):
+        import asyncio
+        try:
+            self._async_queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.dropped += 1
+
+    async def get(self, timeout=None):
+        import asyncio
+        try:
+            return await asyncio.wait_for(self._async_queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class EventBus:
+    """Thread-safe publish/subscribe with a short replay buffer for reconnecting clients"""
+
+    def __init__(self, queue_size=None, replay_size=None):
+        self.queue_size = queue_size or EVENTS_QUEUE_SIZE
+        # Event ids are '<process token>-<n>'; ids from another process are never replayed
+        self._token = uuid.uuid4().hex[:8]
+        self._counter = itertools.count(1)
+        self._subscribers = set()
+        self._replay = deque(maxlen=replay_size or EVENTS_REPLAY_SIZE)
+        self._lock = threading.Lock()
+
+    def publish(self, name, data):
+        with self._lock:
+            event = Event(f"{self._token}-{next(self._counter)}", name, data)
+            self._replay.append(event)
+            subscribers = list(self._subscribers)
+        for subscriber in subscribers:
+            subscriber.deliver(event)
+        return event
+
+    def _add(self, subscription, last_event_id):
+        with self._lock:
+            self._subscribers.add(subscription)
+            missed = self._missed(last_event_id)
+        for event in missed:
+            subscription.deliver(event)
+        return subscription
+
+    def _missed(self, last_event_id):
+        token, _, number = (last_event_id or '').partition('-')
+        if token != self._token or not number.isdigit():
+            return []
+        return [event for event in self._replay if int(event.id.partition('-')[2]) > int(number)]
+
+    def subscribe(self, last_event_id=None):
+        """Subscription for a thread; events after last_event_id are replayed when still buffered"""
+        return self._add(Subscription(self, self.queue_size), last_event_id)
+
+    def subscribe_async(self, loop, last_event_id=None):
+        """Subscription for a coroutine running on loop"""
+        return self._add(AsyncSubscription(self, self.queue_size, loop), last_event_id)
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    @property
+    def subscriber_count(self):
+        with self._lock:
+            return len(self._subscribers)
+
+
+def format_sse(event):
+    """Encode an event in the text/event-stream wire format"""
+    from etl.streaming import dumps
+    return f"id: {event.id}\nevent: {event.name}\ndata: {dumps(event.data).decode('utf-8')}\n\n"
+
+
+class Leaderboard:
+    """
+    Top LEADERBOARD_SIZE actors as last published, for diffing after each ratings run.
+
+    Args:
+        fetch: callable(sql, params) -> list of dicts (the web app's fetch_rows)
+    """
+
+    SQL = '''
+        SELECT actor_id, actor_name, total_films, average_rating, min_rating, max_rating
+        FROM actor_ratings
+        ORDER BY COALESCE(average_rating, -1) DESC, actor_id DESC
+        LIMIT %(limit)s
+    '''
+
+    def __init__(self, fetch, size=None):
+        self._fetch = fetch
+        self.size = size or LEADERBOARD_SIZE
+        self._rows = None
+        self._lock = threading.Lock()
+
+    def invalidate(self):
+        """Forget the baseline; the next diff then carries the whole board"""
+        with self._lock:
+            self._rows = None
+
+    def diff(self):
+        """
+        Re-read the board and compare it with the previous one.
+
+        Returns:
+            dict {changed, removed, size, full} - changed holds the rows (with
+            their 1-based rank) that are new or moved or whose values changed;
+            removed the actor_ids that dropped off the board
+        """
+        rows = self._fetch(self.SQL, {'limit': self.size})
+        current = {row['actor_id']: dict(row, rank=rank) for rank, row in enumerate(rows, 1)}
+        with self._lock:
+            previous, self._rows = self._rows, current
+        if previous is None:
+            return {'changed': list(current.values()), 'removed': [], 'size': len(current), 'full': True}
+        changed = [row for actor_id, row in current.items() if previous.get(actor_id) != row]
+        removed = [actor_id for actor_id in previous if actor_id not in current]
+        return {'changed': changed, 'removed': removed, 'size': len(current), 'full': False}
@@ -1,7 +1,7 @@
-import requests
 import logging
 import os
-from bs4 import BeautifulSoup
+
+from etl.metrics import count_items, http_session, timed
 
 logger = logging.getLogger(__name__)
 
@@ -9,8 +9,15 @@ logger = logging.getLogger(__name__)
 TMDB_API_KEY = os.getenv('TMDB_API_KEY', '2b8db8e7c0b6aa1dc37eca5ccf33a1f3')
 TMDB_BASE_URL = "https://api.themoviedb.org/3"
 
+@timed('extract')
 def get_latest_films(limit=50):
     """Fetch REAL movies using JustWatch public API (free, no key required)"""
+    films = _get_latest_films(limit)
+    count_items('extract', len(films))
+    return films
+
+
+def _get_latest_films(limit):
     try:
         logger.info("🎬 Fetching REAL movies from multiple FREE sources...")
         
@@ -38,7 +45,7 @@ def get_justwatchmovies_with_cast(limit=50):
         # MovieFree API doesn't require keys
         url = "https://api.movies-api.io/movies?page=1&limit=50"
         
-        response = requests.get(url, timeout=15)
+        response = http_session().get(url, timeout=15)
         
         if response.status_code == 200:
             data = response.json()
@@ -211,7 +218,7 @@ def get_fallback_trending_movies(limit=5):
             'actors': ['Christian Bale', 'Michael Caine', 'Gary Oldman', 'Anne Hathaway', 'Tom Hardy', 'Marion Cotillard', 'Joseph Gordon-Levitt', 'Morgan Freeman', 'Matthew Modine', 'Aidan Gillen']
         },
         {
-            'imdb_id': 'tt0816692',
+            'imdb_id': 'tt1375666',
             'title': 'Inception',
             'rating': 8.8,
             'year': 2010,
@@ -237,7 +244,7 @@ def _fetch_from_imdb_top_movies(limit=5):
         url = "https://imdb-api.com/en/API/Top250Movies"
         headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'}
         
-        response = requests.get(url, headers=headers, timeout=15)
+        response = http_session().get(url, headers=headers, timeout=15)
         
         if response.status_code == 200:
             data = response.json()
@@ -277,7 +284,7 @@ def _fetch_from_omdb(limit=5):
         # Use TMDB top rated movies (ensures actual movies, not TV)
         url = f"{TMDB_BASE_URL}/movie/top_rated?api_key={TMDB_API_KEY}&language=en-US&page=1"
         
-        response = requests.get(url, timeout=15)
+        response = http_session().get(url, timeout=15)
         
         if response.status_code == 200:
             data = response.json()
@@ -296,7 +303,7 @@ def _fetch_from_omdb(limit=5):
                     
                     # Fetch detailed info including cast
                     details_url = f"{TMDB_BASE_URL}/movie/{movie_id}?api_key={TMDB_API_KEY}&append_to_response=credits"
-                    details_response = requests.get(details_url, timeout=10)
+                    details_response = http_session().get(details_url, timeout=10)
                     
                     actors = []
                     if details_response.status_code == 200:
@@ -346,7 +353,7 @@ def _fetch_from_static_popular_movies(limit=5):
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
         }
         
-        response = requests.get(url, headers=headers, timeout=15)
+        response = http_session().get(url, headers=headers, timeout=15)
         
         if response.status_code == 200:
             # Parse HTML to extract movie data
@@ -0,0 +1,146 @@
+"""
+Out-of-band hand-off of extracted batches between Airflow tasks.
+
+Instead of pushing the whole film list through XCom (stored in, and
+deserialized from, the Airflow metadata DB by every reader), the producer
+writes the batch once as a Parquet file on a volume shared by the workers
+and returns a small reference dict. Readers load only the columns they
+need, from only the row groups overlapping the rows they asked for, through
+a memory map; write_batch's row_group_size sets that granularity.
+
+Falls back to JSON Lines when pyarrow is not installed.
+"""
+
+import json
+import logging
+import os
+import re
+import time
+
+logger = logging.getLogger(__name__)
+
+HANDOFF_DIR = os.getenv('HANDOFF_DIR', '/opt/airflow/data/handoff')
+HANDOFF_RETENTION_DAYS = float(os.getenv('HANDOFF_RETENTION_DAYS', '7'))
+# Rows per Parquet row group: the smallest unit read_batch decodes
+HANDOFF_ROW_GROUP_SIZE = int(os.getenv('HANDOFF_ROW_GROUP_SIZE', '1000'))
+
+FILM_COLUMNS = ['imdb_id', 'title', 'rating', 'year', 'actors', 'sentiment_score', 'comments_count']
+
+
+def _film_schema():
+    import pyarrow as pa
+    return pa.schema([
+        ('imdb_id', pa.string()),
+        ('title', pa.string()),
+        ('rating', pa.float64()),
+        ('year', pa.int64()),
+        ('actors', pa.list_(pa.string())),
+        ('sentiment_score', pa.int64()),
+        ('comments_count', pa.int64()),
+    ])
+
+
+def _safe_name(name):
+    return re.sub(r'[^A-Za-z0-9_.-]+', '_', name)
+
+
+def _prune_old_batches():
+    """Delete hand-off files older than HANDOFF_RETENTION_DAYS"""
+    cutoff = time.time() - HANDOFF_RETENTION_DAYS * 86400
+    for entry in os.scandir(HANDOFF_DIR):
+        try:
+            if entry.is_file() and entry.stat().st_mtime < cutoff:
+                os.remove(entry.path)
+        except OSError as e:
+            logger.debug(f"Could not prune {entry.path}: {e}")
+
+
+def write_batch(films, name, row_group_size=None):
+    """
+    Write a batch of films once and return a reference to it.
+
+    Args:
+        films: list of film dicts {imdb_id, title, rating, year, actors} and
+            optionally {sentiment_score, comments_count} (stored as null when missing)
+        name: batch name, e.g. 'films_<run_id>'; unsafe characters are replaced
+        row_group_size: rows per Parquet row group (default HANDOFF_ROW_GROUP_SIZE);
+            match the readers' row ranges so each decodes only its own rows
+
+    Returns:
+        dict {path, format, rows} - small enough to pass through XCom
+    """
+    os.makedirs(HANDOFF_DIR, exist_ok=True)
+    _prune_old_batches()
+
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        pa = None
+        logger.warning("pyarrow not available, handing off as JSON Lines")
+
+    if pa is not None:
+        path = os.path.join(HANDOFF_DIR, f"{_safe_name(name)}.parquet")
+        table = pa.Table.from_pylist(
+            [{column: film.get(column) for column in FILM_COLUMNS} for film in films],
+            schema=_film_schema(),
+        )
+        tmp_path = path + '.tmp'
+        pq.write_table(table, tmp_path, row_group_size=row_group_size or HANDOFF_ROW_GROUP_SIZE)
+        batch_format = 'parquet'
+    else:
+        path = os.path.join(HANDOFF_DIR, f"{_safe_name(name)}.jsonl")
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for film in films:
+                f.write(json.dumps({column: film.get(column) for column in FILM_COLUMNS}) + '\n')
+        batch_format = 'jsonl'
+
+    # Atomic publish: readers never see a half-written file
+    os.replace(tmp_path, path)
+    logger.info(f"✓ Handed off {len(films)} films to {path}")
+    return {'path': path, 'format': batch_format, 'rows': len(films)}
+
+
+def read_batch(ref, columns=None, offset=0, length=None):
+    """
+    Load (part of) a batch written by write_batch.
+
+    Args:
+        ref: reference dict returned by write_batch
+        columns: optional list of columns to load; others are never read
+        offset: first row to return; only the row groups overlapping
+            [offset, offset + length) are decoded
+        length: number of rows to return (default: all remaining)
+
+    Returns:
+        list of film dicts restricted to the requested columns
+    """
+    if ref['format'] == 'parquet':
+        import pyarrow.parquet as pq
+        parquet = pq.ParquetFile(ref['path'], memory_map=True)
+        total = parquet.metadata.num_rows
+        end = total if length is None else min(offset + length, total)
+        groups, first_row, start = [], None, 0
+        for index in range(parquet.num_row_groups):
+            rows = parquet.metadata.row_group(index).num_rows
+            if start < end and start + rows > offset:
+                groups.append(index)
+                first_row = start if first_row is None else first_row
+            start += rows
+        if not groups:
+            return []
+        table = parquet.read_row_groups(groups, columns=columns)
+        return table.slice(offset - first_row, end - offset).to_pylist()
+
+    rows = []
+    end = None if length is None else offset + length
+    with open(ref['path'], encoding='utf-8') as f:
+        for index, line in enumerate(f):
+            if index < offset:
+                continue
+            if end is not None and index >= end:
+                break
+            film = json.loads(line)
+            rows.append({column: film.get(column) for column in columns} if columns else film)
+    return rows
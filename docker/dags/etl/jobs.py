@@ -0,0 +1,312 @@
+"""
+Background jobs for long-running work triggered over HTTP.
+
+A single daemon worker thread runs submitted jobs one at a time, so a
+pipeline run never ties up a web worker. Submitting a job of a kind that
+is already queued or running returns the existing job instead of starting
+a second one. Jobs report per-stage progress while they run and are kept
+in memory (the most recent JOB_HISTORY_SIZE) for status lookups.
+
+Job state is also written to JOBS_DIR, so under a multi-process server
+(gunicorn) any worker can answer a status lookup, and a trigger landing on
+another worker while a job of the same kind is active returns that job
+instead of starting a second run (guarded by a file lock per kind).
+"""
+
+import json
+import logging
+import os
+import queue
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+JOB_HISTORY_SIZE = int(os.getenv('JOB_HISTORY_SIZE', '50'))
+# Shared by all worker processes on one host; empty disables cross-process state
+JOBS_DIR = os.getenv('JOBS_DIR', os.path.join(tempfile.gettempdir(), 'etl_jobs'))
+
+ACTIVE_STATUSES = ('queued', 'running')
+
+
+class Job:
+    """State of one submitted job; func(job) reports progress through it"""
+
+    def __init__(self, kind, func):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.func = func
+        self.status = 'queued'
+        self.message = 'Queued'
+        self.stages = {}
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.on_change = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_dict(cls, data):
+        """Read-only copy of a job persisted by another process"""
+        job = cls(data['kind'], None)
+        job.id = data['job_id']
+        for field in ('status', 'message', 'stages', 'result', 'error', 'created_at', 'started_at', 'finished_at'):
+            setattr(job, field, data.get(field))
+        return job
+
+    def _changed(self):
+        if self.on_change is not None:
+            self.on_change(self)
+
+    def update_stage(self, name, stats):
+        """Record the latest stats dict of a stage (items, busy_seconds, ...)"""
+        with self._lock:
+            self.stages[name] = dict(stats)
+            self.message = f"Running: {name}"
+        self._changed()
+
+    def time_stage(self, name, func, *args, **kwargs):
+        """Run func as a single-item stage and record its duration"""
+        self.update_stage(name, {'items': 0, 'busy_seconds': 0.0})
+        start = time.perf_counter()
+        result = func(*args, **kwargs)
+        self.update_stage(name, {'items': 1, 'busy_seconds': round(time.perf_counter() - start, 3)})
+        return result
+
+    def to_dict(self):
+        with self._lock:
+            end = self.finished_at or time.time()
+            return {
+                'job_id': self.id,
+                'kind': self.kind,
+                'status': self.status,
+                'message': self.message,
+                'stages': dict(self.stages),
+                'result': self.result,
+                'error': self.error,
+                'created_at': self.created_at,
+                'started_at': self.started_at,
+                'finished_at': self.finished_at,
+                'elapsed_seconds': round(end - self.started_at, 3) if self.started_at else None,
+            }
+
+
+class JobManager:
+    """Queue plus one background worker; keeps recent jobs for lookups"""
+
+    def __init__(self, history_size=None, state_dir=None):
+        self.history_size = history_size or JOB_HISTORY_SIZE
+        self.state_dir = JOBS_DIR if state_dir is None else state_dir
+        self._jobs = OrderedDict()
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._worker = None
+        self._listeners = []
+
+    def add_listener(self, callback):
+        """Call callback(job_dict) whenever one of this process's jobs changes state or progress"""
+        self._listeners.append(callback)
+
+    def _changed(self, job):
+        self._persist(job)
+        if self._listeners:
+            data = job.to_dict()
+            for callback in self._listeners:
+                try:
+                    callback(data)
+                except Exception as e:
+                    logger.warning(f"⚠ Job listener failed: {e}")
+
+    def _ensure_worker(self):
+        if self._worker is None or not self._worker.is_alive():
+            self._worker = threading.Thread(target=self._run, name='job-worker', daemon=True)
+            self._worker.start()
+
+    # ---- shared state (JOBS_DIR) ----
+
+    def _path(self, name):
+        return os.path.join(self.state_dir, name)
+
+    def _persist(self, job):
+        """Atomically write the job's state for other processes"""
+        if not self.state_dir:
+            return
+        try:
+            os.makedirs(self.state_dir, exist_ok=True)
+            data = job.to_dict()
+            data['pid'] = os.getpid()
+            path = self._path(f"{job.id}.json")
+            tmp = f"{path}.{os.getpid()}.tmp"
+            with open(tmp, 'w') as f:
+                json.dump(data, f, default=str)
+            os.replace(tmp, path)
+        except OSError as e:
+            logger.warning(f"⚠ Could not persist job {job.id}: {e}")
+
+    def _load(self, job_id):
+        """State of a job persisted by any process, or None"""
+        if not self.state_dir or not all(c in '0123456789abcdef' for c in job_id):
+            return None
+        try:
+            with open(self._path(f"{job_id}.json")) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if data.get('status') in ACTIVE_STATUSES and not _pid_alive(data.get('pid')):
+            data.update(status='failed', message='Worker process exited', error='Worker process exited')
+        return data
+
+    def _shared_lock(self, kind):
+        """Exclusive lock file for submissions of one kind across processes (None if unavailable)"""
+        if not self.state_dir or fcntl is None:
+            return None
+        try:
+            os.makedirs(self.state_dir, exist_ok=True)
+            handle = open(self._path(f"{kind}.lock"), 'a')
+        except OSError as e:
+            logger.warning(f"⚠ Could not open job lock for {kind}: {e}")
+            return None
+        fcntl.flock(handle, fcntl.LOCK_EX)
+        return handle
+
+    def _active_elsewhere(self, kind):
+        """Active job of this kind started by another process, or None"""
+        try:
+            with open(self._path(f"{kind}.active")) as f:
+                job_id = f.read().strip()
+        except OSError:
+            return None
+        data = self._load(job_id)
+        if data and data['status'] in ACTIVE_STATUSES:
+            return Job.from_dict(data)
+        return None
+
+    def _mark_active(self, job):
+        try:
+            with open(self._path(f"{job.kind}.active"), 'w') as f:
+                f.write(job.id)
+        except OSError as e:
+            logger.warning(f"⚠ Could not mark job {job.id} active: {e}")
+
+    def _clear_active(self, job):
+        lock = self._shared_lock(job.kind)
+        if lock is None:
+            return
+        try:
+            path = self._path(f"{job.kind}.active")
+            with open(path) as f:
+                if f.read().strip() == job.id:
+                    os.remove(path)
+        except OSError:
+            pass
+        finally:
+            lock.close()
+
+    def _forget(self, job_id):
+        if self.state_dir:
+            try:
+                os.remove(self._path(f"{job_id}.json"))
+            except OSError:
+                pass
+
+    def submit(self, kind, func):
+        """
+        Queue func(job) unless a job of the same kind is already active.
+
+        Args:
+            kind: job type used for deduplication, e.g. 'pipeline'
+            func: callable taking the Job; its return value becomes job.result
+                and a 'message' key in it becomes the final job message
+
+        Returns:
+            (job, created) - created is False when an active job was reused
+        """
+        with self._lock:
+            for job in self._jobs.values():
+                if job.kind == kind and job.status in ACTIVE_STATUSES:
+                    return job, False
+            shared_lock = self._shared_lock(kind)
+            try:
+                if shared_lock is not None:
+                    other = self._active_elsewhere(kind)
+                    if other is not None:
+                        return other, False
+                job = Job(kind, func)
+                job.on_change = self._changed
+                self._jobs[job.id] = job
+                self._changed(job)
+                if shared_lock is not None:
+                    self._mark_active(job)
+            finally:
+                if shared_lock is not None:
+                    shared_lock.close()
+            while len(self._jobs) > self.history_size:
+                oldest_id, oldest = next(iter(self._jobs.items()))
+                if oldest.status in ACTIVE_STATUSES:
+                    break
+                del self._jobs[oldest_id]
+                self._forget(oldest_id)
+            self._ensure_worker()
+        self._queue.put(job)
+        logger.info(f"📥 Queued {kind} job {job.id}")
+        return job, True
+
+    def get(self, job_id):
+        """Job by id: this process's own, else a read-only copy persisted by another worker"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is None:
+            data = self._load(job_id)
+            job = Job.from_dict(data) if data else None
+        return job
+
+    def _run(self):
+        while True:
+            job = self._queue.get()
+            with job._lock:
+                job.status = 'running'
+                job.message = 'Running'
+                job.started_at = time.time()
+            self._changed(job)
+            logger.info(f"▶ Running {job.kind} job {job.id}")
+            try:
+                result = job.func(job)
+                with job._lock:
+                    job.result = result
+                    job.status = 'succeeded'
+                    job.message = (result or {}).get('message', 'Completed') if isinstance(result, dict) else 'Completed'
+                logger.info(f"✓ {job.kind} job {job.id} succeeded")
+            except Exception as e:
+                with job._lock:
+                    job.status = 'failed'
+                    job.error = str(e)
+                    job.message = str(e)
+                logger.error(f"❌ {job.kind} job {job.id} failed: {e}")
+            finally:
+                with job._lock:
+                    job.finished_at = time.time()
+                    job.func = None
+                self._changed(job)
+                self._clear_active(job)
+
+
+def _pid_alive(pid):
+    if not pid:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
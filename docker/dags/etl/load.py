@@ -3,11 +3,13 @@ ETL Load module - handles database operations
 Uses psycopg2 for direct database operations with UPSERT support
 """
 
-import psycopg2
-from psycopg2 import sql
+import hashlib
+import json
 import logging
 import os
 
+from etl.metrics import count_items, db_cursor_factory, timed
+
 logger = logging.getLogger(__name__)
 
 # Database connection parameters
@@ -20,13 +22,16 @@ DB_PASSWORD = os.getenv('DB_PASSWORD', 'postgres')
 
 def get_db_connection():
     """Create and return a database connection"""
+    import psycopg2
+    
     try:
         conn = psycopg2.connect(
             host=DB_HOST,
             port=DB_PORT,
             database=DB_NAME,
             user=DB_USER,
-            password=DB_PASSWORD
+            password=DB_PASSWORD,
+            cursor_factory=db_cursor_factory()
         )
         return conn
     except Exception as e:
@@ -34,6 +39,36 @@ def get_db_connection():
         raise
 
 
+TABLE_STATS_QUERY = '''
+    SELECT table_name, row_count, rating_sum, rating_count, last_updated
+    FROM table_stats
+'''
+
+
+def get_table_stats(cursor):
+    """
+    Read the trigger-maintained statistics for every table in one query.
+    
+    Args:
+        cursor: an open database cursor
+    
+    Returns:
+        dict mapping table name -> {row_count, rating_count, average_rating, last_updated}
+        where average_rating is the mean of films.rating / actor_ratings.average_rating
+        (None for tables without ratings)
+    """
+    cursor.execute(TABLE_STATS_QUERY)
+    stats = {}
+    for table_name, row_count, rating_sum, rating_count, last_updated in cursor.fetchall():
+        stats[table_name] = {
+            'row_count': row_count,
+            'rating_count': rating_count,
+            'average_rating': rating_sum / rating_count if rating_count else None,
+            'last_updated': last_updated
+        }
+    return stats
+
+
 def save_film(film_data):
     """
     Save or update a film in the database.
@@ -179,4 +214,324 @@ def save_film_with_actors(film_data, actor_names):
         raise
 
 
+def film_content_hash(film):
+    """
+    Content hash of a film: title, rating, year and sorted cast.
+    
+    Stored in films.content_hash so a run can tell unchanged films apart
+    from new or changed ones without rewriting them.
+    
+    Args:
+        film: dict with keys {title, rating, year, actors}
+    
+    Returns:
+        str - hex SHA-256 digest
+    """
+    rating = float(film['rating']) if film.get('rating') is not None else None
+    year = int(film['year']) if film.get('year') is not None else None
+    payload = json.dumps([film['title'], rating, year, sorted(film.get('actors') or [])], ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def _classify_films(cursor, films):
+    """Compare films against stored hashes in one query; see classify_films"""
+    hashes = {film['imdb_id']: film_content_hash(film) for film in films}
+    if not hashes:
+        return {}
+    
+    cursor.execute('''
+        SELECT imdb_id, film_id, content_hash
+        FROM films
+        WHERE imdb_id = ANY(%s)
+    ''', (list(hashes),))
+    stored = {imdb_id: (film_id, content_hash) for imdb_id, film_id, content_hash in cursor.fetchall()}
+    
+    classified = {}
+    for imdb_id, content_hash in hashes.items():
+        film_id, stored_hash = stored.get(imdb_id, (None, None))
+        if film_id is None:
+            status = 'new'
+        elif stored_hash == content_hash:
+            status = 'unchanged'
+        else:
+            status = 'changed'
+        classified[imdb_id] = {'status': status, 'film_id': film_id, 'content_hash': content_hash}
+    return classified
+
+
+def _upsert_films(cursor, films):
+    """Multi-row film UPSERT on an open cursor; returns {imdb_id: film_id}"""
+    from psycopg2.extras import execute_values
+    
+    rows = {film['imdb_id']: (film['imdb_id'], film['title'], film['rating'], film['year']) for film in films}
+    if not rows:
+        return {}
+    
+    results = execute_values(cursor, '''
+        INSERT INTO films (imdb_id, title, rating, year)
+        VALUES %s
+        ON CONFLICT (imdb_id) DO UPDATE
+        SET title = EXCLUDED.title,
+            rating = EXCLUDED.rating,
+            year = EXCLUDED.year
+        RETURNING imdb_id, film_id
+    ''', list(rows.values()), page_size=len(rows), fetch=True)
+    return dict(results)
+
+
+def _upsert_actors(cursor, actor_names):
+    """
+    Insert missing actors and look up all IDs on an open cursor.
+    Existing actors are not rewritten; names go in sorted order so
+    concurrent batches lock rows in the same order.
+    """
+    from psycopg2.extras import execute_values
+    
+    names = sorted(set(actor_names))
+    if not names:
+        return {}
+    
+    inserted = execute_values(cursor, '''
+        INSERT INTO actors (name)
+        VALUES %s
+        ON CONFLICT (name) DO NOTHING
+        RETURNING name, actor_id
+    ''', [(name,) for name in names], page_size=len(names), fetch=True)
+    actor_ids = dict(inserted)
+    
+    missing = [name for name in names if name not in actor_ids]
+    if missing:
+        cursor.execute('SELECT name, actor_id FROM actors WHERE name = ANY(%s)', (missing,))
+        actor_ids.update(cursor.fetchall())
+    return actor_ids
+
+
+def _sync_casts(cursor, casts):
+    """
+    Apply cast deltas and record content hashes on an open cursor.
+    
+    Args:
+        casts: dict film_id -> (list of actor_ids, content_hash)
+    
+    Returns:
+        (links_added, links_removed)
+    """
+    from psycopg2.extras import execute_values
+    
+    if not casts:
+        return 0, 0
+    
+    cursor.execute('''
+        SELECT film_id, actor_id FROM actor_film WHERE film_id = ANY(%s)
+    ''', (list(casts),))
+    existing = set((actor_id, film_id) for film_id, actor_id in cursor.fetchall())
+    wanted = set((actor_id, film_id) for film_id, (actor_ids, _) in casts.items() for actor_id in actor_ids)
+    
+    to_add = sorted(wanted - existing)
+    to_remove = sorted(existing - wanted)
+    
+    if to_add:
+        execute_values(cursor, '''
+            INSERT INTO actor_film (actor_id, film_id)
+            VALUES %s
+            ON CONFLICT (actor_id, film_id) DO NOTHING
+        ''', to_add, page_size=len(to_add))
+    if to_remove:
+        cursor.execute('''
+            DELETE FROM actor_film
+            WHERE (actor_id, film_id) IN (SELECT * FROM unnest(%s::int[], %s::int[]))
+        ''', ([a for a, _ in to_remove], [f for _, f in to_remove]))
+    
+    # Hashes are written last, in the same transaction as the links, so a
+    # film is only marked unchanged once its cast is actually stored
+    execute_values(cursor, '''
+        UPDATE films SET content_hash = data.content_hash
+        FROM (VALUES %s) AS data (film_id, content_hash)
+        WHERE films.film_id = data.film_id
+    ''', [(film_id, content_hash) for film_id, (_, content_hash) in casts.items()], page_size=len(casts))
+    
+    return len(to_add), len(to_remove)
+
+
+def _in_transaction(action, error_message):
+    """Run action(cursor) in its own connection and transaction"""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    
+    try:
+        result = action(cursor)
+        conn.commit()
+        return result
+    except Exception as e:
+        conn.rollback()
+        logger.error(f"❌ {error_message}: {e}")
+        raise
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def classify_films(films):
+    """
+    Compare a batch of films with what is stored, in one query.
+    
+    Args:
+        films: list of dicts with keys {imdb_id, title, rating, year, actors}
+    
+    Returns:
+        dict mapping imdb_id -> {status, film_id, content_hash} where status is
+        'new', 'changed' or 'unchanged' and film_id is None for new films
+    """
+    return _in_transaction(lambda cursor: _classify_films(cursor, films), "Error classifying films")
+
+
+@timed('load_films')
+def save_films_batch(films):
+    """
+    Save or update a batch of films over a single connection.
+    Uses one multi-row UPSERT; films repeating an imdb_id keep the last occurrence.
+    
+    Args:
+        films: list of dicts with keys {imdb_id, title, rating, year}
+    
+    Returns:
+        dict mapping imdb_id -> film_id
+    """
+    film_ids = _in_transaction(lambda cursor: _upsert_films(cursor, films), "Error saving film batch")
+    count_items('load_films', len(film_ids))
+    logger.info(f"✓ Saved {len(film_ids)} films in one batch")
+    return film_ids
+
+
+@timed('load_actors')
+def save_actors_batch(actor_names):
+    """
+    Save or retrieve a batch of actors over a single connection.
+    Names are inserted in sorted order so concurrent batches lock rows in
+    the same order and cannot deadlock each other; existing actors are
+    looked up rather than rewritten.
+    
+    Args:
+        actor_names: iterable of actor names
+    
+    Returns:
+        dict mapping actor name -> actor_id
+    """
+    actor_ids = _in_transaction(lambda cursor: _upsert_actors(cursor, actor_names), "Error saving actor batch")
+    count_items('load_actors', len(actor_ids))
+    logger.info(f"✓ Saved/Retrieved {len(actor_ids)} actors in one batch")
+    return actor_ids
+
+
+@timed('load_casts')
+def sync_film_casts(casts):
+    """
+    Bring the stored casts of new/changed films in line with the extracted ones.
+    Only the link delta is written; the films' content hashes are stored in
+    the same transaction.
+    
+    Args:
+        casts: dict film_id -> (list of actor_ids, content_hash)
+    
+    Returns:
+        dict with links_added and links_removed
+    """
+    added, removed = _in_transaction(lambda cursor: _sync_casts(cursor, casts), "Error syncing film casts")
+    count_items('load_casts', len(casts))
+    logger.info(f"✓ Synced casts of {len(casts)} films: +{added} / -{removed} links")
+    return {'links_added': added, 'links_removed': removed}
+
+
+@timed('load')
+def sync_films(films):
+    """
+    Change-detecting load of a batch of films with their casts, in one transaction.
+    
+    Unchanged films (same title, rating, year and cast as stored) are skipped
+    entirely; new and changed films are upserted and only their cast deltas
+    are written.
+    
+    Args:
+        films: list of dicts with keys {imdb_id, title, rating, year, actors}
+    
+    Returns:
+        dict with inserted, updated, unchanged, links_added, links_removed
+        counts and film_ids (imdb_id -> film_id for every film in the batch)
+    """
+    def action(cursor):
+        classified = _classify_films(cursor, films)
+        pending = [film for film in films if classified[film['imdb_id']]['status'] != 'unchanged']
+        
+        film_ids = {imdb_id: info['film_id'] for imdb_id, info in classified.items()}
+        film_ids.update(_upsert_films(cursor, pending))
+        
+        actor_ids = _upsert_actors(cursor, [name for film in pending for name in film.get('actors') or []])
+        casts = {
+            film_ids[film['imdb_id']]: (
+                [actor_ids[name] for name in film.get('actors') or []],
+                classified[film['imdb_id']]['content_hash']
+            )
+            for film in pending
+        }
+        added, removed = _sync_casts(cursor, casts)
+        
+        statuses = [info['status'] for info in classified.values()]
+        return {
+            'inserted': statuses.count('new'),
+            'updated': statuses.count('changed'),
+            'unchanged': statuses.count('unchanged'),
+            'links_added': added,
+            'links_removed': removed,
+            'film_ids': film_ids
+        }
+    
+    report = _in_transaction(action, "Error syncing films")
+    count_items('load', len(films))
+    logger.info(f"✓ Films: {report['inserted']} inserted, {report['updated']} updated, {report['unchanged']} unchanged "
+                f"| Links: +{report['links_added']} / -{report['links_removed']}")
+    return report
+
+
+@timed('load_links')
+def link_actors_to_films_batch(pairs):
+    """
+    Create many actor-film links over a single connection.
+    
+    Args:
+        pairs: iterable of (actor_id, film_id) tuples
+    
+    Returns:
+        int - number of new links (existing links are left untouched)
+    """
+    from psycopg2.extras import execute_values
+    
+    pairs = sorted(set(pairs))
+    if not pairs:
+        return 0
+    
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    
+    try:
+        results = execute_values(cursor, '''
+            INSERT INTO actor_film (actor_id, film_id)
+            VALUES %s
+            ON CONFLICT (actor_id, film_id) DO NOTHING
+            RETURNING actor_id
+        ''', pairs, page_size=len(pairs), fetch=True)
+        
+        conn.commit()
+        count_items('load_links', len(pairs))
+        logger.info(f"✓ Linked {len(results)} new actor-film pairs ({len(pairs)} requested)")
+        return len(results)
+        
+    except Exception as e:
+        conn.rollback()
+        logger.error(f"❌ Error linking actor batch: {e}")
+        raise
+    finally:
+        cursor.close()
+        conn.close()
+
+
 # Removed: save_reddit_comments and save_recommendation functions (tables no longer used)
@@ -0,0 +1,443 @@
+"""
+Lightweight performance instrumentation for the ETL stages and DAG tasks.
+
+Provides counters, histograms and timers in a process-wide registry, an
+instrumented HTTP session (latency per host), an instrumented psycopg2
+cursor (DB round trips, rows and time per statement type) and pluggable
+sinks the collected metrics are flushed to:
+
+    - jsonl:      one JSON object per series appended to METRICS_PATH
+    - prometheus: Prometheus text exposition format written to METRICS_PATH
+                  (node-exporter textfile style); web_app also serves it on /metrics
+    - none:       keep metrics in memory only
+
+Only the standard library is imported at module level, so the DAG file can
+import this module without slowing down scheduler parses.
+"""
+
+import functools
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+METRICS_SINK = os.getenv('METRICS_SINK', 'jsonl')
+METRICS_PATH = os.getenv('METRICS_PATH', '/opt/airflow/data/metrics/metrics.jsonl')
+
+# Upper bounds (seconds or items) of the histogram buckets; +Inf is implicit
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+def _key(name, labels):
+    return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_series(name, labels):
+    if not labels:
+        return name
+    return name + '{' + ','.join(f'{k}={v}' for k, v in labels) + '}'
+
+
+class Histogram:
+    """Fixed-bucket histogram that also tracks count, sum, min and max"""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.min = None
+        self.max = None
+
+    def observe(self, value):
+        index = len(self.buckets)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                index = i
+                break
+        self.counts[index] += 1
+        self.count += 1
+        self.sum += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def quantile(self, q):
+        """Approximate quantile: upper bound of the bucket holding the q-th observation"""
+        if not self.count:
+            return None
+        target = q * self.count
+        seen = 0
+        for i, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= target:
+                return min(self.buckets[i], self.max) if i < len(self.buckets) else self.max
+        return self.max
+
+    def merge(self, other):
+        """Add another histogram's observations (same buckets) into this one"""
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.count += other.count
+        self.sum += other.sum
+        if other.min is not None:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+            self.max = other.max if self.max is None else max(self.max, other.max)
+
+    def to_dict(self):
+        return {
+            'count': self.count,
+            'sum': round(self.sum, 6),
+            'min': self.min,
+            'max': self.max,
+            'p50': self.quantile(0.5),
+            'p95': self.quantile(0.95),
+            'buckets': dict(zip([str(b) for b in self.buckets] + ['+Inf'], self.counts)),
+        }
+
+
+class MetricsRegistry:
+    """Thread-safe store of counters and histograms keyed by name and labels"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters = {}
+        self.histograms = {}
+
+    def incr(self, name, value=1, **labels):
+        key = _key(name, labels)
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        key = _key(name, labels)
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram()
+            histogram.observe(value)
+
+    @contextmanager
+    def timer(self, name, **labels):
+        """Context manager observing the elapsed seconds into histogram `name`"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def reset(self):
+        with self._lock:
+            self.counters.clear()
+            self.histograms.clear()
+
+    def drain(self):
+        """Take everything recorded so far, leaving the registry empty; picklable for merge()"""
+        with self._lock:
+            state = {'counters': self.counters, 'histograms': self.histograms}
+            self.counters, self.histograms = {}, {}
+        return state
+
+    def merge(self, state):
+        """Add a drain() result (e.g. from a pool worker process) into this registry"""
+        with self._lock:
+            for key, value in state['counters'].items():
+                self.counters[key] = self.counters.get(key, 0) + value
+            for key, histogram in state['histograms'].items():
+                if key in self.histograms:
+                    self.histograms[key].merge(histogram)
+                else:
+                    self.histograms[key] = histogram
+
+    def snapshot(self):
+        """Plain-dict copy: {'counters': [...], 'histograms': [...]}"""
+        with self._lock:
+            return {
+                'counters': [
+                    {'name': name, 'labels': dict(labels), 'value': value}
+                    for (name, labels), value in sorted(self.counters.items())
+                ],
+                'histograms': [
+                    dict({'name': name, 'labels': dict(labels)}, **histogram.to_dict())
+                    for (name, labels), histogram in sorted(self.histograms.items())
+                ],
+            }
+
+    def summary_lines(self):
+        """Human-readable per-series summary for task logs, plus derived throughput"""
+        snapshot = self.snapshot()
+        lines = []
+        seconds = {}
+        for histogram in snapshot['histograms']:
+            series = _format_series(histogram['name'], sorted(histogram['labels'].items()))
+            mean = histogram['sum'] / histogram['count'] if histogram['count'] else 0
+            lines.append(
+                f"  {series:<56} n={histogram['count']:<6} total={histogram['sum']:.3f}s "
+                f"mean={mean:.4f}s p95<={histogram['p95']:.4f}s max={histogram['max']:.4f}s"
+            )
+            if histogram['name'] in ('stage_seconds', 'db_query_seconds'):
+                key = histogram['labels'].get('stage') or histogram['labels'].get('op')
+                seconds[(histogram['name'], key)] = histogram['sum']
+        for counter in snapshot['counters']:
+            series = _format_series(counter['name'], sorted(counter['labels'].items()))
+            lines.append(f"  {series:<56} {counter['value']}")
+            if counter['name'] == 'stage_items_total':
+                elapsed = seconds.get(('stage_seconds', counter['labels']['stage']))
+            elif counter['name'] == 'db_rows_total':
+                elapsed = seconds.get(('db_query_seconds', counter['labels']['op']))
+            else:
+                continue
+            if elapsed:
+                lines.append(f"  {'  -> throughput':<56} {counter['value'] / elapsed:.1f}/s")
+        return lines
+
+
+registry = MetricsRegistry()
+
+
+def incr(name, value=1, **labels):
+    registry.incr(name, value, **labels)
+
+
+def observe(name, value, **labels):
+    registry.observe(name, value, **labels)
+
+
+def timer(name, **labels):
+    return registry.timer(name, **labels)
+
+
+def count_items(stage, count):
+    """Record `count` items processed by `stage` (films, comments, rows, ...)"""
+    registry.incr('stage_items_total', count, stage=stage)
+
+
+def timed(stage):
+    """Decorator observing each call's duration as stage_seconds{stage}"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with registry.timer('stage_seconds', stage=stage):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+# ==================== SINKS ====================
+_SINKS = {}
+
+
+def register_sink(name):
+    """Class decorator registering a sink under the given name"""
+    def decorator(cls):
+        _SINKS[name] = cls
+        return cls
+    return decorator
+
+
+def get_sink(name=None, path=None):
+    """Return a sink instance by name (defaults to METRICS_SINK / METRICS_PATH)"""
+    name = name or METRICS_SINK
+    if name not in _SINKS:
+        raise ValueError(f"Unknown metrics sink '{name}' (available: {', '.join(sorted(_SINKS))})")
+    return _SINKS[name](path or METRICS_PATH)
+
+
+@register_sink('none')
+class NullSink:
+    def __init__(self, path=None):
+        pass
+
+    def write(self, snapshot, context):
+        pass
+
+
+@register_sink('jsonl')
+class JsonLinesSink:
+    """Appends one JSON object per series, tagged with the run context"""
+
+    def __init__(self, path):
+        self.path = path
+
+    def write(self, snapshot, context):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        timestamp = time.time()
+        with open(self.path, 'a', encoding='utf-8') as f:
+            for kind in ('counters', 'histograms'):
+                for series in snapshot[kind]:
+                    record = dict(series, type=kind[:-1], ts=timestamp, **context)
+                    f.write(json.dumps(record, default=str) + '\n')
+
+
+@register_sink('prometheus')
+class PrometheusTextSink:
+    """Writes the registry in Prometheus text format, replacing the file atomically"""
+
+    def __init__(self, path):
+        self.path = os.path.splitext(path)[0] + '.prom'
+
+    def write(self, snapshot, context):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(render_prometheus(snapshot, context))
+        os.replace(tmp_path, self.path)
+
+
+def _prom_name(name):
+    return 'etl_' + name.replace('.', '_').replace('-', '_')
+
+
+def _prom_labels(labels, context, le=None):
+    items = dict(context)
+    items.update(labels)
+    if le is not None:
+        items['le'] = le
+    if not items:
+        return ''
+    escaped = (str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for v in items.values())
+    return '{' + ','.join(f'{k}="{v}"' for k, v in zip(items, escaped)) + '}'
+
+
+def render_prometheus(snapshot=None, context=None):
+    """
+    Render a registry snapshot in the Prometheus text exposition format.
+
+    Context values (stage, run_id, ...) are added as labels unless the series
+    already carries a label of the same name.
+    """
+    snapshot = snapshot or registry.snapshot()
+    context = {k: v for k, v in (context or {}).items() if v is not None}
+    lines = []
+    declared = set()
+    for counter in snapshot['counters']:
+        name = _prom_name(counter['name'])
+        if name not in declared:
+            lines.append(f'# TYPE {name} counter')
+            declared.add(name)
+        lines.append(f"{name}{_prom_labels(counter['labels'], context)} {counter['value']}")
+    for histogram in snapshot['histograms']:
+        name = _prom_name(histogram['name'])
+        if name not in declared:
+            lines.append(f'# TYPE {name} histogram')
+            declared.add(name)
+        cumulative = 0
+        for bound, bucket_count in histogram['buckets'].items():
+            cumulative += bucket_count
+            lines.append(f"{name}_bucket{_prom_labels(histogram['labels'], context, le=bound)} {cumulative}")
+        lines.append(f"{name}_sum{_prom_labels(histogram['labels'], context)} {histogram['sum']}")
+        lines.append(f"{name}_count{_prom_labels(histogram['labels'], context)} {histogram['count']}")
+    return '\n'.join(lines) + '\n'
+
+
+def flush(context=None, sink=None):
+    """Write the current registry to the configured sink; never raises"""
+    try:
+        (sink or get_sink()).write(registry.snapshot(), context or {})
+    except Exception as e:
+        logger.warning(f"⚠ Could not write metrics: {e}")
+
+
+# ==================== DAG TASKS ====================
+def instrument_task(stage):
+    """
+    Decorator for DAG task callables.
+
+    Starts each task with an empty registry, times the callable as
+    task_seconds{stage}, logs a per-run summary to the task log and flushes
+    the metrics to the configured sink (also when the task fails). The
+    wrapped signature is preserved so Airflow still passes context kwargs.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            registry.reset()
+            status = 'success'
+            try:
+                with registry.timer('task_seconds', stage=stage):
+                    return func(*args, **kwargs)
+            except Exception:
+                status = 'failed'
+                raise
+            finally:
+                registry.incr('task_runs_total', stage=stage, status=status)
+                logger.info(f"📈 Metrics summary ({stage}):")
+                for line in registry.summary_lines():
+                    logger.info(line)
+                flush({'task': stage, 'run_id': kwargs.get('run_id') or os.getenv('AIRFLOW_CTX_DAG_RUN_ID')})
+        return wrapper
+    return decorator
+
+
+# ==================== HTTP ====================
+_http_session = None
+_http_lock = threading.Lock()
+
+
+def http_session():
+    """
+    Shared requests session that records latency per host.
+
+    Observes http_request_seconds{host,status} for every request and
+    counts http_errors_total{host} for requests that raise. Reusing one
+    session also keeps connections alive between calls to the same host.
+    """
+    global _http_session
+    with _http_lock:
+        if _http_session is None:
+            import requests
+
+            class InstrumentedSession(requests.Session):
+                def request(self, method, url, *args, **kwargs):
+                    host = urlparse(url).netloc
+                    start = time.perf_counter()
+                    try:
+                        response = super().request(method, url, *args, **kwargs)
+                    except Exception:
+                        registry.incr('http_errors_total', host=host)
+                        raise
+                    registry.observe('http_request_seconds', time.perf_counter() - start,
+                                     host=host, status=response.status_code)
+                    return response
+
+            _http_session = InstrumentedSession()
+    return _http_session
+
+
+# ==================== DATABASE ====================
+_cursor_factory = None
+
+
+def db_cursor_factory():
+    """
+    psycopg2 cursor class that records every statement.
+
+    Pass as connect(cursor_factory=...). Observes db_query_seconds{op} and
+    counts db_round_trips_total{op} and db_rows_total{op}, where op is the
+    statement's leading keyword (SELECT, INSERT, ...).
+    """
+    global _cursor_factory
+    if _cursor_factory is None:
+        from psycopg2.extensions import cursor
+
+        class InstrumentedCursor(cursor):
+            def execute(self, query, vars=None):
+                text = query.decode('utf-8', 'replace') if isinstance(query, bytes) else str(query)
+                words = text.lstrip().split(None, 1)
+                op = words[0].upper() if words else 'UNKNOWN'
+                if op == 'WITH':
+                    op = 'CTE'
+                start = time.perf_counter()
+                try:
+                    return super().execute(query, vars)
+                finally:
+                    registry.observe('db_query_seconds', time.perf_counter() - start, op=op)
+                    registry.incr('db_round_trips_total', op=op)
+                    if self.rowcount and self.rowcount > 0:
+                        registry.incr('db_rows_total', self.rowcount, op=op)
+
+        _cursor_factory = InstrumentedCursor
+    return _cursor_factory
@@ -0,0 +1,126 @@
+"""
+Keyset (cursor) pagination for the web app's list endpoints.
+
+Pages are read with `WHERE (sort_key, id) < (last_sort_key, last_id)
+ORDER BY sort_key DESC, id DESC LIMIT n` against a matching composite
+index, so every page costs the same no matter how deep the client has
+paged, unlike OFFSET. The position is handed to clients as an opaque
+continuation token (base64url JSON), and clients may restrict the
+returned columns with `fields=a,b,c`.
+"""
+
+import base64
+import binascii
+import json
+import os
+
+DEFAULT_PAGE_SIZE = int(os.getenv('API_DEFAULT_PAGE_SIZE', '50'))
+MAX_PAGE_SIZE = int(os.getenv('API_MAX_PAGE_SIZE', '500'))
+
+
+class PaginationError(ValueError):
+    """Bad limit, cursor or fields parameter; reported to the client as 400"""
+
+
+def encode_cursor(name, sort_value, key_value):
+    payload = json.dumps({'q': name, 'k': [sort_value, key_value]}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(name, token):
+    """Return (sort_value, key_value) from a token issued for the same query"""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        sort_value, key_value = payload['k']
+    except (binascii.Error, ValueError, KeyError, TypeError, UnicodeError):
+        raise PaginationError('Invalid cursor')
+    if payload.get('q') != name or not isinstance(key_value, int) or not isinstance(sort_value, (int, float)):
+        raise PaginationError('Invalid cursor')
+    return sort_value, key_value
+
+
+class KeysetQuery:
+    """
+    A paginated listing of one table, newest position first.
+
+    Args:
+        name: query name embedded in cursors (a cursor only works for its own query)
+        table: table to read
+        columns: columns clients may request
+        default_fields: columns returned when no fields parameter is given
+        sort: SQL expression to sort by (descending); must match the index
+        key: unique integer column breaking ties (descending)
+    """
+
+    def __init__(self, name, table, columns, default_fields, sort, key):
+        self.name = name
+        self.table = table
+        self.columns = list(columns)
+        self.default_fields = list(default_fields)
+        self.sort = sort
+        self.key = key
+
+    def parse(self, args):
+        """Validate request args; returns (limit, after, fields)"""
+        try:
+            limit = int(args.get('limit', DEFAULT_PAGE_SIZE))
+        except (TypeError, ValueError):
+            raise PaginationError('limit must be an integer')
+        if limit < 1:
+            raise PaginationError('limit must be positive')
+        limit = min(limit, MAX_PAGE_SIZE)
+
+        cursor = args.get('cursor')
+        after = decode_cursor(self.name, cursor) if cursor else None
+
+        fields = args.get('fields')
+        if fields:
+            fields = [field.strip() for field in fields.split(',') if field.strip()]
+            unknown = [field for field in fields if field not in self.columns]
+            if unknown:
+                raise PaginationError(f"Unknown fields: {', '.join(unknown)} (available: {', '.join(self.columns)})")
+        else:
+            fields = self.default_fields
+        return limit, after, fields
+
+    def build(self, limit, after, fields):
+        """SQL and params for one page; one extra row is fetched to detect a next page"""
+        selected = list(dict.fromkeys(fields + [self.key]))
+        params = {'limit': limit + 1}
+        where = ''
+        if after is not None:
+            where = f"WHERE ({self.sort}, {self.key}) < (%(after_sort)s, %(after_key)s)"
+            params.update(after_sort=after[0], after_key=after[1])
+        sql = f'''
+            SELECT {', '.join(selected)}, {self.sort} AS sort_key
+            FROM {self.table}
+            {where}
+            ORDER BY {self.sort} DESC, {self.key} DESC
+            LIMIT %(limit)s
+        '''
+        return sql, params
+
+    def export_sql(self, fields):
+        """SQL for the whole listing in page order (for streaming exports)"""
+        return f'''
+            SELECT {', '.join(fields)}
+            FROM {self.table}
+            ORDER BY {self.sort} DESC, {self.key} DESC
+        '''
+
+    def page(self, rows, limit, fields):
+        """
+        Shape fetched rows (dicts) into the response body.
+
+        Returns:
+            dict {items, next_cursor, limit} - next_cursor is None on the last page
+        """
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        next_cursor = None
+        if has_more and rows:
+            last = rows[-1]
+            next_cursor = encode_cursor(self.name, float(last['sort_key']), int(last[self.key]))
+        items = [{field: row[field] for field in fields} for row in rows]
+        return {'items': items, 'next_cursor': next_cursor, 'limit': limit}
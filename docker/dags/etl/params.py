@@ -0,0 +1,45 @@
+"""
+Query parameters of the endpoints backed by numpy modules (etl.costars,
+etl.similarity).
+
+Kept apart from those modules so web_app validates requests without
+importing numpy; the modules themselves are imported on first use.
+"""
+
+import os
+
+COSTAR_MAX_DEPTH = int(os.getenv('COSTAR_MAX_DEPTH', '8'))
+COLLABORATORS_DEFAULT_LIMIT = 10
+COLLABORATORS_MAX_LIMIT = int(os.getenv('COLLABORATORS_MAX_LIMIT', '100'))
+# Similar films stored per film (etl.similarity), so the most the endpoint returns
+SIMILAR_FILMS_K = int(os.getenv('SIMILAR_FILMS_K', '10'))
+
+
+class CostarError(ValueError):
+    """Bad query parameters; reported to the client as 400"""
+
+
+def parse_collaborators_limit(args):
+    """Validated ?limit= for the collaborators endpoint"""
+    try:
+        limit = int(args.get('limit', COLLABORATORS_DEFAULT_LIMIT))
+    except (TypeError, ValueError):
+        raise CostarError('limit must be an integer')
+    if limit < 1:
+        raise CostarError('limit must be positive')
+    return min(limit, COLLABORATORS_MAX_LIMIT)
+
+
+class SimilarityError(ValueError):
+    """Bad query parameters; reported to the client as 400"""
+
+
+def parse_similar_limit(args):
+    """Validated ?limit= for the similar films endpoint (at most the SIMILAR_FILMS_K stored)"""
+    try:
+        limit = int(args.get('limit', SIMILAR_FILMS_K))
+    except (TypeError, ValueError):
+        raise SimilarityError('limit must be an integer')
+    if limit < 1:
+        raise SimilarityError('limit must be positive')
+    return min(limit, SIMILAR_FILMS_K)
@@ -0,0 +1,369 @@
+"""
+Pipelined stage engine shared by run_pipeline.py, web_app.py and the DAG.
+
+Stages are connected by bounded queues, so a slow stage applies
+backpressure to the ones before it instead of letting work pile up in
+memory. Every stage runs `workers` threads that pull up to `batch_size`
+items at a time:
+
+    - 'thread' stages (HTTP calls, DB writes) run their function in the thread
+    - 'process' stages (CPU-bound sentiment scoring) hand each batch to a
+      shared process pool, the thread only waits for the result; metrics
+      the stage records in the worker process come back with the result and
+      are merged into this process's registry
+
+While Reddit is being queried for one film, the previous film is scored
+and the one before that is written, so end-to-end time approaches the
+slowest stage instead of the sum of all stages.
+"""
+
+import logging
+import multiprocessing
+import os
+import queue
+import threading
+import time
+
+from etl.metrics import count_items, observe, registry
+
+logger = logging.getLogger(__name__)
+
+# Default capacity of the queue in front of each stage
+PIPELINE_QUEUE_SIZE = int(os.getenv('PIPELINE_QUEUE_SIZE', '8'))
+# 'process' runs CPU stages in a process pool, 'thread' keeps them in threads
+PIPELINE_CPU_EXECUTOR = os.getenv('PIPELINE_CPU_EXECUTOR', 'process')
+# How pool workers are started. Not 'fork': callers (web workers) have other threads
+# that may hold a lock (metrics registry, HTTP sessions) at fork time, and a forked
+# child waiting on such a lock hangs forever
+PIPELINE_START_METHOD = os.getenv('PIPELINE_START_METHOD', 'forkserver')
+
+# Film pipeline stage settings
+COMMENT_LIMIT = int(os.getenv('PIPELINE_COMMENT_LIMIT', '50'))
+COMMENT_WORKERS = int(os.getenv('PIPELINE_COMMENT_WORKERS', '4'))
+SENTIMENT_WORKERS = int(os.getenv('PIPELINE_SENTIMENT_WORKERS', '2'))
+SENTIMENT_BATCH_SIZE = int(os.getenv('PIPELINE_SENTIMENT_BATCH_SIZE', '1'))
+LOAD_WORKERS = int(os.getenv('PIPELINE_LOAD_WORKERS', '1'))
+LOAD_BATCH_SIZE = int(os.getenv('PIPELINE_LOAD_BATCH_SIZE', '5'))
+
+# Marks the end of a stage's input
+_DONE = object()
+
+
+def _run_in_worker(func, batch):
+    """Pool-side wrapper of a 'process' stage: returns (results, metrics recorded by the batch)"""
+    # Drop what the worker recorded outside a batch (e.g. on import): only this batch is reported
+    registry.drain()
+    results = func(batch)
+    return results, registry.drain()
+
+
+class PipelineError(Exception):
+    """Raised by Pipeline.run when a stage failed; the original error is chained"""
+
+
+class Stage:
+    """
+    One step of a pipeline.
+
+    Args:
+        name: stage name used in logs, metrics and stats
+        func: callable taking a list of items and returning a list of output
+            items (any length). Functions of 'process' stages must be
+            module-level so they can be pickled.
+        kind: 'thread' for I/O-bound work, 'process' for CPU-bound work
+        workers: number of batches processed concurrently
+        batch_size: maximum items handed to func at once
+    """
+
+    def __init__(self, name, func, kind='thread', workers=1, batch_size=1):
+        if kind not in ('thread', 'process'):
+            raise ValueError(f"Unknown stage kind '{kind}' (expected 'thread' or 'process')")
+        self.name = name
+        self.func = func
+        self.kind = kind
+        self.workers = max(1, workers)
+        self.batch_size = max(1, batch_size)
+
+
+class Pipeline:
+    """
+    Runs items through a chain of stages connected by bounded queues.
+
+    Args:
+        stages: list of Stage, in order
+        queue_size: capacity of the queue in front of each stage
+        on_progress: optional callback(stage_name, stats) called after each batch
+    """
+
+    def __init__(self, stages, queue_size=None, on_progress=None):
+        self.stages = stages
+        self.queue_size = queue_size or PIPELINE_QUEUE_SIZE
+        self.on_progress = on_progress
+        self.stats = {}
+        self._lock = threading.Lock()
+        self._failed = threading.Event()
+        self._error = None
+
+    def _process_pool(self):
+        """Process pool for CPU stages, or None to run them in their threads"""
+        workers = sum(stage.workers for stage in self.stages if stage.kind == 'process')
+        if not workers or PIPELINE_CPU_EXECUTOR != 'process':
+            return None
+        from concurrent.futures import ProcessPoolExecutor
+        try:
+            context = multiprocessing.get_context(PIPELINE_START_METHOD)
+            pool = ProcessPoolExecutor(max_workers=workers, mp_context=context)
+            # Start the workers now: daemonic processes (some executors) cannot fork
+            pool.submit(abs, 0).result()
+            return pool
+        except Exception as e:
+            logger.warning(f"⚠ Process pool unavailable ({e}), running CPU stages in threads")
+            return None
+
+    def _fail(self, stage, error):
+        with self._lock:
+            if self._error is None:
+                self._error = (stage.name, error)
+        self._failed.set()
+        logger.error(f"❌ Pipeline stage '{stage.name}' failed: {error}")
+
+    def _feed(self, source, outbox):
+        try:
+            for item in source:
+                if self._failed.is_set():
+                    break
+                outbox.put(item)
+        except Exception as e:
+            self._fail(Stage('source', None), e)
+        finally:
+            outbox.put(_DONE)
+
+    @staticmethod
+    def _next_batch(inbox, batch_size):
+        """Block for one item, then take whatever else is ready up to batch_size"""
+        item = inbox.get()
+        if item is _DONE:
+            inbox.put(_DONE)
+            return [], True
+        batch = [item]
+        while len(batch) < batch_size:
+            try:
+                item = inbox.get(timeout=0.05)
+            except queue.Empty:
+                break
+            if item is _DONE:
+                inbox.put(_DONE)
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _work(self, stage, inbox, outbox, pool, remaining):
+        try:
+            done = False
+            while not done:
+                batch, done = self._next_batch(inbox, stage.batch_size)
+                # After a failure keep draining the input so upstream never blocks
+                if not batch or self._failed.is_set():
+                    continue
+                # Everything per batch (the stage, progress callback, hand-off) fails the
+                # stage rather than the thread: the _DONE below must always be sent
+                try:
+                    self._process_batch(stage, batch, outbox, pool)
+                except Exception as e:
+                    self._fail(stage, e)
+        finally:
+            with self._lock:
+                remaining[stage.name] -= 1
+                last = remaining[stage.name] == 0
+            if last:
+                outbox.put(_DONE)
+
+    def _process_batch(self, stage, batch, outbox, pool):
+        start = time.perf_counter()
+        if stage.kind == 'process' and pool is not None:
+            results, metrics = pool.submit(_run_in_worker, stage.func, batch).result()
+            registry.merge(metrics)
+        else:
+            results = stage.func(batch)
+        elapsed = time.perf_counter() - start
+        observe('pipeline_batch_seconds', elapsed, stage=stage.name)
+        count_items(f'pipeline_{stage.name}', len(batch))
+        with self._lock:
+            stats = self.stats[stage.name]
+            stats['items'] += len(batch)
+            stats['batches'] += 1
+            stats['busy_seconds'] += elapsed
+            snapshot = dict(stats)
+        if self.on_progress:
+            self.on_progress(stage.name, snapshot)
+        for result in results or []:
+            outbox.put(result)
+
+    def run(self, source):
+        """
+        Push every item of `source` through the stages.
+
+        Returns:
+            list of the last stage's outputs (order not guaranteed with
+            more than one worker per stage)
+
+        Raises:
+            PipelineError: when any stage (or the source) raised
+        """
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in self.stages]
+        queues.append(queue.Queue())
+        remaining = {stage.name: stage.workers for stage in self.stages}
+        self.stats = {
+            stage.name: {'kind': stage.kind, 'workers': stage.workers, 'items': 0, 'batches': 0, 'busy_seconds': 0.0}
+            for stage in self.stages
+        }
+        pool = self._process_pool()
+
+        threads = [threading.Thread(target=self._feed, args=(source, queues[0]), daemon=True)]
+        for index, stage in enumerate(self.stages):
+            for _ in range(stage.workers):
+                threads.append(threading.Thread(
+                    target=self._work,
+                    args=(stage, queues[index], queues[index + 1], pool, remaining),
+                    name=f'pipeline-{stage.name}',
+                    daemon=True,
+                ))
+
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+
+        outputs = []
+        try:
+            while True:
+                item = queues[-1].get()
+                if item is _DONE:
+                    break
+                outputs.append(item)
+            for thread in threads:
+                thread.join()
+        finally:
+            if pool is not None:
+                pool.shutdown()
+
+        elapsed = time.perf_counter() - start
+        for stats in self.stats.values():
+            stats['busy_seconds'] = round(stats['busy_seconds'], 3)
+        logger.info(f"✓ Pipeline finished in {elapsed:.2f}s | " + ' | '.join(
+            f"{name}: {stats['items']} items, {stats['busy_seconds']}s busy" for name, stats in self.stats.items()
+        ))
+
+        if self._error is not None:
+            stage_name, error = self._error
+            raise PipelineError(f"Stage '{stage_name}' failed: {error}") from error
+        return outputs
+
+
+# ==================== FILM PIPELINE ====================
+def fetch_comments_stage(films):
+    """I/O stage: attach Reddit comments to each film"""
+    from etl.reddit_extract import get_film_comments
+    return [dict(film, comments=get_film_comments(film['title'], limit=COMMENT_LIMIT)) for film in films]
+
+
+def score_sentiment_stage(films):
+    """CPU stage: deduplicate and score each film's comments, then drop them"""
+    from etl.dedup import dedupe_comments
+    from etl.sentiment import rate_comments_streaming
+
+    scored = []
+    for film in films:
+        film = dict(film)
+        dedup_result = dedupe_comments(film.pop('comments', None) or [])
+        sentiment_result = rate_comments_streaming(dedup_result['comments'])
+        film['sentiment_score'] = sentiment_result['average_score']
+        film['comments_count'] = sentiment_result['comments_count']
+        film['duplicates_dropped'] = dedup_result['dropped_exact'] + dedup_result['dropped_near']
+        scored.append(film)
+    return scored
+
+
+def load_stage(films):
+    """I/O stage: change-detecting load of a batch of films"""
+    from etl.load import sync_films
+    report = sync_films(films)
+    return [dict(report, films=films)]
+
+
+def run_film_pipeline(films=None, limit=5, load=True, on_progress=None, batch_name=None):
+    """
+    Extract and validate films, fetch and score their Reddit comments and (optionally) load them.
+
+    Args:
+        films: films to process; extracted with get_latest_films(limit) when None
+        limit: number of films to extract
+        load: whether to add the load stage (sync_films)
+        on_progress: optional callback(stage_name, stats) after each batch
+        batch_name: name of the quarantine file for rejected films
+            (default 'films_<timestamp>')
+
+    Returns:
+        dict with:
+            - films: processed films in extraction order, each with
+              sentiment_score, comments_count and duplicates_dropped
+            - validation: validate_films report (duplicates dropped, quarantined per check)
+            - load: summed sync_films counts (None when load=False)
+            - stages: per-stage stats {kind, workers, items, batches, busy_seconds}
+            - seconds: end-to-end wall time
+    """
+    start = time.perf_counter()
+    stats = {}
+    if films is None:
+        from etl.extract import get_latest_films
+        films = get_latest_films(limit=limit)
+        stats['extract'] = {
+            'kind': 'thread', 'workers': 1, 'items': len(films), 'batches': 1,
+            'busy_seconds': round(time.perf_counter() - start, 3)
+        }
+        if on_progress:
+            on_progress('extract', stats['extract'])
+
+    # Reject or drop rows that would fail or conflict in the load stage, before any work is spent on them
+    from etl.validate import validate_films, write_quarantine
+    validate_start = time.perf_counter()
+    validation = validate_films(films)
+    write_quarantine(validation['quarantined'], batch_name or f"films_{int(time.time())}")
+    films = validation['films']
+    stats['validate'] = {
+        'kind': 'thread', 'workers': 1, 'items': validation['report']['total'], 'batches': 1,
+        'busy_seconds': round(time.perf_counter() - validate_start, 3)
+    }
+    if on_progress:
+        on_progress('validate', stats['validate'])
+
+    stages = [
+        Stage('comments', fetch_comments_stage, 'thread', workers=COMMENT_WORKERS),
+        Stage('sentiment', score_sentiment_stage, 'process', workers=SENTIMENT_WORKERS, batch_size=SENTIMENT_BATCH_SIZE),
+    ]
+    if load:
+        stages.append(Stage('load', load_stage, 'thread', workers=LOAD_WORKERS, batch_size=LOAD_BATCH_SIZE))
+
+    pipeline = Pipeline(stages, on_progress=on_progress)
+    outputs = pipeline.run(films)
+    stats.update(pipeline.stats)
+
+    report = None
+    if load:
+        processed = [film for output in outputs for film in output['films']]
+        report = {
+            key: sum(output[key] for output in outputs)
+            for key in ('inserted', 'updated', 'unchanged', 'links_added', 'links_removed')
+        }
+    else:
+        processed = outputs
+
+    order = {film['imdb_id']: index for index, film in enumerate(films)}
+    processed.sort(key=lambda film: order.get(film['imdb_id'], len(order)))
+
+    return {
+        'films': processed,
+        'load': report,
+        'validation': validation['report'],
+        'stages': stats,
+        'seconds': round(time.perf_counter() - start, 3)
+    }
@@ -1,12 +1,20 @@
-import requests
 import logging
 from config import REDDIT_CLIENT_ID, REDDIT_CLIENT_SECRET, REDDIT_USER_AGENT
 import time
 
+from etl.metrics import count_items, http_session, timed
+
 logger = logging.getLogger(__name__)
 
+@timed('reddit_extract')
 def get_film_comments(movie_title, limit=50):
     """Get REAL Reddit comments from live API (no local/sample data)"""
+    comments = _get_film_comments(movie_title, limit)
+    count_items('reddit_extract', len(comments))
+    return comments
+
+
+def _get_film_comments(movie_title, limit):
     try:
         logger.info(f"📝 Fetching REAL Reddit comments for '{movie_title}'...")
         comments = []
@@ -43,7 +51,7 @@ def _get_authenticated_comments(movie_title, limit=50):
         token_url = 'https://www.reddit.com/api/v1/access_token'
         token_data = {'grant_type': 'client_credentials'}
         
-        token_response = requests.post(token_url, auth=auth, data=token_data, headers=headers, timeout=10)
+        token_response = http_session().post(token_url, auth=auth, data=token_data, headers=headers, timeout=10)
         
         if token_response.status_code != 200:
             logger.warning(f"Failed to get Reddit token: {token_response.status_code}")
@@ -61,7 +69,7 @@ def _get_authenticated_comments(movie_title, limit=50):
         }
         
         search_url = f"https://oauth.reddit.com/r/movies/search?q={movie_title}&sort=new&restrict_sr=on&limit=5"
-        search_response = requests.get(search_url, headers=auth_headers, timeout=10)
+        search_response = http_session().get(search_url, headers=auth_headers, timeout=10)
         
         if search_response.status_code != 200:
             logger.warning(f"Search failed: {search_response.status_code}")
@@ -77,7 +85,7 @@ def _get_authenticated_comments(movie_title, limit=50):
                 
                 if post_id:
                     comments_url = f"https://oauth.reddit.com/r/movies/comments/{post_id}?limit=10"
-                    comments_response = requests.get(comments_url, headers=auth_headers, timeout=10)
+                    comments_response = http_session().get(comments_url, headers=auth_headers, timeout=10)
                     
                     if comments_response.status_code == 200:
                         comments_data = comments_response.json()
@@ -117,7 +125,7 @@ def _get_anonymous_comments(movie_title, limit=50):
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
         }
         
-        response = requests.get(url, headers=headers, timeout=10)
+        response = http_session().get(url, headers=headers, timeout=10)
         
         if response.status_code == 200:
             data = response.json()
@@ -130,7 +138,7 @@ def _get_anonymous_comments(movie_title, limit=50):
                     if post_id:
                         # Get actual comments from this post
                         comments_url = f"https://www.reddit.com/r/movies/comments/{post_id}.json"
-                        comments_response = requests.get(comments_url, headers=headers, timeout=10)
+                        comments_response = http_session().get(comments_url, headers=headers, timeout=10)
                         
                         if comments_response.status_code == 200:
                             comments_data = comments_response.json()
@@ -173,7 +181,7 @@ def _get_alternative_sources(movie_title, limit=50):
         headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'}
         search_url = f"https://www.imdb.com/find?q={movie_title}&s=tt"
         
-        response = requests.get(search_url, headers=headers, timeout=10)
+        response = http_session().get(search_url, headers=headers, timeout=10)
         if response.status_code == 200:
             # Could parse IMDb reviews here if needed
             logger.info("✓ Checked IMDb for reviews")
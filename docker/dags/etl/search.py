@@ -0,0 +1,136 @@
+"""
+Fuzzy actor and film search for /api/search.
+
+Matching runs in Postgres on lower(name) / lower(title) through pg_trgm GIN
+indexes (see init.sql), which serve all three kinds of match with an index
+scan instead of a sequential one:
+
+    - prefix and substring: LIKE '%term%' (trigram-indexed)
+    - typos: word_similarity(term, name) above
+      pg_trgm.word_similarity_threshold (the <% operator)
+
+Results are ranked exact match > prefix > substring > fuzzy, then by
+word similarity, then shorter (closer) names first.
+"""
+
+import os
+
+SEARCH_DEFAULT_LIMIT = int(os.getenv('SEARCH_DEFAULT_LIMIT', '10'))
+SEARCH_MAX_LIMIT = int(os.getenv('SEARCH_MAX_LIMIT', '50'))
+SEARCH_MIN_LENGTH = 2
+SEARCH_MAX_LENGTH = 100
+
+SEARCH_TYPES = ('actor', 'film')
+
+
+class SearchError(ValueError):
+    """Bad search parameters; reported to the client as 400"""
+
+
+# One ranked branch per searchable type; each is limited on its own so the
+# planner can stop early, then the union is ranked again.
+_BRANCHES = {
+    'actor': '''
+        SELECT 'actor' AS type, a.actor_id AS id, a.name AS name,
+               r.average_rating AS rating, r.total_films AS films, NULL::int AS year,
+               {rank} AS rank, word_similarity(%(term)s, lower(a.name)) AS score
+        FROM actors a
+        LEFT JOIN actor_ratings r ON r.actor_id = a.actor_id
+        WHERE lower(a.name) LIKE %(contains)s OR %(term)s <%% lower(a.name)
+        ORDER BY rank DESC, score DESC, length(a.name), a.actor_id
+        LIMIT %(limit)s
+    ''',
+    'film': '''
+        SELECT 'film' AS type, f.film_id AS id, f.title AS name,
+               f.rating AS rating, NULL::int AS films, f.year AS year,
+               {rank} AS rank, word_similarity(%(term)s, lower(f.title)) AS score
+        FROM films f
+        WHERE lower(f.title) LIKE %(contains)s OR %(term)s <%% lower(f.title)
+        ORDER BY rank DESC, score DESC, length(f.title), f.film_id
+        LIMIT %(limit)s
+    ''',
+}
+
+_RANK = '''CASE WHEN lower({column}) = %(term)s THEN 3
+                    WHEN lower({column}) LIKE %(prefix)s THEN 2
+                    WHEN lower({column}) LIKE %(contains)s THEN 1
+                    ELSE 0 END'''
+
+_COLUMNS = {'actor': 'a.name', 'film': 'f.title'}
+
+
+def _escape_like(term):
+    return term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def normalize_term(term):
+    """Search form of a query: case-folded with whitespace collapsed"""
+    return ' '.join(term.split()).lower()
+
+
+def parse_search(args):
+    """
+    Validate request args.
+
+    Returns:
+        (term, types, limit)
+    """
+    term = normalize_term(args.get('q') or '')
+    if len(term) < SEARCH_MIN_LENGTH:
+        raise SearchError(f'q must be at least {SEARCH_MIN_LENGTH} characters')
+    term = term[:SEARCH_MAX_LENGTH]
+
+    requested = args.get('type') or 'all'
+    if requested == 'all':
+        types = list(SEARCH_TYPES)
+    elif requested in SEARCH_TYPES:
+        types = [requested]
+    else:
+        raise SearchError(f"type must be one of: all, {', '.join(SEARCH_TYPES)}")
+
+    try:
+        limit = int(args.get('limit', SEARCH_DEFAULT_LIMIT))
+    except (TypeError, ValueError):
+        raise SearchError('limit must be an integer')
+    if limit < 1:
+        raise SearchError('limit must be positive')
+    return term, types, min(limit, SEARCH_MAX_LIMIT)
+
+
+def build_search(term, types, limit):
+    """SQL and params for one ranked search across the given types"""
+    branches = [
+        '(' + _BRANCHES[kind].format(rank=_RANK.format(column=_COLUMNS[kind])) + ')'
+        for kind in types
+    ]
+    sql = f'''
+        SELECT type, id, name, rating, films, year, rank, score
+        FROM ({' UNION ALL '.join(branches)}) matches
+        ORDER BY rank DESC, score DESC, length(name), type, id
+        LIMIT %(limit)s
+    '''
+    escaped = _escape_like(term)
+    params = {
+        'term': term,
+        'prefix': escaped + '%',
+        'contains': '%' + escaped + '%',
+        'limit': limit,
+    }
+    return sql, params
+
+
+MATCH_KINDS = {3: 'exact', 2: 'prefix', 1: 'substring', 0: 'fuzzy'}
+
+
+def shape_results(rows):
+    """Turn result rows into the response items (match kind instead of the numeric rank)"""
+    items = []
+    for row in rows:
+        item = {'type': row['type'], 'id': row['id'], 'name': row['name'], 'rating': row['rating'],
+                'match': MATCH_KINDS[row['rank']], 'score': round(float(row['score']), 3)}
+        if row['type'] == 'actor':
+            item['films'] = row['films']
+        else:
+            item['year'] = row['year']
+        items.append(item)
+    return items
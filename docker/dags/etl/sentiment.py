@@ -1,34 +1,192 @@
-from textblob import TextBlob
 import logging
+import math
+import random
+
+from etl.metrics import count_items, timed, timer
+from etl.sentiment_backends import get_backend
 
 logger = logging.getLogger(__name__)
 
-def rate_comments(comments):
+# Number of comments handed to the backend in one score_batch call
+SCORE_BATCH_SIZE = 256
+
+def _comment_text(comment):
+    """Return the text of a comment given either a dict or a plain string"""
+    return comment.get('text', '') if isinstance(comment, dict) else str(comment)
+
+
+def _is_rateable(text):
+    """Texts of five characters or fewer carry no usable sentiment"""
+    return bool(text) and len(text.strip()) > 5
+
+
+def _to_score(polarity):
+    """Map a polarity in [-1, 1] onto the 0-100 scale"""
+    return int((polarity + 1) * 50)
+
+
+def _score_batch(scorer, batch):
+    """Score a batch, falling back to one-by-one so a bad text only drops itself"""
+    with timer('sentiment_batch_seconds', backend=scorer.name):
+        scored = _score_batch_untimed(scorer, batch)
+    count_items('sentiment', len(scored))
+    return scored
+
+
+def _score_batch_untimed(scorer, batch):
+    try:
+        return list(zip(batch, map(_to_score, scorer.score_batch(batch))))
+    except Exception as e:
+        logger.debug(f"Batch scoring failed, retrying per comment: {e}")
+    scored = []
+    for text in batch:
+        try:
+            scored.append((text, _to_score(scorer.score_batch([text])[0])))
+        except Exception as e:
+            logger.debug(f"Error processing comment: {e}")
+    return scored
+
+
+def _iter_scored(comments, backend=None):
+    """
+    Yield (text, score) for each rateable comment, scoring in batches.
+
+    Args:
+        comments: iterable of comment dicts with 'text' key (or plain strings)
+        backend: sentiment backend name; defaults to SENTIMENT_BACKEND
+    """
+    scorer = get_backend(backend)
+    batch = []
+    for comment in comments:
+        try:
+            text = _comment_text(comment)
+        except Exception as e:
+            logger.debug(f"Error processing comment: {e}")
+            continue
+        if _is_rateable(text):
+            batch.append(text)
+        if len(batch) >= SCORE_BATCH_SIZE:
+            yield from _score_batch(scorer, batch)
+            batch = []
+    if batch:
+        yield from _score_batch(scorer, batch)
+
+
+class SentimentAggregator:
+    """
+    Streaming sentiment aggregate that uses constant memory.
+
+    Keeps a running mean and variance (Welford), a fixed-bin histogram of
+    scores on the 0-100 scale and a reservoir sample of example comments,
+    so any number of comments can be fed through without being stored.
+
+    Args:
+        bins: number of equal-width histogram bins over 0-100
+        sample_size: maximum number of example comments kept
+        seed: optional seed for the reservoir sampler
+    """
+
+    def __init__(self, bins=10, sample_size=5, seed=None):
+        self.bins = bins
+        self.sample_size = sample_size
+        self.count = 0
+        self.total = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+        self.histogram = [0] * bins
+        self.sample = []
+        self._rng = random.Random(seed)
+
+    def add(self, text, score):
+        """Fold one scored comment into the aggregate"""
+        self.count += 1
+        self.total += score
+        delta = score - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (score - self.mean)
+
+        bin_index = min(int(score * self.bins / 100), self.bins - 1)
+        self.histogram[max(bin_index, 0)] += 1
+
+        # Reservoir sampling (Algorithm R): every comment has an equal chance to be kept
+        if len(self.sample) < self.sample_size:
+            self.sample.append({'text': text, 'sentiment_score': score})
+        else:
+            slot = self._rng.randrange(self.count)
+            if slot < self.sample_size:
+                self.sample[slot] = {'text': text, 'sentiment_score': score}
+
+    def consume(self, comments, backend=None):
+        """Score and fold every comment from an iterable; returns self"""
+        for text, score in _iter_scored(comments, backend):
+            self.add(text, score)
+        return self
+
+    @property
+    def variance(self):
+        return self._m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    @property
+    def stddev(self):
+        return math.sqrt(self.variance)
+
+    def result(self):
+        """Return the aggregate as a plain dict"""
+        return {
+            'average_score': int(self.total / self.count) if self.count else 0,
+            'comments_count': self.count,
+            'variance': round(self.variance, 2),
+            'stddev': round(self.stddev, 2),
+            'histogram': list(self.histogram),
+            'sample_comments': list(self.sample)
+        }
+
+
+@timed('sentiment')
+def rate_comments(comments, backend=None):
     """Analyze sentiment: 0-100"""
     if not comments:
         return 0
-    
-    scores = []
-    for comment in comments:
-        try:
-            text = comment.get('text', '') if isinstance(comment, dict) else str(comment)
-            if text and len(text.strip()) > 5:
-                sentiment = TextBlob(text).sentiment.polarity
-                score = int((sentiment + 1) * 50)
-                scores.append(score)
-        except:
-            pass
-    
-    return int(sum(scores) / len(scores)) if scores else 0
 
+    return SentimentAggregator(sample_size=0).consume(comments, backend).result()['average_score']
+
+
+@timed('sentiment')
+def rate_comments_streaming(comments, bins=10, sample_size=5, seed=None, backend=None):
+    """
+    Analyze sentiment over an iterator of comments in constant memory.
+
+    Args:
+        comments: iterable of comment dicts with 'text' key (or plain strings)
+        bins: number of histogram bins over the 0-100 scale
+        sample_size: number of example comments to keep
+        seed: optional seed for the reservoir sampler
+        backend: sentiment backend name; defaults to SENTIMENT_BACKEND
+
+    Returns:
+        dict with:
+            - average_score: overall sentiment (0-100)
+            - comments_count: number of comments scored
+            - variance / stddev: spread of the scores
+            - histogram: counts per score bin
+            - sample_comments: up to sample_size dicts {text, sentiment_score}
+    """
+    aggregator = SentimentAggregator(bins=bins, sample_size=sample_size, seed=seed)
+    return aggregator.consume(comments or [], backend).result()
 
-def rate_comments_with_details(comments):
+
+@timed('sentiment')
+def rate_comments_with_details(comments, backend=None):
     """
     Analyze sentiment and return comments with their individual scores.
-    
+
+    Keeps every comment in memory; use rate_comments_streaming when only
+    the aggregate is needed.
+
     Args:
         comments: list of comment dicts with 'text' key
-    
+        backend: sentiment backend name; defaults to SENTIMENT_BACKEND
+
     Returns:
         dict with:
             - average_score: overall sentiment (0-100)
@@ -36,27 +194,19 @@ def rate_comments_with_details(comments):
     """
     if not comments:
         return {'average_score': 0, 'comments_with_sentiment': []}
-    
+
     scores = []
     comments_with_sentiment = []
-    
-    for comment in comments:
-        try:
-            text = comment.get('text', '') if isinstance(comment, dict) else str(comment)
-            if text and len(text.strip()) > 5:
-                sentiment = TextBlob(text).sentiment.polarity
-                score = int((sentiment + 1) * 50)
-                scores.append(score)
-                comments_with_sentiment.append({
-                    'text': text,
-                    'sentiment_score': score
-                })
-        except Exception as e:
-            logger.debug(f"Error processing comment: {e}")
-            pass
-    
+
+    for text, score in _iter_scored(comments, backend):
+        scores.append(score)
+        comments_with_sentiment.append({
+            'text': text,
+            'sentiment_score': score
+        })
+
     average_score = int(sum(scores) / len(scores)) if scores else 0
-    
+
     return {
         'average_score': average_score,
         'comments_with_sentiment': comments_with_sentiment
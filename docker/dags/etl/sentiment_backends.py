@@ -0,0 +1,185 @@
+"""
+Sentiment backends - pluggable scorers behind a common batch interface.
+
+Every backend exposes score_batch(texts) returning one polarity in [-1, 1]
+per text. Backends are registered by name and the active one is picked
+with the SENTIMENT_BACKEND environment variable:
+
+    - lexicon:  pure-Python word lookup, fastest
+    - vader:    VADER-style rules (negation, boosters, caps, "but", "!")
+    - textblob: the original TextBlob scorer (imports NLTK on first use)
+"""
+
+import logging
+import math
+import os
+import re
+
+logger = logging.getLogger(__name__)
+
+SENTIMENT_BACKEND = os.getenv('SENTIMENT_BACKEND', 'textblob')
+
+_BACKENDS = {}
+_instances = {}
+
+_TOKEN_RE = re.compile(r"[A-Za-z][A-Za-z']*|!")
+
+# Valences on the VADER scale (-4 .. 4), tuned for movie discussion
+LEXICON = {
+    'amazing': 2.8, 'awesome': 3.1, 'beautiful': 2.9, 'best': 3.2, 'better': 1.9,
+    'brilliant': 2.8, 'classic': 1.8, 'enjoy': 2.2, 'enjoyed': 2.3, 'entertaining': 2.0,
+    'epic': 2.4, 'excellent': 2.7, 'fantastic': 2.6, 'favorite': 2.0, 'favourite': 2.0,
+    'fun': 2.3, 'funny': 1.9, 'gem': 2.3, 'good': 1.9, 'gorgeous': 2.9,
+    'great': 3.1, 'happy': 2.7, 'incredible': 2.6, 'interesting': 1.7, 'like': 1.5,
+    'liked': 1.8, 'love': 3.2, 'loved': 2.9, 'lovely': 2.8, 'masterpiece': 3.1,
+    'nice': 1.8, 'perfect': 2.7, 'powerful': 1.8, 'recommend': 1.5, 'solid': 1.6,
+    'strong': 1.3, 'stunning': 2.6, 'superb': 3.1, 'wonderful': 2.7, 'worth': 1.4,
+    'impressive': 2.2, 'memorable': 1.9, 'moving': 1.6, 'underrated': 1.1, 'wow': 2.8,
+    'phenomenal': 3.0, 'smart': 1.7,
+    'bad': -2.5, 'boring': -1.3, 'awful': -2.0, 'cringe': -2.0, 'disappointed': -1.9,
+    'disappointing': -2.2, 'dull': -1.7, 'forgettable': -1.5, 'garbage': -2.2, 'hate': -2.7,
+    'hated': -3.2, 'horrible': -2.5, 'lame': -1.8, 'mess': -1.5, 'mediocre': -1.4,
+    'meh': -0.8, 'overrated': -1.4, 'pointless': -1.6, 'poor': -2.1, 'sad': -2.1,
+    'shallow': -1.3, 'slow': -0.8, 'stupid': -2.4, 'terrible': -2.1, 'trash': -2.2,
+    'ugly': -2.3, 'waste': -1.8, 'weak': -1.9, 'worse': -2.1, 'worst': -3.1,
+    'annoying': -1.7, 'confusing': -1.3, 'predictable': -1.0, 'bland': -1.4, 'sucks': -1.5,
+}
+
+NEGATIONS = {
+    'not', 'no', 'never', 'none', 'nobody', 'nothing', 'neither', 'nor', 'without',
+    "don't", "doesn't", "didn't", "isn't", "wasn't", "aren't", "weren't", "can't",
+    "couldn't", "won't", "wouldn't", "shouldn't", 'dont', 'doesnt', 'didnt', 'isnt',
+    'wasnt', 'cant', 'wont', 'hardly', 'barely',
+}
+
+BOOSTERS = {
+    'absolutely': 0.293, 'completely': 0.293, 'extremely': 0.293, 'incredibly': 0.293,
+    'really': 0.293, 'so': 0.293, 'very': 0.293, 'totally': 0.293, 'truly': 0.293,
+    'most': 0.293, 'super': 0.293, 'utterly': 0.293,
+    'kinda': -0.293, 'slightly': -0.293, 'somewhat': -0.293,
+    'partly': -0.293, 'sort': -0.293,
+}
+
+
+def register_backend(name):
+    """Class decorator registering a backend under the given name"""
+    def decorator(cls):
+        _BACKENDS[name] = cls
+        cls.name = name
+        return cls
+    return decorator
+
+
+def available_backends():
+    """Return the names of all registered backends"""
+    return sorted(_BACKENDS)
+
+
+def get_backend(name=None):
+    """
+    Return a (cached) backend instance.
+
+    Args:
+        name: backend name; defaults to the SENTIMENT_BACKEND setting
+
+    Returns:
+        backend instance with a score_batch(texts) method
+    """
+    name = name or SENTIMENT_BACKEND
+    if name not in _BACKENDS:
+        raise ValueError(f"Unknown sentiment backend '{name}' (available: {', '.join(available_backends())})")
+    if name not in _instances:
+        _instances[name] = _BACKENDS[name]()
+        logger.info(f"✓ Using sentiment backend: {name}")
+    return _instances[name]
+
+
+@register_backend('textblob')
+class TextBlobBackend:
+    """Original TextBlob polarity; slow and imports NLTK on first use"""
+
+    def __init__(self):
+        from textblob import TextBlob
+        self._textblob = TextBlob
+
+    def score_batch(self, texts):
+        return [self._textblob(text).sentiment.polarity for text in texts]
+
+
+@register_backend('lexicon')
+class LexiconBackend:
+    """Mean valence of known words, no rules; cheapest backend"""
+
+    def score_batch(self, texts):
+        scores = []
+        for text in texts:
+            total = 0.0
+            hits = 0
+            for token in _TOKEN_RE.findall(text.lower()):
+                valence = LEXICON.get(token)
+                if valence is not None:
+                    total += valence
+                    hits += 1
+            scores.append(total / hits / 4.0 if hits else 0.0)
+        return scores
+
+
+@register_backend('vader')
+class VaderStyleBackend:
+    """
+    Rule-based scorer modelled on VADER.
+
+    Applies booster words, negation within the three previous tokens,
+    ALL-CAPS emphasis, "but" contrast and exclamation marks on top of the
+    shared lexicon, then normalizes the sum into [-1, 1].
+    """
+
+    ALPHA = 15.0
+    NEGATION_SCALAR = -0.74
+    CAPS_INCREMENT = 0.733
+
+    def score_batch(self, texts):
+        return [self._score(text) for text in texts]
+
+    def _score(self, text):
+        raw_tokens = _TOKEN_RE.findall(text)
+        tokens = [token.lower() for token in raw_tokens]
+        words = [token for token in raw_tokens if token != '!']
+        mixed_case = any(word.isupper() for word in words) and not all(word.isupper() for word in words)
+
+        sentiments = []
+        but_index = None
+        for i, token in enumerate(tokens):
+            if token == 'but' and but_index is None:
+                but_index = len(sentiments)
+            valence = LEXICON.get(token)
+            if valence is None:
+                continue
+
+            if mixed_case and raw_tokens[i].isupper() and len(raw_tokens[i]) > 1:
+                valence += self.CAPS_INCREMENT if valence > 0 else -self.CAPS_INCREMENT
+
+            for distance, previous in enumerate(reversed(tokens[max(0, i - 3):i])):
+                boost = BOOSTERS.get(previous)
+                if boost:
+                    boost *= (1.0, 0.95, 0.9)[distance]
+                    valence += boost if valence > 0 else -boost
+                if previous in NEGATIONS:
+                    valence *= self.NEGATION_SCALAR
+
+            sentiments.append(valence)
+
+        if not sentiments:
+            return 0.0
+
+        if but_index is not None:
+            sentiments = [s * 0.5 for s in sentiments[:but_index]] + [s * 1.5 for s in sentiments[but_index:]]
+
+        total = sum(sentiments)
+        exclamations = min(tokens.count('!'), 4) * 0.292
+        if total > 0:
+            total += exclamations
+        elif total < 0:
+            total -= exclamations
+
+        return total / math.sqrt(total * total + self.ALPHA)
@@ -0,0 +1,255 @@
+"""
+Similar films by shared cast (MinHash + LSH).
+
+Two films are similar when their casts overlap: Jaccard similarity
+|A ∩ B| / |A ∪ B| of their actor sets. Comparing every pair of films is
+quadratic, so candidates are found in near-linear time instead:
+
+1. MinHash: each cast is reduced to MINHASH_PERMUTATIONS minimum hash
+   values; two signatures agree in a position with probability equal to
+   the casts' Jaccard similarity
+2. LSH banding: signatures are cut into LSH_BANDS bands; films whose
+   values agree on a whole band land in the same bucket and become
+   candidates. A pair with similarity s is found with probability
+   1 - (1 - s^rows)^bands (rows = permutations / bands); with the default
+   64 bands of 2 rows that is 47% at s = 0.1, 93% at 0.2 and 99.8% at 0.3
+3. Every candidate is confirmed with its exact Jaccard similarity, and the
+   best SIMILAR_FILMS_K films (at least SIMILARITY_MIN_JACCARD) of each
+   film are written to the similar_films table in bulk
+"""
+
+import logging
+import os
+import time
+
+import numpy as np
+
+from etl.load import get_db_connection
+from etl.metrics import count_items, timed
+from etl.params import SIMILAR_FILMS_K
+
+logger = logging.getLogger(__name__)
+
+MINHASH_PERMUTATIONS = int(os.getenv('MINHASH_PERMUTATIONS', '128'))
+LSH_BANDS = int(os.getenv('LSH_BANDS', '64'))
+# Buckets with more films are skipped (such pairs almost always share other bands)
+LSH_MAX_BUCKET = int(os.getenv('LSH_MAX_BUCKET', '500'))
+SIMILARITY_MIN_JACCARD = float(os.getenv('SIMILARITY_MIN_JACCARD', '0.1'))
+SIMILAR_WRITE_BATCH = 50000
+
+MINHASH_SEED = 42
+# Links hashed at once (columns of the permutations x links hash matrix)
+_CHUNK_LINKS = 32768
+_EMPTY = np.array([], dtype=np.int64)
+
+
+def _segments(starts, sizes):
+    """Positions covered by the slices [start, start + size), concatenated"""
+    offsets = np.repeat(np.cumsum(sizes) - sizes, sizes)
+    return np.repeat(starts, sizes) + np.arange(int(sizes.sum())) - offsets
+
+
+def cast_sets(film_ids, actor_ids):
+    """
+    Casts in CSR form.
+
+    Returns:
+        (film ids, indptr, actor ids): films sorted, each cast sorted and without repeats
+    """
+    film_ids = np.asarray(film_ids, dtype=np.int64)
+    actor_ids = np.asarray(actor_ids, dtype=np.int64)
+    if not len(film_ids):
+        return _EMPTY, np.zeros(1, dtype=np.int64), _EMPTY
+    order = np.lexsort((actor_ids, film_ids))
+    film_ids, actor_ids = film_ids[order], actor_ids[order]
+    unique = np.r_[True, (film_ids[1:] != film_ids[:-1]) | (actor_ids[1:] != actor_ids[:-1])]
+    film_ids, actor_ids = film_ids[unique], actor_ids[unique]
+    starts = np.flatnonzero(np.r_[True, film_ids[1:] != film_ids[:-1]])
+    return film_ids[starts], np.append(starts, len(film_ids)).astype(np.int64), actor_ids
+
+
+def minhash_signatures(indptr, actor_ids, permutations=MINHASH_PERMUTATIONS, seed=MINHASH_SEED):
+    """
+    MinHash signature of every cast: the minimum of the multiply-shift hash
+    (a * actor_id + b) >> 32 (64-bit, odd a) over the cast, for `permutations`
+    random (a, b). Every cast must hold at least one actor.
+
+    Returns:
+        uint64 array (permutations, films); one row per permutation, so a
+        band is a contiguous block of rows
+    """
+    rng = np.random.default_rng(seed)
+    a = rng.integers(0, 1 << 63, permutations, dtype=np.uint64) << np.uint64(1) | np.uint64(1)
+    b = rng.integers(0, 1 << 63, permutations, dtype=np.uint64)
+    films = len(indptr) - 1
+    signatures = np.empty((permutations, films), dtype=np.uint64)
+
+    first = 0
+    while first < films:
+        # Whole films only, about _CHUNK_LINKS links per chunk
+        last = int(np.searchsorted(indptr, indptr[first] + _CHUNK_LINKS, side='right')) - 1
+        last = min(max(last, first + 1), films)
+        actors = actor_ids[indptr[first]:indptr[last]].astype(np.uint64)
+        # Wrapping uint64 arithmetic, in place: the hash matrix is the bulk of the work
+        hashes = a[:, None] * actors
+        hashes += b[:, None]
+        hashes >>= np.uint64(32)
+        signatures[:, first:last] = np.minimum.reduceat(hashes, indptr[first:last] - indptr[first], axis=1)
+        first = last
+    return signatures
+
+
+def lsh_candidates(signatures, bands=LSH_BANDS, max_bucket=LSH_MAX_BUCKET):
+    """
+    Film pairs sharing at least one LSH bucket.
+
+    Returns:
+        (left, right) film positions with left < right, each pair once
+    """
+    permutations, films = signatures.shape
+    rows = permutations // bands
+    found = []
+    skipped = 0
+    for band in range(bands):
+        # One 64-bit key per band (a collision only adds a candidate the exact check drops)
+        keys = np.zeros(films, dtype=np.uint64)
+        for row in signatures[band * rows:(band + 1) * rows]:
+            keys = keys * np.uint64(0x100000001B3) ^ row
+        # Order within a bucket does not matter: pairs are normalized and deduplicated below
+        order = np.argsort(keys)
+        keys = keys[order]
+        starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+        sizes = np.diff(np.append(starts, films))
+        skipped += int((sizes > max_bucket).sum())
+        shared = (sizes >= 2) & (sizes <= max_bucket)
+        starts, sizes = starts[shared], sizes[shared]
+        if not len(starts):
+            continue
+        # Each member pairs with the members after it in its bucket
+        members = _segments(starts, sizes)
+        later = np.repeat(starts + sizes, sizes) - members - 1
+        left = np.repeat(order[members], later)
+        right = order[_segments(members + 1, later)]
+        found.append(np.minimum(left, right) * films + np.maximum(left, right))
+    if skipped:
+        logger.warning(f"⚠ Skipped {skipped} LSH buckets larger than {max_bucket} films")
+    if not found:
+        return _EMPTY, _EMPTY
+    pairs = np.sort(np.concatenate(found))
+    pairs = pairs[np.r_[True, pairs[1:] != pairs[:-1]]]
+    return pairs // films, pairs % films
+
+
+def jaccard(indptr, actor_ids, left, right, chunk=100000):
+    """
+    Exact cast overlap of film pairs.
+
+    Returns:
+        (shared actors, Jaccard similarity) per pair
+    """
+    shared = np.zeros(len(left), dtype=np.int64)
+    width = int(actor_ids.max()) + 1 if len(actor_ids) else 1
+    for offset in range(0, len(left), chunk):
+        l, r = left[offset:offset + chunk], right[offset:offset + chunk]
+        l_sizes, r_sizes = indptr[l + 1] - indptr[l], indptr[r + 1] - indptr[r]
+        pair = np.arange(len(l), dtype=np.int64)
+        # Both casts of each pair, keyed (pair, actor): an actor in both casts appears twice
+        keys = np.concatenate([
+            np.repeat(pair, l_sizes) * width + actor_ids[_segments(indptr[l], l_sizes)],
+            np.repeat(pair, r_sizes) * width + actor_ids[_segments(indptr[r], r_sizes)],
+        ])
+        keys.sort()
+        repeated = keys[1:][keys[1:] == keys[:-1]]
+        shared[offset:offset + chunk] = np.bincount(repeated // width, minlength=len(l))
+    union = (indptr[left + 1] - indptr[left]) + (indptr[right + 1] - indptr[right]) - shared
+    return shared, np.where(union > 0, shared / np.maximum(union, 1), 0.0)
+
+
+def top_similar(left, right, shared, similarity, k=SIMILAR_FILMS_K, min_similarity=SIMILARITY_MIN_JACCARD):
+    """
+    The k most similar films of every film from scored pairs (both directions).
+
+    Returns:
+        (film, similar film, rank, shared actors, similarity) arrays, ranked
+        by similarity, then shared actors, then lower position
+    """
+    keep = similarity >= min_similarity
+    left, right, shared, similarity = left[keep], right[keep], shared[keep], similarity[keep]
+    films = np.concatenate([left, right])
+    others = np.concatenate([right, left])
+    shared = np.concatenate([shared, shared])
+    similarity = np.concatenate([similarity, similarity])
+
+    order = np.lexsort((others, -shared, -similarity, films))
+    films, others, shared, similarity = films[order], others[order], shared[order], similarity[order]
+    starts = np.flatnonzero(np.r_[True, films[1:] != films[:-1]]) if len(films) else _EMPTY
+    ranks = np.arange(len(films)) - np.repeat(starts, np.diff(np.append(starts, len(films)))) + 1
+    best = ranks <= k
+    return films[best], others[best], ranks[best], shared[best], similarity[best]
+
+
+def find_similar_films(film_ids, actor_ids):
+    """
+    Top SIMILAR_FILMS_K similar films per film from (film_id, actor_id) links.
+
+    Returns:
+        dict of arrays {film_id, similar_film_id, rank, shared_cast, similarity}
+    """
+    films, indptr, actors = cast_sets(film_ids, actor_ids)
+    start = time.perf_counter()
+    signatures = minhash_signatures(indptr, actors)
+    left, right = lsh_candidates(signatures)
+    shared, similarity = jaccard(indptr, actors, left, right)
+    film, other, rank, shared, similarity = top_similar(left, right, shared, similarity)
+    logger.info(f"✓ {len(films)} films: {len(left)} LSH candidate pairs, {len(film)} similar films kept "
+                f"in {(time.perf_counter() - start) * 1000:.0f}ms")
+    return {
+        'film_id': films[film],
+        'similar_film_id': films[other],
+        'rank': rank,
+        'shared_cast': shared,
+        'similarity': similarity,
+    }
+
+
+def write_similar_films(cursor, similar):
+    """Replace the similar_films table (in the caller's transaction); returns rows written"""
+    cursor.execute("DELETE FROM similar_films")
+    total = len(similar['film_id'])
+    for offset in range(0, total, SIMILAR_WRITE_BATCH):
+        batch = {field: values[offset:offset + SIMILAR_WRITE_BATCH] for field, values in similar.items()}
+        cursor.execute('''
+            INSERT INTO similar_films (film_id, similar_film_id, rank, shared_cast, similarity)
+            SELECT * FROM unnest(%s::int[], %s::int[], %s::smallint[], %s::int[], %s::float8[])
+        ''', (
+            batch['film_id'].tolist(),
+            batch['similar_film_id'].tolist(),
+            batch['rank'].tolist(),
+            batch['shared_cast'].tolist(),
+            np.round(batch['similarity'], 4).tolist(),
+        ))
+    return total
+
+
+@timed('similar_films')
+def compute_similar_films():
+    """Recompute similar films by shared cast for the whole catalog and store them"""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        logger.info("🎬 Finding similar films by shared cast...")
+        cursor.execute("SELECT film_id, actor_id FROM actor_film")
+        links = np.array(cursor.fetchall(), dtype=np.int64).reshape(-1, 2)
+        similar = find_similar_films(links[:, 0], links[:, 1])
+        written = write_similar_films(cursor, similar)
+        conn.commit()
+        count_items('similar_films', written)
+        logger.info(f"✓ Stored {written} similar-film rows")
+        return written
+    except Exception as e:
+        conn.rollback()
+        logger.error(f"❌ Error computing similar films: {e}")
+        raise
+    finally:
+        cursor.close()
+        conn.close()
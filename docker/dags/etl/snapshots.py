@@ -0,0 +1,176 @@
+"""
+Versioned leaderboard snapshots.
+
+At the end of each ratings run, calculate_actor_ratings() writes one
+immutable snapshot row per dataset version, in the same transaction as
+the version bump. The row is a gzip-compressed JSON document holding:
+
+    - leaderboard: the top `size` (SNAPSHOT_SIZE) actors with their rank
+    - stats: the headline counts shown by /api/stats
+    - cards: the actor detail document (ratings, filmography, co-star
+      counts) of every actor on the leaderboard
+
+Readers (the web app, the DAG report) fetch it with one primary-key
+lookup and need no ORDER BY ... LIMIT scans or joins. The newest
+SNAPSHOT_KEEP snapshots are kept.
+"""
+
+import gzip
+import json
+import logging
+import os
+import threading
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_SIZE = int(os.getenv('SNAPSHOT_SIZE', '100'))
+SNAPSHOT_KEEP = int(os.getenv('SNAPSHOT_KEEP', '5'))
+
+LEADERBOARD_QUERY = '''
+    SELECT actor_id, actor_name, total_films, average_rating, min_rating, max_rating, last_updated
+    FROM actor_ratings
+    ORDER BY COALESCE(average_rating, -1) DESC, actor_id DESC
+    LIMIT %(limit)s
+'''
+
+# Filmography and co-star counts of the leaderboard actors, in the same
+# shape as /api/actor/<id>
+CARDS_QUERY = '''
+    SELECT af.actor_id,
+           json_agg(json_build_object(
+               'film_id', f.film_id,
+               'imdb_id', f.imdb_id,
+               'title', f.title,
+               'rating', f.rating,
+               'year', f.year,
+               'co_stars', (SELECT COUNT(*) - 1 FROM actor_film c WHERE c.film_id = f.film_id)
+           ) ORDER BY f.year DESC NULLS LAST, f.film_id DESC) AS films,
+           (
+               SELECT COUNT(DISTINCT co.actor_id)
+               FROM actor_film own
+               JOIN actor_film co ON co.film_id = own.film_id AND co.actor_id <> own.actor_id
+               WHERE own.actor_id = af.actor_id
+           ) AS co_star_count
+    FROM actor_film af
+    JOIN films f ON f.film_id = af.film_id
+    WHERE af.actor_id = ANY(%(actor_ids)s)
+    GROUP BY af.actor_id
+'''
+
+
+def summarize_stats(table_stats):
+    """Headline counts from get_table_stats() output (the /api/stats document)"""
+    avg_rating = table_stats['actor_ratings']['average_rating']
+    return {
+        'total_films': table_stats['films']['row_count'],
+        'total_actors': table_stats['actors']['row_count'],
+        'rated_actors': table_stats['actor_ratings']['row_count'],
+        'average_actor_rating': round(float(avg_rating), 2) if avg_rating else 0
+    }
+
+
+def _rows(cursor):
+    columns = [column[0] for column in cursor.description]
+    return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+
+def build_snapshot(cursor, version, size=None):
+    """Read the leaderboard, stats and cards for a snapshot document"""
+    from etl.load import get_table_stats
+
+    cursor.execute(LEADERBOARD_QUERY, {'limit': size or SNAPSHOT_SIZE})
+    leaderboard = [dict(row, rank=rank) for rank, row in enumerate(_rows(cursor), 1)]
+
+    cursor.execute(CARDS_QUERY, {'actor_ids': [row['actor_id'] for row in leaderboard]})
+    extra = {row['actor_id']: row for row in _rows(cursor)}
+    cards = {}
+    for row in leaderboard:
+        card = {key: value for key, value in row.items() if key != 'rank'}
+        card['films'] = extra.get(row['actor_id'], {}).get('films') or []
+        card['co_star_count'] = extra.get(row['actor_id'], {}).get('co_star_count') or 0
+        cards[str(row['actor_id'])] = card
+
+    return {
+        'version': version,
+        'size': size or SNAPSHOT_SIZE,
+        'leaderboard': leaderboard,
+        'stats': summarize_stats(get_table_stats(cursor)),
+        'cards': cards,
+    }
+
+
+def encode_snapshot(snapshot):
+    from etl.streaming import json_default
+    body = json.dumps(snapshot, default=json_default, separators=(',', ':')).encode('utf-8')
+    return gzip.compress(body, mtime=0)
+
+
+def decode_snapshot(blob):
+    return json.loads(gzip.decompress(bytes(blob)))
+
+
+def write_snapshot(cursor, version, size=None):
+    """
+    Store the snapshot for a dataset version (call inside the transaction
+    that bumped it) and prune old ones.
+
+    Returns:
+        the snapshot document
+    """
+    snapshot = build_snapshot(cursor, version, size)
+    blob = encode_snapshot(snapshot)
+    cursor.execute(
+        "INSERT INTO leaderboard_snapshots (version, payload) VALUES (%s, %s) ON CONFLICT (version) DO NOTHING",
+        (version, blob)
+    )
+    cursor.execute('''
+        DELETE FROM leaderboard_snapshots
+        WHERE version NOT IN (SELECT version FROM leaderboard_snapshots ORDER BY version DESC LIMIT %s)
+    ''', (SNAPSHOT_KEEP,))
+    logger.info(f"📸 Snapshot {version}: {len(snapshot['leaderboard'])} actors, {len(blob)} bytes compressed")
+    return snapshot
+
+
+def read_snapshot(cursor, version=None):
+    """Snapshot document for a version (the newest when None), or None"""
+    if version is None:
+        cursor.execute("SELECT payload FROM leaderboard_snapshots ORDER BY version DESC LIMIT 1")
+    else:
+        cursor.execute("SELECT payload FROM leaderboard_snapshots WHERE version = %s", (version,))
+    row = cursor.fetchone()
+    return decode_snapshot(row[0]) if row else None
+
+
+class SnapshotStore:
+    """
+    The snapshot of the current dataset version, held in memory.
+
+    Loaded once per version with one primary-key lookup; a version without
+    a snapshot (e.g. before the first ratings run) is remembered as None so
+    callers fall back to live queries without asking again.
+
+    Args:
+        connection: context manager factory yielding a database connection
+    """
+
+    def __init__(self, connection):
+        self._connection = connection
+        self._version = None
+        self._snapshot = None
+        self._lock = threading.Lock()
+
+    def get(self, version):
+        if version is None:
+            return None
+        with self._lock:
+            if version == self._version:
+                return self._snapshot
+            try:
+                with self._connection() as conn:
+                    with conn.cursor() as cursor:
+                        snapshot = read_snapshot(cursor, version)
+            except Exception as e:
+                logger.warning(f"⚠ Could not read snapshot {version}: {e}")
+                return None
+            self._version, self._snapshot = version, snapshot
+            return snapshot
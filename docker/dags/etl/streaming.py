@@ -0,0 +1,84 @@
+"""
+Streaming JSON serialization for large query results.
+
+Rows are read from a server-side (named) cursor in batches of
+STREAM_ITERSIZE and encoded one by one into chunks of about
+STREAM_CHUNK_BYTES, so peak memory is bounded by one batch plus one chunk
+instead of DataFrame + list of dicts + full JSON string. orjson is used
+when installed; otherwise the standard json module with a default hook
+for Decimal and date/time values.
+"""
+
+import datetime
+import decimal
+import json
+import os
+import uuid
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+STREAM_ITERSIZE = int(os.getenv('STREAM_ITERSIZE', '2000'))
+STREAM_CHUNK_BYTES = int(os.getenv('STREAM_CHUNK_BYTES', str(64 * 1024)))
+
+
+def json_default(value):
+    """Encode the values psycopg2 returns that json cannot: Decimal, date, time, timedelta"""
+    if isinstance(value, decimal.Decimal):
+        return float(value)
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, datetime.timedelta):
+        return value.total_seconds()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+if orjson is not None:
+    def dumps(value):
+        """Serialize to UTF-8 JSON bytes"""
+        return orjson.dumps(value, default=json_default, option=orjson.OPT_NON_STR_KEYS)
+else:
+    _encoder = json.JSONEncoder(default=json_default, separators=(',', ':'), ensure_ascii=False)
+
+    def dumps(value):
+        """Serialize to UTF-8 JSON bytes"""
+        return _encoder.encode(value).encode('utf-8')
+
+
+def iter_rows(conn, sql, params=None, itersize=None):
+    """
+    Yield rows of a query as dicts from a server-side cursor.
+
+    Only `itersize` rows are held client-side at a time. The connection
+    must not be in autocommit mode (named cursors live in a transaction).
+    """
+    cursor = conn.cursor(name=f'stream_{uuid.uuid4().hex}')
+    cursor.itersize = itersize or STREAM_ITERSIZE
+    try:
+        cursor.execute(sql, params)
+        columns = None
+        for row in cursor:
+            if columns is None:
+                columns = [column[0] for column in cursor.description]
+            yield dict(zip(columns, row))
+    finally:
+        cursor.close()
+
+
+def json_array_chunks(rows, chunk_bytes=None):
+    """Encode an iterable of rows as one JSON array, yielded in byte chunks"""
+    chunk_bytes = chunk_bytes or STREAM_CHUNK_BYTES
+    buffer = bytearray(b'[')
+    first = True
+    for row in rows:
+        if not first:
+            buffer += b','
+        buffer += dumps(row)
+        first = False
+        if len(buffer) >= chunk_bytes:
+            yield bytes(buffer)
+            buffer.clear()
+    buffer += b']'
+    yield bytes(buffer)
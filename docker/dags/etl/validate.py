@@ -0,0 +1,167 @@
+"""
+Pre-load validation of an extracted film batch.
+
+Runs column-wise (pandas) over the whole batch before anything reaches
+Postgres, so rows that would make an upsert fail or conflict are dealt
+with up front instead of by a rolled-back transaction and a retry:
+
+    - rows with a missing or malformed imdb_id, a missing title, a
+      non-numeric rating or year, a rating outside 0-10, an implausible
+      year or no real cast are quarantined (a missing rating or year is
+      allowed and loaded as NULL)
+    - among the rows that pass those checks, exact repeats of a film (same
+      imdb_id and title) are dropped, and rows reusing another film's
+      imdb_id or title (both UNIQUE in films) are quarantined; the first
+      occurrence is kept, so a broken first copy never costs the film
+
+Placeholder and repeated names are removed from the casts of kept films.
+"""
+
+import datetime
+import json
+import logging
+import os
+import re
+import time
+
+logger = logging.getLogger(__name__)
+
+QUARANTINE_DIR = os.getenv('QUARANTINE_DIR', '/opt/airflow/data/quarantine')
+
+MIN_RATING = 0.0
+MAX_RATING = 10.0
+MIN_YEAR = 1888
+
+IMDB_ID_PATTERN = r'^tt\d{7,8}$'
+
+PLACEHOLDER_NAMES = {'', 'n/a', 'na', 'none', 'null', 'unknown', 'tbd', 'tba', 'various', 'cast', '-'}
+
+
+def _clean_casts(actors):
+    """Strip names, drop placeholders and repeats; returns a list per row (vectorized via explode)"""
+    import pandas as pd
+
+    exploded = actors.apply(lambda value: value if isinstance(value, (list, tuple)) else []).explode()
+    names = exploded.dropna().astype(str).str.strip()
+    names = names[~names.str.lower().isin(PLACEHOLDER_NAMES)]
+    names = names[~names.reset_index().duplicated().to_numpy()]
+    cleaned = names.groupby(level=0).agg(list)
+    return pd.Series([cleaned.get(index, []) for index in actors.index], index=actors.index, dtype=object)
+
+
+def _present(values):
+    """Values that are given at all: not None/NaN and not a blank string"""
+    return values.notna() & (values.astype(str).str.strip() != '')
+
+
+def validate_films(films):
+    """
+    Validate and deduplicate a batch of extracted films.
+
+    Args:
+        films: list of dicts with keys {imdb_id, title, rating, year, actors}
+
+    Returns:
+        dict with:
+            - films: valid films in their original order (casts cleaned)
+            - quarantined: list of {'film', 'reasons'} for rejected rows
+            - report: counts per check (duplicates_dropped and one key per reason)
+    """
+    import pandas as pd
+
+    films = list(films or [])
+    report = {'total': len(films), 'valid': 0, 'duplicates_dropped': 0, 'quarantined': 0}
+    if not films:
+        return {'films': [], 'quarantined': [], 'report': report}
+
+    df = pd.DataFrame.from_records(films, columns=['imdb_id', 'title', 'rating', 'year', 'actors'])
+    imdb_ids = df['imdb_id'].fillna('').astype(str).str.strip()
+    titles = df['title'].fillna('').astype(str).str.strip()
+    ratings = pd.to_numeric(df['rating'], errors='coerce')
+    years = pd.to_numeric(df['year'], errors='coerce')
+    casts = _clean_casts(df['actors'])
+    max_year = datetime.date.today().year + 2
+
+    checks = {
+        'missing_imdb_id': imdb_ids == '',
+        'bad_imdb_id': (imdb_ids != '') & ~imdb_ids.str.match(IMDB_ID_PATTERN),
+        'missing_title': titles == '',
+        # Given but unparseable ("N/A", "8.x"): to_numeric turned it into NaN
+        'rating_not_numeric': _present(df['rating']) & ratings.isna(),
+        'year_not_numeric': _present(df['year']) & years.isna(),
+        'rating_out_of_range': ratings.notna() & ~ratings.between(MIN_RATING, MAX_RATING),
+        'year_out_of_range': years.notna() & ~years.between(MIN_YEAR, max_year),
+        'empty_cast': casts.str.len() == 0,
+    }
+
+    # Duplicates are only looked for among rows passing every other check, so a
+    # quarantined first occurrence does not make a later valid copy a "duplicate"
+    passed = ~pd.DataFrame(checks).any(axis=1)
+
+    def duplicated(frame):
+        """Rows of frame repeating an earlier passed row (never true for rows that failed)"""
+        return frame[passed].duplicated(keep='first').reindex(frame.index, fill_value=False)
+
+    # Exact repeats of an earlier row are dropped, not quarantined
+    repeated = duplicated(pd.DataFrame({'imdb_id': imdb_ids, 'title': titles}))
+    report['duplicates_dropped'] = int(repeated.sum())
+
+    # Conflicts on the UNIQUE columns among the remaining rows; the first row wins
+    unique_rows = ~repeated
+    checks['duplicate_imdb_id'] = duplicated(imdb_ids.to_frame())
+    checks['duplicate_title'] = duplicated(titles.to_frame())
+
+    failed = pd.DataFrame(checks)
+    bad = failed.any(axis=1) & unique_rows
+    keep = ~bad & unique_rows
+
+    quarantined = []
+    for index in failed.index[bad]:
+        reasons = [check for check in checks if failed.at[index, check]]
+        quarantined.append({'film': films[index], 'reasons': reasons})
+    for check in checks:
+        report[check] = int((failed[check] & unique_rows).sum())
+
+    valid = []
+    for index in df.index[keep]:
+        film = dict(films[index])
+        film['imdb_id'] = imdb_ids[index]
+        film['title'] = titles[index]
+        film['rating'] = None if pd.isna(ratings[index]) else float(ratings[index])
+        film['year'] = None if pd.isna(years[index]) else int(years[index])
+        film['actors'] = casts[index]
+        valid.append(film)
+
+    report['valid'] = len(valid)
+    report['quarantined'] = len(quarantined)
+    if quarantined or report['duplicates_dropped']:
+        logger.warning(f"⚠ Validation: kept {len(valid)}/{len(films)} films, "
+                       f"{report['duplicates_dropped']} duplicates dropped, {len(quarantined)} quarantined")
+        for entry in quarantined:
+            logger.warning(f"  ✗ {entry['film'].get('title')!r} ({entry['film'].get('imdb_id')}): {', '.join(entry['reasons'])}")
+    else:
+        logger.info(f"✓ Validation: all {len(valid)} films passed")
+
+    return {'films': valid, 'quarantined': quarantined, 'report': report}
+
+
+def write_quarantine(quarantined, name):
+    """
+    Append quarantined rows to a JSON Lines file under QUARANTINE_DIR.
+
+    Returns:
+        path of the file, or None when there was nothing to write or it failed
+    """
+    if not quarantined:
+        return None
+    try:
+        os.makedirs(QUARANTINE_DIR, exist_ok=True)
+        path = os.path.join(QUARANTINE_DIR, f"{re.sub(r'[^A-Za-z0-9_.-]+', '_', name)}.jsonl")
+        with open(path, 'a', encoding='utf-8') as f:
+            for entry in quarantined:
+                f.write(json.dumps(dict(entry, quarantined_at=time.time()), default=str) + '\n')
+        logger.info(f"✓ Quarantined {len(quarantined)} films to {path}")
+        return path
+    except OSError as e:
+        logger.warning(f"⚠ Could not write quarantine file: {e}")
+        return None
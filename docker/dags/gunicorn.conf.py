@@ -0,0 +1,46 @@
+"""
+Gunicorn settings for serving the web app in production.
+
+    gunicorn -c gunicorn.conf.py
+
+The application is imported once in the master (preload_app) and the
+workers are forked from it. Connection pools, the dataset-version listener
+and the job worker are all created lazily, so each worker opens its own
+after the fork. Every setting can be overridden through the environment
+(see "Serving" in README.md for sizing):
+
+    WEB_ASYNC=1        serve the JSON read endpoints from asgi_app (asyncpg) under
+                       uvicorn workers; everything else still goes to the Flask app
+    WEB_WORKERS        worker processes (default: 2 x CPUs + 1)
+    WEB_THREADS        threads per sync (gthread) worker (default: 4)
+"""
+
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '5000')}"
+
+workers = int(os.getenv('WEB_WORKERS', str(multiprocessing.cpu_count() * 2 + 1)))
+
+if os.getenv('WEB_ASYNC', '').lower() in ('1', 'true', 'yes'):
+    wsgi_app = 'asgi_app:application'
+    worker_class = 'uvicorn.workers.UvicornWorker'
+else:
+    wsgi_app = 'web_app:app'
+    worker_class = 'gthread'
+    threads = int(os.getenv('WEB_THREADS', '4'))
+
+preload_app = True
+
+# Long exports stream for a while; keep-alive lets clients and proxies reuse connections
+timeout = int(os.getenv('WEB_TIMEOUT', '120'))
+graceful_timeout = 30
+keepalive = int(os.getenv('WEB_KEEPALIVE', '5'))
+
+# Off by default: recycling a worker would also end a pipeline job it is running
+max_requests = int(os.getenv('WEB_MAX_REQUESTS', '0'))
+max_requests_jitter = max_requests // 10
+
+accesslog = os.getenv('WEB_ACCESS_LOG', None) or None
+errorlog = '-'
+loglevel = os.getenv('WEB_LOG_LEVEL', 'info')
@@ -1,7 +1,6 @@
 from etl.extract import get_latest_films
-from etl.reddit_extract import get_film_comments
-from etl.sentiment import rate_comments_with_details
-from etl.load import save_film, save_actor
+from etl.pipeline import run_film_pipeline
+from etl.metrics import flush, registry
 import logging
 
 logging.basicConfig(level=logging.INFO, format='%(message)s')
@@ -25,32 +24,29 @@ def run_pipeline():
     for i, film in enumerate(films, 1):
         print(f"  {i}. {film['title']} ({film['rating']}/10)")
 
-    # Get Reddit comments and calculate scores
-    print(f"\n[STEP 2] Analyzing Reddit sentiment...")
-    for film in films:
-        title = film['title']
-        print(f"  {title}...", end=" ", flush=True)
-        
-        comments = get_film_comments(title, limit=50)
-        
-        # Get sentiment scores with comment details
-        sentiment_result = rate_comments_with_details(comments)
-        reddit_score = sentiment_result['average_score']
-        comments_with_sentiment = sentiment_result['comments_with_sentiment']
-        
-        # Save film to database
-        film_id = save_film({
-            'imdb_id': film['imdb_id'],
-            'title': title,
-            'rating': film['rating'],
-            'year': film['year']
-        })
-        
-        # Save actors
-        for actor in film.get('actors', []):
-            save_actor(actor)
-        
-        print(f"Saved: {title} | Rating: {film['rating']}/10")
+    # Fetch Reddit comments, score sentiment and save to the database as
+    # overlapping stages; unchanged films are skipped by the load stage
+    print(f"\n[STEP 2] Analyzing Reddit sentiment and saving to database...")
+    result = run_film_pipeline(films=films)
+    validation = result['validation']
+    print(f"  Validated: {validation['valid']} valid, {validation['duplicates_dropped']} duplicates dropped, "
+          f"{validation['quarantined']} quarantined")
+    for film in result['films']:
+        print(f"  Rated: {film['title']} | Rating: {film['rating']}/10 | "
+              f"Sentiment: {film['sentiment_score']}/100 | Duplicates dropped: {film['duplicates_dropped']}")
+
+    report = result['load']
+    print(f"\n[STEP 3] Database:")
+    print(f"  Films: {report['inserted']} inserted, {report['updated']} updated, {report['unchanged']} unchanged")
+    print(f"  Links: +{report['links_added']} / -{report['links_removed']}")
+
+    print(f"\n[METRICS] Stages (end-to-end {result['seconds']}s):")
+    for name, stats in result['stages'].items():
+        print(f"  {name:<10} {stats['items']} items in {stats['batches']} batches, "
+              f"{stats['busy_seconds']}s busy ({stats['workers']} {stats['kind']} workers)")
+    for line in registry.summary_lines():
+        print(line)
+    flush({'task': 'run_pipeline'})
 
     print("\n" + "="*60)
     print("COMPLETED!")
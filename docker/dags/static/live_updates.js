@@ -0,0 +1,88 @@
+// Live updates pushed over server-sent events (/api/events).
+// Browsers without EventSource, and pages whose stream the server refused
+// (503 when a worker has no thread to spare), fall back to polling the job status URL.
+const LiveUpdates = (function () {
+    let live = typeof EventSource !== 'undefined';
+    const handlers = {job: [], leaderboard: []};
+    const fallbacks = [];
+    let source = null;
+
+    function connect() {
+        if (source || !live) return;
+        // EventSource reconnects by itself and resumes with Last-Event-ID
+        source = new EventSource('/api/events');
+        Object.keys(handlers).forEach(name => {
+            source.addEventListener(name, e => {
+                const data = JSON.parse(e.data);
+                handlers[name].slice().forEach(handler => handler(data));
+            });
+        });
+        source.addEventListener('error', () => {
+            // CLOSED means the server refused the stream (network errors reconnect instead)
+            if (source.readyState !== EventSource.CLOSED) return;
+            source = null;
+            live = false;
+            fallbacks.splice(0).forEach(fallback => fallback());
+        });
+    }
+
+    function on(name, handler) {
+        handlers[name].push(handler);
+        connect();
+        return () => { handlers[name] = handlers[name].filter(h => h !== handler); };
+    }
+
+    function isFinished(job) {
+        return job.status === 'succeeded' || job.status === 'failed';
+    }
+
+    function pollJob(statusUrl, onProgress) {
+        return fetch(statusUrl)
+            .then(r => r.json())
+            .then(job => {
+                if (onProgress) onProgress(job);
+                if (isFinished(job)) return job;
+                return new Promise(resolve => setTimeout(resolve, 1000))
+                    .then(() => pollJob(statusUrl, onProgress));
+            });
+    }
+
+    function waitForJob(statusUrl, onProgress) {
+        // Resolves with the finished job; progress arrives as 'job' events
+        if (!live) return pollJob(statusUrl, onProgress);
+        const jobId = statusUrl.split('/').pop();
+        return new Promise((resolve, reject) => {
+            let seen = false;
+            let done = false;
+            let off = null;
+            const update = job => {
+                if (done) return;
+                if (onProgress) onProgress(job);
+                if (isFinished(job)) {
+                    done = true;
+                    if (off) off();
+                    resolve(job);
+                }
+            };
+            off = on('job', job => {
+                if (job.job_id !== jobId) return;
+                seen = true;
+                update(job);
+            });
+            // No stream after all: finish by polling
+            fallbacks.push(() => {
+                if (done) return;
+                off();
+                pollJob(statusUrl, update).catch(reject);
+            });
+            // The job may have moved on before the stream connected: read its state once
+            fetch(statusUrl)
+                .then(r => r.json())
+                .then(job => { if (!seen || isFinished(job)) update(job); })
+                .catch(reject);
+        });
+    }
+
+    // `live` is read when a job finishes: false once the stream was refused
+    return {get live() { return live; }, on: on, waitForJob: waitForJob};
+})();
@@ -5,11 +5,13 @@ Comprehensive multi-step pipeline for complete actor rating workflow.
 Pipeline Flow:
 1. Initialize Database: Execute init.sql to set up/reset schema with M2M relationships
 2. Validate Database: Check database connectivity and schema creation
-3. Extract Films: Fetch trending films from IMDb with cast info
-4. Save Each Film: Insert/update film records with unique constraints
-5. Save Actors: Insert/update actor records with unique constraints
-6. Link Actors to Films: Create many-to-many relationships for each actor-film pair
+3. Extract Films: Fetch trending films from IMDb with cast info and score their Reddit sentiment
+   Chunk Films: Split films into chunks for dynamic task mapping
+4. Save Films: Insert/update film records per chunk (mapped, parallel)
+5. Save Actors: Insert/update actor records per chunk (mapped, parallel)
+6. Link Actors to Films: Reduce all chunks and create the many-to-many links
 7. Validate Data: Check data integrity after loading
+   Similar Films: Find similar films by shared cast (MinHash + LSH)
 8. Calculate Actor Ratings: Aggregate ratings based on filmography
 9. Generate Report: Display top-rated actors and statistics
 """
@@ -22,19 +24,22 @@ from datetime import datetime, timedelta
 import sys
 import os
 import logging
-import psycopg2
-from psycopg2 import sql
 
 # Add the dags folder to Python path
 sys.path.insert(0, '/opt/airflow/dags')
 
-# Import ETL modules
-from etl.extract import get_latest_films
-from etl.load import save_film, save_actor, link_actor_to_film, get_db_connection
-from etl.calculate_actor_ratings import calculate_actor_ratings
+# ETL modules (requests, bs4, psycopg2, ...) are imported inside the task
+# callables: the scheduler re-parses this file continually and only needs
+# the DAG structure, not the task dependencies.
+# etl.metrics is standard-library only and safe to import here.
+from etl.metrics import instrument_task
 
 logger = logging.getLogger(__name__)
 
+# Films per mapped load task and how many of those may run at once
+FILM_CHUNK_SIZE = int(os.getenv('FILM_CHUNK_SIZE', '5'))
+LOAD_PARALLELISM = int(os.getenv('LOAD_PARALLELISM', '4'))
+
 # DAG configuration
 default_args = {
     'owner': 'data-engineer',
@@ -66,6 +71,7 @@ init_database = BashOperator(
 
 
 # ==================== OPERATION 2: VALIDATE DATABASE CONNECTION ====================
+@instrument_task('validate_database')
 def validate_database_task():
     """
     Operation 2: Validate database connectivity and schema
@@ -77,36 +83,34 @@ def validate_database_task():
     logger.info("OPERATION 2: VALIDATING DATABASE")
     logger.info("=" * 80)
     
+    from etl.load import get_db_connection, get_table_stats
+    
     try:
         conn = get_db_connection()
         cursor = conn.cursor()
         
         # Check if tables exist
-        tables_to_check = ['films', 'actors', 'actor_film', 'actor_ratings', 'recommendations']
+        tables_to_check = ['films', 'actors', 'actor_film', 'actor_ratings', 'recommendations', 'table_stats']
         logger.info(f"🔍 Checking for {len(tables_to_check)} required tables...")
         
-        # Use simple approach: just check each table individually
-        existing_tables = []
+        cursor.execute(
+            "SELECT table_name FROM information_schema.tables WHERE table_schema = 'public' AND table_name = ANY(%s)",
+            (tables_to_check,)
+        )
+        existing_tables = {row[0] for row in cursor.fetchall()}
         for table in tables_to_check:
-            try:
-                cursor.execute(f"SELECT 1 FROM information_schema.tables WHERE table_schema = 'public' AND table_name = %s", (table,))
-                if cursor.fetchone():
-                    existing_tables.append(table)
-                    logger.info(f"  ✓ Table '{table}' exists")
-                else:
-                    logger.warning(f"  ⚠ Table '{table}' NOT FOUND")
-            except Exception as e:
-                logger.warning(f"  ⚠ Could not check table '{table}': {e}")
-        
-        # Get row counts
+            if table in existing_tables:
+                logger.info(f"  ✓ Table '{table}' exists")
+            else:
+                logger.warning(f"  ⚠ Table '{table}' NOT FOUND")
+        
+        # Get row counts (trigger-maintained, no table scans)
         logger.info("\n📊 Current data in tables:")
-        for table in ['films', 'actors', 'actor_film', 'actor_ratings']:
-            try:
-                cursor.execute(f'SELECT COUNT(*) FROM {table}')
-                count = cursor.fetchone()[0]
-                logger.info(f"  - {table}: {count} rows")
-            except Exception as e:
-                logger.warning(f"  - {table}: Could not get count - {e}")
+        try:
+            for table, table_stats in get_table_stats(cursor).items():
+                logger.info(f"  - {table}: {table_stats['row_count']} rows")
+        except Exception as e:
+            logger.warning(f"  - Could not get counts - {e}")
         
         logger.info("✓ Database validation complete!")
         cursor.close()
@@ -127,25 +131,46 @@ validate_database = PythonOperator(
 
 
 # ==================== OPERATION 3: EXTRACT FILMS ====================
-def extract_films_task():
+@instrument_task('extract_films')
+def extract_films_task(run_id):
     """
-    Operation 3: Extract trending films from IMDb
+    Operation 3: Extract trending films from IMDb and score their Reddit sentiment
     - Fetch films with titles, ratings, years, and cast lists
-    - Return data for next operations
+    - Validate the batch column-wise; duplicates are dropped and bad rows
+      quarantined before anything is loaded
+    - Fetch and score Reddit comments through the pipelined stage engine
+      (comment fetching overlaps with scoring)
+    - Write them once to a Parquet file on the shared volume
+    - Return only a small reference through XCom for next operations
     """
     logger.info("=" * 80)
     logger.info("OPERATION 3: EXTRACTING FILMS FROM IMDB")
     logger.info("=" * 80)
     
+    from etl.extract import get_latest_films
+    from etl.handoff import write_batch
+    from etl.pipeline import run_film_pipeline
+    
     try:
         films = get_latest_films(limit=10)
-        logger.info(f"✓ Extracted {len(films)} trending films:\n")
+        logger.info(f"✓ Extracted {len(films)} trending films")
+        
+        # Validation runs first inside the engine; loading happens in the mapped
+        # tasks below, so the engine runs without its load stage
+        result = run_film_pipeline(films=films, load=False, batch_name=f"films_{run_id}")
+        films = result['films']
+        logger.info(f"✓ Validated: {result['validation']['valid']} valid, "
+                    f"{result['validation']['duplicates_dropped']} duplicates dropped, "
+                    f"{result['validation']['quarantined']} quarantined")
+        logger.info("✓ Scored Reddit sentiment:\n")
         
         for i, film in enumerate(films, 1):
             actor_count = len(film.get('actors', []))
-            logger.info(f"  {i}. {film['title']} ({film['year']}) - Rating: {film['rating']}/10 - Cast: {actor_count} actors")
+            logger.info(f"  {i}. {film['title']} ({film['year']}) - Rating: {film['rating']}/10 - Cast: {actor_count} actors "
+                        f"- Sentiment: {film['sentiment_score']}/100 ({film['comments_count']} comments)")
         
-        return films
+        # One row group per chunk: each mapped load task decodes only its own films
+        return write_batch(films, name=f"films_{run_id}", row_group_size=FILM_CHUNK_SIZE)
     except Exception as e:
         logger.error(f"❌ Error extracting films: {e}")
         raise
@@ -158,96 +183,147 @@ extract_films = PythonOperator(
 )
 
 
+# ==================== OPERATION 3b: SPLIT FILMS INTO CHUNKS ====================
+@instrument_task('chunk_films')
+def chunk_films_task(ti):
+    """
+    Operation 3b: Split the extracted films into chunks for parallel loading
+    - Each chunk becomes one mapped save_films / save_actors task instance
+    - Chunks are retried independently, so one slow or failing film only
+      holds up its own chunk
+    - Chunks are row ranges of the hand-off file, not copies of the films
+    """
+    ref = ti.xcom_pull(task_ids='extract_films')
+    total = ref['rows'] if ref else 0
+    chunks = [
+        {'ref': ref, 'offset': i, 'length': FILM_CHUNK_SIZE}
+        for i in range(0, total, FILM_CHUNK_SIZE)
+    ]
+    logger.info(f"✂ Split {total} films into {len(chunks)} chunks of up to {FILM_CHUNK_SIZE}")
+    return chunks
+
+
+chunk_films = PythonOperator(
+    task_id='chunk_films',
+    python_callable=chunk_films_task,
+    dag=dag,
+)
+
+
 # ==================== OPERATION 4: SAVE FILMS ====================
-def save_films_task(ti):
+@instrument_task('save_films')
+def save_films_task(ref, offset, length):
     """
-    Operation 4: Save/update all extracted films to database
-    - Insert films with UNIQUE constraint on imdb_id
-    - Handles duplicates with UPSERT
-    - Returns film IDs for linking with actors
+    Operation 4: Save/update one chunk of extracted films (mapped per chunk)
+    - Read the chunk's rows from the hand-off file
+    - Compare content hashes (title, rating, year, cast) with stored films in one query
+    - Insert/update only new or changed films in one batch UPSERT
+    - Falls back to film-by-film saves if the batch fails, skipping bad films
+    - Returns film IDs of stored films (unchanged or saved) plus the hashes of
+      new/changed films for the link step; films that could not be saved are
+      counted as failed and left out
     """
     logger.info("=" * 80)
     logger.info("OPERATION 4: SAVING FILMS TO DATABASE")
     logger.info("=" * 80)
     
+    from etl.handoff import read_batch
+    from etl.load import classify_films, save_film, save_films_batch
+    
     try:
-        films = ti.xcom_pull(task_ids='extract_films')
+        films = read_batch(ref, offset=offset, length=length)
+        classified = classify_films(films)
+        pending = [film for film in films if classified[film['imdb_id']]['status'] != 'unchanged']
         
-        if not films:
-            logger.error("❌ No films received from extract task")
-            return None
-        
-        film_ids = {}
         for film in films:
-            try:
-                logger.info(f"💾 Saving film: {film['title']}")
-                film_id = save_film({
-                    'imdb_id': film['imdb_id'],
-                    'title': film['title'],
-                    'rating': film['rating'],
-                    'year': film['year']
-                })
-                film_ids[film['imdb_id']] = {
-                    'film_id': film_id,
-                    'title': film['title'],
-                    'actors': film.get('actors', [])
-                }
-                logger.info(f"  ✓ Film saved with ID: {film_id}")
-            except Exception as e:
-                logger.error(f"  ❌ Error saving film '{film['title']}': {e}")
-        
-        logger.info(f"\n✓ Saved {len(film_ids)} films successfully")
-        return film_ids
+            if classified[film['imdb_id']]['status'] == 'unchanged':
+                logger.info(f"  = {film['title']} unchanged, skipped")
+        
+        try:
+            saved = save_films_batch(pending)
+        except Exception as e:
+            logger.warning(f"⚠ Batch save failed, saving films one by one: {e}")
+            saved = {}
+            for film in pending:
+                try:
+                    saved[film['imdb_id']] = save_film(film)
+                except Exception as e:
+                    logger.error(f"  ❌ Error saving film '{film['title']}': {e}")
+        
+        for film in pending:
+            if film['imdb_id'] in saved:
+                logger.info(f"  ✓ {film['title']} saved with ID: {saved[film['imdb_id']]}")
+        
+        # Only films actually stored: a changed film whose save failed keeps its old row
+        film_ids = {imdb_id: info['film_id'] for imdb_id, info in classified.items() if info['status'] == 'unchanged'}
+        film_ids.update(saved)
+        statuses = [classified[imdb_id]['status'] for imdb_id in film_ids]
+        failed = [film['title'] for film in pending if film['imdb_id'] not in saved]
+        
+        logger.info(f"\n✓ Films: {statuses.count('new')} inserted, {statuses.count('changed')} updated, "
+                    f"{statuses.count('unchanged')} unchanged")
+        if failed:
+            logger.warning(f"⚠ {len(failed)} films could not be saved: {', '.join(failed)}")
+        return {
+            'film_ids': film_ids,
+            'changed': {imdb_id: classified[imdb_id]['content_hash'] for imdb_id in saved},
+            'inserted': statuses.count('new'),
+            'updated': statuses.count('changed'),
+            'unchanged': statuses.count('unchanged'),
+            'failed': len(failed)
+        }
         
     except Exception as e:
         logger.error(f"❌ Error in save_films_task: {e}")
         raise
 
 
-save_films = PythonOperator(
+save_films = PythonOperator.partial(
     task_id='save_films',
     python_callable=save_films_task,
+    retries=2,
+    max_active_tis_per_dag=LOAD_PARALLELISM,
     dag=dag,
-)
+).expand(op_kwargs=chunk_films.output)
 
 
 # ==================== OPERATION 5: SAVE ACTORS ====================
-def save_actors_task(ti):
+@instrument_task('save_actors')
+def save_actors_task(ref, offset, length):
     """
-    Operation 5: Extract and save all unique actors from films
-    - Collect all actor names from all films
-    - Insert/update actors with UNIQUE constraint on name
-    - Handle duplicates gracefully
+    Operation 5: Save all unique actors of one chunk of films (mapped per chunk)
+    - Collect actor names from the chunk's rows of the hand-off file
+    - Insert/update actors with UNIQUE constraint on name in one batch UPSERT
+    - Actors shared between chunks are upserted by each; the UPSERT makes that safe
     - Returns actor mapping
     """
     logger.info("=" * 80)
     logger.info("OPERATION 5: SAVING ACTORS TO DATABASE")
     logger.info("=" * 80)
     
+    from etl.handoff import read_batch
+    from etl.load import save_actor, save_actors_batch
+    
     try:
-        films = ti.xcom_pull(task_ids='extract_films')
-        
-        if not films:
-            logger.error("❌ No films received from extract task")
-            return None
+        films = read_batch(ref, columns=['actors'], offset=offset, length=length)
         
         # Collect all unique actors
         all_actors = set()
         for film in films:
-            actors = film.get('actors', [])
-            all_actors.update(actors)
+            all_actors.update(film.get('actors', []))
         
-        logger.info(f"📝 Found {len(all_actors)} unique actors across all films")
+        logger.info(f"📝 Found {len(all_actors)} unique actors in this chunk")
         
-        actor_ids = {}
-        for actor_name in sorted(all_actors):
-            try:
-                logger.info(f"👤 Saving actor: {actor_name}")
-                actor_id = save_actor(actor_name)
-                actor_ids[actor_name] = actor_id
-                logger.info(f"  ✓ Actor saved with ID: {actor_id}")
-            except Exception as e:
-                logger.error(f"  ❌ Error saving actor '{actor_name}': {e}")
+        try:
+            actor_ids = save_actors_batch(all_actors)
+        except Exception as e:
+            logger.warning(f"⚠ Batch save failed, saving actors one by one: {e}")
+            actor_ids = {}
+            for actor_name in sorted(all_actors):
+                try:
+                    actor_ids[actor_name] = save_actor(actor_name)
+                except Exception as e:
+                    logger.error(f"  ❌ Error saving actor '{actor_name}': {e}")
         
         logger.info(f"\n✓ Saved {len(actor_ids)} actors successfully")
         return actor_ids
@@ -257,61 +333,76 @@ def save_actors_task(ti):
         raise
 
 
-save_actors = PythonOperator(
+save_actors = PythonOperator.partial(
     task_id='save_actors',
     python_callable=save_actors_task,
+    retries=2,
+    max_active_tis_per_dag=LOAD_PARALLELISM,
     dag=dag,
-)
+).expand(op_kwargs=chunk_films.output)
 
 
 # ==================== OPERATION 6: LINK ACTORS TO FILMS ====================
-def link_actors_to_films_task(ti):
+@instrument_task('link_actors_to_films')
+def link_actors_to_films_task(films_ref, film_batches, actor_batches):
     """
     Operation 6: Create many-to-many relationships between actors and films
-    - For each film, link all its actors via actor_film junction table
-    - Uses actor_id and film_id from previous operations
-    - Handles duplicate relationships gracefully
+    - Reduce step: merges the film and actor ID mappings of every chunk
+    - Only new or changed films are touched: their cast delta is written
+      (missing links added, dropped links removed) together with their content hash
+    - Reads casts from the hand-off file
+    - Reports inserted / updated / unchanged / failed film counts for the run
     """
     logger.info("=" * 80)
     logger.info("OPERATION 6: LINKING ACTORS TO FILMS (M2M RELATIONSHIPS)")
     logger.info("=" * 80)
     
+    from etl.handoff import read_batch
+    from etl.load import sync_film_casts
+    
     try:
-        films = ti.xcom_pull(task_ids='extract_films')
-        film_ids = ti.xcom_pull(task_ids='save_films')
-        actor_ids = ti.xcom_pull(task_ids='save_actors')
+        film_ids = {}
+        changed = {}
+        counts = {'inserted': 0, 'updated': 0, 'unchanged': 0, 'failed': 0}
+        for batch in film_batches:
+            if not batch:
+                continue
+            film_ids.update(batch['film_ids'])
+            changed.update(batch['changed'])
+            for key in counts:
+                counts[key] += batch[key]
+        actor_ids = {}
+        for batch in actor_batches:
+            actor_ids.update(batch or {})
         
-        if not films or not film_ids or not actor_ids:
+        if not film_ids:
             logger.error("❌ Missing data from previous tasks")
             return None
         
-        link_count = 0
-        for film in films:
-            film_imdb_id = film['imdb_id']
-            if film_imdb_id not in film_ids:
-                logger.warning(f"⚠ Film {film['title']} not found in film_ids mapping")
+        casts = {}
+        for film in read_batch(films_ref, columns=['imdb_id', 'title', 'actors']):
+            if film['imdb_id'] not in changed:
                 continue
             
-            film_id = film_ids[film_imdb_id]['film_id']
-            actors = film.get('actors', [])
-            
-            logger.info(f"\n🔗 Linking film '{film['title']}' (ID: {film_id}) with {len(actors)} actors:")
+            film_id = film_ids[film['imdb_id']]
+            actors = film.get('actors') or []
+            logger.info(f"🔗 Linking film '{film['title']}' (ID: {film_id}) with {len(actors)} actors")
             
+            cast_ids = []
             for actor_name in actors:
                 if actor_name not in actor_ids:
                     logger.warning(f"  ⚠ Actor '{actor_name}' not found in actor_ids mapping")
                     continue
-                
-                actor_id = actor_ids[actor_name]
-                try:
-                    link_actor_to_film(actor_id, film_id)
-                    logger.info(f"  ✓ Linked {actor_name} (ID: {actor_id}) to film")
-                    link_count += 1
-                except Exception as e:
-                    logger.error(f"  ❌ Error linking actor '{actor_name}': {e}")
+                cast_ids.append(actor_ids[actor_name])
+            # A film whose cast could not be fully resolved keeps no hash, so the next run retries it
+            casts[film_id] = (cast_ids, changed[film['imdb_id']] if len(cast_ids) == len(actors) else None)
         
-        logger.info(f"\n✓ Created {link_count} actor-film relationships successfully")
-        return {'links_created': link_count}
+        links = sync_film_casts(casts)
+        logger.info(f"\n✓ Films: {counts['inserted']} inserted, {counts['updated']} updated, {counts['unchanged']} unchanged")
+        if counts['failed']:
+            logger.warning(f"⚠ {counts['failed']} films could not be saved and were not linked")
+        logger.info(f"✓ Actor-film relationships: +{links['links_added']} created, -{links['links_removed']} removed")
+        return dict(counts, links_created=links['links_added'], links_removed=links['links_removed'])
         
     except Exception as e:
         logger.error(f"❌ Error in link_actors_to_films_task: {e}")
@@ -321,11 +412,17 @@ def link_actors_to_films_task(ti):
 link_actors_to_films = PythonOperator(
     task_id='link_actors_to_films',
     python_callable=link_actors_to_films_task,
+    op_kwargs={
+        'films_ref': extract_films.output,
+        'film_batches': save_films.output,
+        'actor_batches': save_actors.output,
+    },
     dag=dag,
 )
 
 
 # ==================== OPERATION 7: VALIDATE DATA ====================
+@instrument_task('validate_data')
 def validate_data_task():
     """
     Operation 7: Validate data integrity after loading
@@ -337,23 +434,18 @@ def validate_data_task():
     logger.info("OPERATION 7: VALIDATING DATA INTEGRITY")
     logger.info("=" * 80)
     
+    from etl.load import get_db_connection, get_table_stats
+    
     try:
         conn = get_db_connection()
         cursor = conn.cursor()
         
-        # Check row counts
+        # Check row counts (trigger-maintained, one query)
         logger.info("📊 Data Summary:")
-        cursor.execute('SELECT COUNT(*) FROM films')
-        film_count = cursor.fetchone()[0]
-        logger.info(f"  - Films: {film_count}")
-        
-        cursor.execute('SELECT COUNT(*) FROM actors')
-        actor_count = cursor.fetchone()[0]
-        logger.info(f"  - Actors: {actor_count}")
-        
-        cursor.execute('SELECT COUNT(*) FROM actor_film')
-        link_count = cursor.fetchone()[0]
-        logger.info(f"  - Actor-Film Links: {link_count}")
+        table_stats = get_table_stats(cursor)
+        logger.info(f"  - Films: {table_stats['films']['row_count']}")
+        logger.info(f"  - Actors: {table_stats['actors']['row_count']}")
+        logger.info(f"  - Actor-Film Links: {table_stats['actor_film']['row_count']}")
         
         # Check for orphaned relationships
         logger.info("\n🔍 Checking referential integrity:")
@@ -397,7 +489,40 @@ validate_data = PythonOperator(
 )
 
 
+# ==================== OPERATION 7b: SIMILAR FILMS ====================
+@instrument_task('compute_similar_films')
+def compute_similar_films_task():
+    """
+    Operation 7b: Precompute similar films by shared cast
+    - MinHash every film's cast and band the signatures (LSH) for candidate pairs
+    - Confirm candidates with their exact Jaccard similarity
+    - Replace the top-k similar films per film in similar_films
+    Runs before the ratings step, whose dataset version bump publishes it.
+    """
+    logger.info("=" * 80)
+    logger.info("OPERATION 7b: COMPUTING SIMILAR FILMS BY SHARED CAST")
+    logger.info("=" * 80)
+    
+    from etl.similarity import compute_similar_films
+    
+    try:
+        rows = compute_similar_films()
+        logger.info(f"✓ Similar films computed ({rows} rows)")
+        return rows
+    except Exception as e:
+        logger.error(f"❌ Error computing similar films: {e}")
+        raise
+
+
+compute_similar_films = PythonOperator(
+    task_id='compute_similar_films',
+    python_callable=compute_similar_films_task,
+    dag=dag,
+)
+
+
 # ==================== OPERATION 8: CALCULATE ACTOR RATINGS ====================
+@instrument_task('calculate_ratings')
 def calculate_ratings_task():
     """
     Operation 8: Calculate average ratings for each actor
@@ -409,6 +534,8 @@ def calculate_ratings_task():
     logger.info("OPERATION 8: CALCULATING ACTOR AVERAGE RATINGS")
     logger.info("=" * 80)
     
+    from etl.calculate_actor_ratings import calculate_actor_ratings
+    
     try:
         calculate_actor_ratings()
         logger.info("✓ Actor ratings calculation complete!")
@@ -426,6 +553,7 @@ calculate_ratings = PythonOperator(
 
 
 # ==================== OPERATION 9: GENERATE REPORT ====================
+@instrument_task('generate_report')
 def generate_report_task():
     """
     Operation 9: Generate final report with statistics and insights
@@ -437,26 +565,38 @@ def generate_report_task():
     logger.info("OPERATION 9: GENERATING FINAL REPORT")
     logger.info("=" * 80)
     
+    from etl.load import get_db_connection, get_table_stats
+    from etl.snapshots import read_snapshot
+    
     try:
         conn = get_db_connection()
         cursor = conn.cursor()
         
-        # Top 10 actors
+        # Top 10 actors, from the snapshot written by calculate_ratings
         logger.info("\n🏆 TOP 10 ACTORS BY AVERAGE RATING:\n")
-        cursor.execute('''
-            SELECT 
-                actor_name,
-                total_films,
-                ROUND(average_rating::numeric, 2) as avg_rating,
-                ROUND(min_rating::numeric, 2) as min_rating,
-                ROUND(max_rating::numeric, 2) as max_rating
-            FROM actor_ratings
-            WHERE average_rating IS NOT NULL
-            ORDER BY average_rating DESC
-            LIMIT 10
-        ''')
-        
-        results = cursor.fetchall()
+        snapshot = read_snapshot(cursor)
+        if snapshot is not None:
+            logger.info(f"(snapshot {snapshot['version']})")
+            results = [
+                (row['actor_name'], row['total_films'], round(row['average_rating'], 2),
+                 round(row['min_rating'], 2), round(row['max_rating'], 2))
+                for row in snapshot['leaderboard'] if row['average_rating'] is not None
+            ][:10]
+        else:
+            cursor.execute('''
+                SELECT 
+                    actor_name,
+                    total_films,
+                    ROUND(average_rating::numeric, 2) as avg_rating,
+                    ROUND(min_rating::numeric, 2) as min_rating,
+                    ROUND(max_rating::numeric, 2) as max_rating
+                FROM actor_ratings
+                WHERE average_rating IS NOT NULL
+                ORDER BY average_rating DESC
+                LIMIT 10
+            ''')
+        
+            results = cursor.fetchall()
         if results:
             logger.info(f"{'Rank':<5} {'Actor Name':<30} {'Films':<8} {'Avg':<8} {'Min':<8} {'Max':<8}")
             logger.info("-" * 75)
@@ -467,24 +607,13 @@ def generate_report_task():
         
         # Overall statistics
         logger.info("\n📈 OVERALL STATISTICS:\n")
-        cursor.execute('SELECT COUNT(*) FROM actor_ratings WHERE average_rating IS NOT NULL')
-        rated_actors = cursor.fetchone()[0]
-        logger.info(f"  - Total Rated Actors: {rated_actors}")
-        
-        cursor.execute('SELECT COUNT(*) FROM films')
-        total_films = cursor.fetchone()[0]
-        logger.info(f"  - Total Films: {total_films}")
+        table_stats = get_table_stats(cursor)
+        logger.info(f"  - Total Rated Actors: {table_stats['actor_ratings']['rating_count']}")
+        logger.info(f"  - Total Films: {table_stats['films']['row_count']}")
+        logger.info(f"  - Total Actors: {table_stats['actors']['row_count']}")
+        logger.info(f"  - Total Relationships: {table_stats['actor_film']['row_count']}")
         
-        cursor.execute('SELECT COUNT(*) FROM actors')
-        total_actors = cursor.fetchone()[0]
-        logger.info(f"  - Total Actors: {total_actors}")
-        
-        cursor.execute('SELECT COUNT(*) FROM actor_film')
-        total_links = cursor.fetchone()[0]
-        logger.info(f"  - Total Relationships: {total_links}")
-        
-        cursor.execute('SELECT AVG(average_rating) FROM actor_ratings WHERE average_rating IS NOT NULL')
-        avg_rating = cursor.fetchone()[0]
+        avg_rating = table_stats['actor_ratings']['average_rating']
         if avg_rating:
             logger.info(f"  - Average Actor Rating: {avg_rating:.2f}/10")
         
@@ -514,12 +643,16 @@ Task flow:
     ↓
 3. extract_films (Get films from IMDb)
     ↓
-4. save_films (Save films to DB)  ←→  5. save_actors (Save actors to DB)
-    ↓                                       ↓
-6. link_actors_to_films (Create M2M relationships)
+   chunk_films (Split into chunks)
+    ↓ .expand() - one task instance per chunk
+4. save_films[i] (Save chunk's films)  ←→  5. save_actors[i] (Save chunk's actors)
+    ↓                                            ↓
+6. link_actors_to_films (Reduce chunks, create M2M relationships)
     ↓
 7. validate_data (Verify data integrity)
     ↓
+   compute_similar_films (Top-k similar films by shared cast)
+    ↓
 8. calculate_ratings (Calculate actor averages)
     ↓
 9. generate_report (Display results)
@@ -527,8 +660,10 @@ Task flow:
 
 init_database >> validate_database
 validate_database >> extract_films
-extract_films >> [save_films, save_actors]
+extract_films >> chunk_films
+chunk_films >> [save_films, save_actors]
 [save_films, save_actors] >> link_actors_to_films
 link_actors_to_films >> validate_data
-validate_data >> calculate_ratings
+validate_data >> compute_similar_films
+compute_similar_films >> calculate_ratings
 calculate_ratings >> generate_report
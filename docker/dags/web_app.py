@@ -1,136 +1,728 @@
-﻿from flask import Flask, render_template, jsonify, request
-from etl.extract import get_latest_films
-from etl.load import save_film, save_actor
-from etl.calculate_actor_ratings import calculate_actor_ratings
+﻿from flask import Flask, Response, g, make_response, render_template, jsonify, request, stream_with_context, url_for
+from flask.json.provider import DefaultJSONProvider
+from contextlib import contextmanager
+import datetime
+import functools
+import json
 import logging
-from sqlalchemy import create_engine
-from config import DATABASE_URL
-import pandas as pd
+import threading
+import time
+from etl.cache import DatasetVersion, ResponseCache
+from etl.compression import EncodedBody, choose_encoding, compress, is_compressible
+from etl.events import EVENTS_CHANNEL, EventBus, Leaderboard, format_sse
+from etl.jobs import JobManager
+from etl.metrics import db_cursor_factory, observe, render_prometheus
+from etl.pagination import KeysetQuery, PaginationError
+from etl.params import COSTAR_MAX_DEPTH, CostarError, SimilarityError, parse_collaborators_limit, parse_similar_limit
+from etl.snapshots import SnapshotStore, summarize_stats
+from etl.search import SearchError, build_search, parse_search, shape_results
+from etl.streaming import dumps, iter_rows, json_array_chunks, json_default
 import os
 
 app = Flask(__name__)
 logger = logging.getLogger(__name__)
 
-# Database connection
-engine = create_engine(DATABASE_URL, pool_pre_ping=True)
+# Pipeline runs happen on a background worker, not in the request
+jobs = JobManager()
+
+# Reads go straight through psycopg2 (no pandas/SQLAlchemy): small results are
+# fetched as dicts, large exports are streamed from a server-side cursor.
+# The pool serves the request threads plus background borrowers: the job worker
+# (relay_job, one NOTIFY per stage update) and the listener thread
+# (publish_leaderboard's live fallbacks). Borrowers wait for a free connection.
+WEB_THREADS = int(os.getenv('WEB_THREADS', '4'))
+DB_BACKGROUND_BORROWERS = 2
+WEB_DB_POOL_SIZE = int(os.getenv('WEB_DB_POOL_SIZE', str(WEB_THREADS + DB_BACKGROUND_BORROWERS)))
+WEB_DB_POOL_TIMEOUT = float(os.getenv('WEB_DB_POOL_TIMEOUT', '30'))
+_pool = None
+_pool_lock = threading.Lock()
+_pool_slots = threading.BoundedSemaphore(WEB_DB_POOL_SIZE)
+
+
+class JSONProvider(DefaultJSONProvider):
+    """jsonify with the same Decimal/timestamp encoding as the streaming path"""
+    default = staticmethod(json_default)
+
+
+app.json = JSONProvider(app)
+
+
+def get_pool():
+    """Create the connection pool on first use (after any pre-fork) and reuse it"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            from psycopg2.pool import ThreadedConnectionPool
+            from etl.load import DB_HOST, DB_PORT, DB_NAME, DB_USER, DB_PASSWORD
+            _pool = ThreadedConnectionPool(
+                1, WEB_DB_POOL_SIZE,
+                host=DB_HOST, port=DB_PORT, database=DB_NAME, user=DB_USER, password=DB_PASSWORD,
+                cursor_factory=db_cursor_factory()
+            )
+    return _pool
+
+
+@contextmanager
+def db_connection():
+    """
+    Borrow a pooled connection, waiting up to WEB_DB_POOL_TIMEOUT seconds for
+    one to be free; its read transaction is ended on return
+    """
+    pool = get_pool()
+    # getconn() raises PoolError at once when every connection is out: queue for a slot instead
+    if not _pool_slots.acquire(timeout=WEB_DB_POOL_TIMEOUT):
+        from psycopg2.pool import PoolError
+        raise PoolError(f"No database connection free after {WEB_DB_POOL_TIMEOUT:g}s")
+    try:
+        conn = pool.getconn()
+    except Exception:
+        _pool_slots.release()
+        raise
+    try:
+        yield conn
+    finally:
+        try:
+            conn.rollback()
+            pool.putconn(conn)
+        except Exception:
+            pool.putconn(conn, close=True)
+        finally:
+            _pool_slots.release()
+
+
+def fetch_rows(query, params=None):
+    """Run a (small) query and return its rows as a list of dicts"""
+    with db_connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute(query, params)
+            columns = [column[0] for column in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+
+# Keyset-paginated listings, backed by the matching composite indexes in init.sql
+ACTOR_RATINGS_PAGES = KeysetQuery(
+    'actor_ratings', table='actor_ratings',
+    columns=['actor_id', 'actor_name', 'total_films', 'average_rating', 'min_rating', 'max_rating', 'last_updated'],
+    default_fields=['actor_id', 'actor_name', 'total_films', 'average_rating', 'min_rating', 'max_rating'],
+    sort='COALESCE(average_rating, -1)', key='actor_id',
+)
+FILMS_PAGES = KeysetQuery(
+    'films', table='films',
+    columns=['film_id', 'imdb_id', 'title', 'rating', 'year', 'created_at'],
+    default_fields=['film_id', 'imdb_id', 'title', 'rating', 'year', 'created_at'],
+    sort='COALESCE(rating, -1)', key='film_id',
+)
+
+
+def keyset_page(query):
+    """One page of a KeysetQuery for the current request's limit/cursor/fields"""
+    limit, after, fields = query.parse(request.args)
+    sql, params = query.build(limit, after, fields)
+    return query.page(fetch_rows(sql, params), limit, fields)
+
+
+def _connect():
+    from etl.load import get_db_connection
+    return get_db_connection()
+
+
+# Read endpoints are cached per dataset version (bumped by the ratings step)
+response_cache = ResponseCache()
+dataset_version = DatasetVersion(_connect)
+
+# Live updates (/api/events): job progress and leaderboard diffs pushed to clients
+SSE_MAX_CLIENTS = int(os.getenv('SSE_MAX_CLIENTS', '100'))
+SSE_KEEPALIVE_SECONDS = float(os.getenv('SSE_KEEPALIVE_SECONDS', '15'))
+# Streams are closed after this long; EventSource reconnects and resumes by Last-Event-ID
+SSE_MAX_SECONDS = float(os.getenv('SSE_MAX_SECONDS', '300'))
+SSE_RETRY_MS = 3000
+# Under gthread (sync mode) every open stream holds one of the worker's WEB_THREADS
+# threads for up to SSE_MAX_SECONDS: keep one free for ordinary requests. Refused
+# clients fall back to polling. asgi_app serves its streams without threads.
+SSE_SYNC_MAX_CLIENTS = max(0, min(SSE_MAX_CLIENTS, WEB_THREADS - 1))
+_sync_streams = threading.BoundedSemaphore(SSE_SYNC_MAX_CLIENTS) if SSE_SYNC_MAX_CLIENTS else None
+# pg_notify payloads are limited to 8000 bytes
+NOTIFY_MAX_BYTES = 7900
+
+# Leaderboard, stats and actor cards precomputed by the ratings step, per dataset version
+snapshots = SnapshotStore(db_connection)
+
+
+def current_snapshot():
+    """Snapshot of the dataset version being served, or None (then views query live)"""
+    return snapshots.get(dataset_version.current())
+
+
+def top_actors(limit):
+    """The first `limit` leaderboard rows, from the snapshot when it is deep enough"""
+    snapshot = current_snapshot()
+    if snapshot is not None:
+        rows = snapshot['leaderboard']
+        # Shorter than its size means the snapshot holds every rated actor
+        if len(rows) >= limit or len(rows) < snapshot['size']:
+            return rows[:limit]
+    return fetch_rows(Leaderboard.SQL, {'limit': limit})
+
+
+# Co-star graph of the dataset version being served, refreshed incrementally.
+# etl.costars (numpy) is imported by the first graph request, not at startup.
+_costars = None
+_costars_lock = threading.Lock()
+
+
+def costar_graph():
+    global _costars
+    with _costars_lock:
+        if _costars is None:
+            from etl.costars import CostarIndex
+            _costars = CostarIndex(db_connection)
+    return _costars.get(dataset_version.current())
+
+
+def read_stats():
+    """Headline counts: from the snapshot, else from the trigger-maintained table_stats (one lookup)"""
+    snapshot = current_snapshot()
+    if snapshot is not None:
+        return snapshot['stats']
+    from etl.load import get_table_stats
+    
+    with db_connection() as conn:
+        with conn.cursor() as cursor:
+            return summarize_stats(get_table_stats(cursor))
+
+
+event_bus = EventBus()
+LEADERBOARD_FIELDS = ('actor_id', 'actor_name', 'total_films', 'average_rating', 'min_rating', 'max_rating')
+leaderboard = Leaderboard(lambda sql, params: [
+    {field: row[field] for field in LEADERBOARD_FIELDS} for row in top_actors(params['limit'])
+])
+
+
+def publish_leaderboard(old_version, new_version):
+    """On a new dataset version, push the changed leaderboard rows and fresh stats"""
+    if old_version is None:
+        # First version seen by this worker: nothing changed
+        return
+    if not event_bus.subscriber_count:
+        # Nobody is watching; diff against a fresh board next time
+        leaderboard.invalidate()
+        return
+    diff = leaderboard.diff()
+    diff['version'] = new_version
+    diff['stats'] = read_stats()
+    event_bus.publish('leaderboard', diff)
+
+
+def relay_job(job):
+    """Send job progress to every worker's event bus through NOTIFY (local bus if that fails)"""
+    data = {key: value for key, value in job.items() if key != 'result'}
+    payload = dumps({'event': 'job', 'data': data}).decode('utf-8')
+    if len(payload.encode('utf-8')) <= NOTIFY_MAX_BYTES:
+        try:
+            with db_connection() as conn:
+                with conn.cursor() as cursor:
+                    cursor.execute("SELECT pg_notify(%s, %s)", (EVENTS_CHANNEL, payload))
+                conn.commit()
+            return
+        except Exception as e:
+            logger.warning(f"⚠ Could not relay job event: {e}")
+    event_bus.publish('job', data)
+
+
+def receive_relayed(payload):
+    message = json.loads(payload)
+    event_bus.publish(message['event'], message['data'])
+
+
+dataset_version.on_change(publish_leaderboard)
+dataset_version.add_channel(EVENTS_CHANNEL, receive_relayed)
+jobs.add_listener(relay_job)
+
+
+def version_validators(version):
+    """Weak ETag and Last-Modified for a response built from this dataset version (epoch ms)"""
+    return f"v{version}", datetime.datetime.fromtimestamp(version / 1000, datetime.timezone.utc)
+
+
+def send_cached(entry, cache_status):
+    """
+    Response for a cache entry (encoded, mimetype, (etag, weak), last_modified):
+    the precompressed variant the client accepts, 304 when its validators match.
+    """
+    encoded, mimetype, (etag, weak), last_modified = entry
+    encoding, body = encoded.negotiate(request.headers.get('Accept-Encoding'))
+    response = Response(body, mimetype=mimetype)
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    if encoded.variants:
+        response.vary.add('Accept-Encoding')
+    response.set_etag(etag, weak=weak)
+    response.last_modified = last_modified
+    # Browsers may keep the body but must revalidate it (a 304 costs no body)
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Cache'] = cache_status
+    return response.make_conditional(request)
+
+
+def cached(view):
+    """
+    Serve the view from response_cache while the dataset version is unchanged.
+    Only 200 responses are stored; a view can opt out with g.skip_cache = True.
+    
+    Responses carry an ETag (the view's own, else one for the dataset
+    version) and Last-Modified, so polling clients get 304 Not Modified
+    until the next pipeline run. Bodies are compressed once when stored.
+    """
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        version = dataset_version.current()
+        key = (request.endpoint, tuple(sorted(kwargs.items())), tuple(sorted(request.args.items(multi=True))))
+        if version is not None:
+            version_tag, version_modified = version_validators(version)
+            if request.if_none_match.contains_weak(version_tag):
+                # The client already has this version: no lookup, no body
+                response = Response(status=304)
+                response.set_etag(version_tag, weak=True)
+                response.last_modified = version_modified
+                response.headers['Cache-Control'] = 'no-cache'
+                response.headers['X-Cache'] = 'HIT'
+                return response
+            entry = response_cache.get(key, version)
+            if entry is not None:
+                return send_cached(entry, 'HIT')
+        
+        response = make_response(view(*args, **kwargs))
+        if version is not None and response.status_code == 200 and not g.get('skip_cache'):
+            etag = response.get_etag()
+            if etag[0] is None:
+                etag = (version_tag, True)
+            encoded = EncodedBody(response.get_data(), response.mimetype)
+            entry = (encoded, response.mimetype, etag, response.last_modified or version_modified)
+            response_cache.set(key, version, entry, encoded.size)
+            return send_cached(entry, 'MISS')
+        response.headers['X-Cache'] = 'MISS'
+        return response
+    return wrapper
+
 
 @app.route('/')
+@cached
 def index():
     """Home page - list top rated actors"""
     try:
-        df = pd.read_sql(
-            "SELECT actor_name, total_films, average_rating, min_rating, max_rating FROM actor_ratings ORDER BY average_rating DESC LIMIT 20",
-            engine
-        )
-        actors = df.to_dict('records')
+        actors = top_actors(20)
         return render_template('actor_ratings.html', actors=actors)
     except Exception as e:
         logger.error(f"Error: {e}")
+        g.skip_cache = True
         return render_template('actor_ratings.html', actors=[])
 
 @app.route('/api/actor-ratings')
+@cached
 def get_actor_ratings():
-    """Get all actor ratings as JSON"""
+    """Get actor ratings as JSON, best first, one page at a time (?limit=&cursor=&fields=)"""
     try:
-        df = pd.read_sql(
-            "SELECT actor_name, total_films, average_rating, min_rating, max_rating FROM actor_ratings ORDER BY average_rating DESC",
-            engine
-        )
-        return jsonify(df.to_dict('records'))
+        return jsonify(keyset_page(ACTOR_RATINGS_PAGES))
+    except PaginationError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+TOP_ACTORS_FIELDS = ('actor_name', 'total_films', 'average_rating')
+
 @app.route('/api/top-actors')
+@cached
 def get_top_actors():
     """Get top 10 actors by average rating"""
     try:
-        df = pd.read_sql(
-            "SELECT actor_name, total_films, average_rating FROM actor_ratings ORDER BY average_rating DESC LIMIT 10",
-            engine
-        )
-        return jsonify(df.to_dict('records'))
+        return jsonify([{field: row[field] for field in TOP_ACTORS_FIELDS} for row in top_actors(10)])
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/films')
+@cached
 def get_films():
-    """Get all films as JSON"""
+    """Get films as JSON sorted by rating, one page at a time (?limit=&cursor=&fields=)"""
     try:
-        df = pd.read_sql("SELECT * FROM films ORDER BY rating DESC", engine)
-        return jsonify(df.to_dict('records'))
+        return jsonify(keyset_page(FILMS_PAGES))
+    except PaginationError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+EXPORTS = {'actor-ratings': ACTOR_RATINGS_PAGES, 'films': FILMS_PAGES}
+
+@app.route('/api/export/<dataset>')
+def export_dataset(dataset):
+    """Stream a whole listing (actor-ratings or films) as one JSON array (?fields=)"""
+    query = EXPORTS.get(dataset)
+    if query is None:
+        return jsonify({'error': f"Unknown dataset '{dataset}' (available: {', '.join(EXPORTS)})"}), 404
+    try:
+        _, _, fields = query.parse({'fields': request.args.get('fields')})
+    except PaginationError as e:
+        return jsonify({'error': str(e)}), 400
+    sql = query.export_sql(fields)
+    
+    def generate():
+        # Rows go from a server-side cursor to the socket in chunks, never all in memory
+        with db_connection() as conn:
+            yield from json_array_chunks(iter_rows(conn, sql))
+    
+    return Response(stream_with_context(generate()), mimetype='application/json')
+
+# Ratings, filmography and co-star counts of one actor in a single round trip.
+# The actor is found through the primary key or idx_actors_name_lower; the
+# films and co-stars through the actor_film indexes.
+ACTOR_DETAIL_SQL = '''
+    WITH actor AS (
+        SELECT actor_id, name, created_at
+        FROM actors
+        WHERE {match}
+        ORDER BY actor_id
+        LIMIT 1
+    )
+    SELECT a.actor_id,
+           a.name AS actor_name,
+           r.total_films,
+           r.average_rating,
+           r.min_rating,
+           r.max_rating,
+           COALESCE(r.last_updated, a.created_at) AS last_updated,
+           COALESCE((
+               SELECT json_agg(json_build_object(
+                          'film_id', f.film_id,
+                          'imdb_id', f.imdb_id,
+                          'title', f.title,
+                          'rating', f.rating,
+                          'year', f.year,
+                          'co_stars', (SELECT COUNT(*) - 1 FROM actor_film c WHERE c.film_id = f.film_id)
+                      ) ORDER BY f.year DESC NULLS LAST, f.film_id DESC)
+               FROM actor_film af
+               JOIN films f ON f.film_id = af.film_id
+               WHERE af.actor_id = a.actor_id
+           ), '[]'::json) AS films,
+           (
+               SELECT COUNT(DISTINCT co.actor_id)
+               FROM actor_film af
+               JOIN actor_film co ON co.film_id = af.film_id AND co.actor_id <> af.actor_id
+               WHERE af.actor_id = a.actor_id
+           ) AS co_star_count
+    FROM actor a
+    LEFT JOIN actor_ratings r ON r.actor_id = a.actor_id
+'''
+ACTOR_BY_ID_SQL = ACTOR_DETAIL_SQL.format(match='actor_id = %(actor_id)s')
+ACTOR_BY_NAME_SQL = ACTOR_DETAIL_SQL.format(match='lower(name) = %(name)s')
+
+
+def normalize_actor_name(name):
+    """Lookup form of an actor name: case-folded with whitespace collapsed"""
+    return ' '.join(name.split()).lower()
+
+
+def actor_detail_response(sql, params):
+    """Actor detail as JSON with an ETag from the actor's last_updated (304 when unchanged)"""
+    rows = fetch_rows(sql, params)
+    if not rows:
+        return jsonify({'error': 'Actor not found'}), 404
+    return actor_document_response(rows[0])
+
+def actor_card(actor_id):
+    """Precomputed detail document of a leaderboard actor, or None"""
+    snapshot = current_snapshot()
+    if snapshot is None:
+        return None
+    card = snapshot['cards'].get(str(actor_id))
+    if card is not None:
+        card = dict(card, last_updated=datetime.datetime.fromisoformat(card['last_updated']))
+    return card
+
+def actor_document_response(actor):
+    response = jsonify(actor)
+    response.set_etag(f"actor-{actor['actor_id']}-{actor['last_updated'].timestamp():.6f}")
+    response.last_modified = actor['last_updated']
+    return response.make_conditional(request)
+
+@app.route('/api/actor/<int:actor_id>')
+@cached
+def get_actor_by_id(actor_id):
+    """Get an actor's ratings, filmography and co-star counts by actor_id"""
+    try:
+        card = actor_card(actor_id)
+        if card is not None:
+            return actor_document_response(card)
+        return actor_detail_response(ACTOR_BY_ID_SQL, {'actor_id': actor_id})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/actor/<actor_name>')
+@cached
 def get_actor_detail(actor_name):
-    """Get detailed info about an actor"""
+    """Get an actor's ratings, filmography and co-star counts by name (case-insensitive)"""
     try:
-        actor_df = pd.read_sql(
-            f"SELECT * FROM actor_ratings WHERE actor_name = '{actor_name}'",
-            engine
-        )
-        return jsonify(actor_df.to_dict('records'))
+        return actor_detail_response(ACTOR_BY_NAME_SQL, {'name': normalize_actor_name(actor_name)})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/run-pipeline', methods=['POST'])
-def run_pipeline():
-    """Run the pipeline: extract films, rate them, store actors, calculate actor ratings"""
+ACTOR_ID_BY_NAME_SQL = "SELECT actor_id FROM actors WHERE lower(name) = %(name)s ORDER BY actor_id LIMIT 1"
+ACTOR_NAMES_SQL = "SELECT actor_id, name AS actor_name FROM actors WHERE actor_id = ANY(%(actor_ids)s)"
+
+# For each step of a path, the best-rated film both actors appear in
+PATH_FILMS_SQL = '''
+    SELECT p.step, f.film_id, f.title, f.year
+    FROM unnest(%(sources)s::int[], %(targets)s::int[]) WITH ORDINALITY AS p (source, target, step)
+    CROSS JOIN LATERAL (
+        SELECT f.film_id, f.title, f.year
+        FROM actor_film a
+        JOIN actor_film b ON b.film_id = a.film_id AND b.actor_id = p.target
+        JOIN films f ON f.film_id = a.film_id
+        WHERE a.actor_id = p.source
+        ORDER BY f.rating DESC NULLS LAST, f.film_id
+        LIMIT 1
+    ) f
+    ORDER BY p.step
+'''
+
+
+def actor_names(actor_ids):
+    if not actor_ids:
+        return {}
+    return {row['actor_id']: row['actor_name'] for row in fetch_rows(ACTOR_NAMES_SQL, {'actor_ids': list(actor_ids)})}
+
+
+def resolve_actor(value):
+    """actor_id for an id or a (case-insensitive) name, or None"""
+    value = (value or '').strip()
+    if value.isdigit():
+        return int(value)
+    rows = fetch_rows(ACTOR_ID_BY_NAME_SQL, {'name': normalize_actor_name(value)}) if value else []
+    return rows[0]['actor_id'] if rows else None
+
+@app.route('/api/actor/<int:actor_id>/collaborators')
+@cached
+def get_collaborators(actor_id):
+    """An actor's most frequent co-stars from the in-memory co-star graph (?limit=)"""
     try:
-        print("🚀 Starting Actor Rating Pipeline...")
-        
-        # Step 1: Extract films
-        films = get_latest_films(limit=5)
-        print(f"✓ Extracted {len(films)} films")
-        
-        # Step 2: Rate and store films
-        for film in films:
-            save_film({
-                'imdb_id': film['imdb_id'],
-                'title': film['title'],
-                'rating': film['rating'],
-                'year': film['year']
-            })
-            print(f"✓ Rated film: {film['title']} ({film['rating']}/10)")
-        
-        # Step 3: Store actors separately
-        total_actors = 0
-        for film in films:
-            for actor in film['actors']:
-                save_actor({'name': actor, 'films_count': 1})
-                total_actors += 1
-        print(f"✓ Stored {total_actors} actor records")
-        
-        # Step 4: Calculate average actor ratings
-        calculate_actor_ratings()
-        print("✓ Actor ratings calculated")
+        limit = parse_collaborators_limit(request.args)
+        graph = costar_graph()
+        if graph is None:
+            return jsonify({'error': 'Co-star graph unavailable'}), 503
+        collaborators = graph.collaborators(actor_id, limit)
+        names = actor_names([actor_id] + [co_star for co_star, _ in collaborators])
+        if actor_id not in names:
+            return jsonify({'error': 'Actor not found'}), 404
+        return jsonify({
+            'actor_id': actor_id,
+            'actor_name': names[actor_id],
+            'items': [{'actor_id': co_star, 'actor_name': names.get(co_star), 'shared_films': shared}
+                      for co_star, shared in collaborators]
+        })
+    except CostarError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/path')
+@cached
+def get_path():
+    """Degrees of separation between two actors (?from=&to=, ids or names) with the linking films"""
+    try:
+        if not request.args.get('from') or not request.args.get('to'):
+            return jsonify({'error': 'from and to are required'}), 400
+        source, target = resolve_actor(request.args['from']), resolve_actor(request.args['to'])
+        if source is None or target is None:
+            return jsonify({'error': 'Actor not found'}), 404
+        graph = costar_graph()
+        if graph is None:
+            return jsonify({'error': 'Co-star graph unavailable'}), 503
+        path = graph.shortest_path(source, target)
+        if path is None:
+            return jsonify({'error': f'No connection within {COSTAR_MAX_DEPTH} co-stars',
+                            'from': source, 'to': target}), 404
         
+        names = actor_names(path)
+        films = fetch_rows(PATH_FILMS_SQL, {'sources': path[:-1], 'targets': path[1:]}) if len(path) > 1 else []
+        return jsonify({
+            'from': source,
+            'to': target,
+            'degrees': len(path) - 1,
+            'path': [{'actor_id': actor_id, 'actor_name': names.get(actor_id)} for actor_id in path],
+            'films': [{key: row[key] for key in ('film_id', 'title', 'year')} for row in films]
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+FILM_TITLE_SQL = "SELECT film_id, title FROM films WHERE film_id = %(film_id)s"
+# Precomputed by etl.similarity; (film_id, rank) is the primary key
+SIMILAR_FILMS_SQL = '''
+    SELECT f.film_id, f.title, f.year, f.rating, s.similarity, s.shared_cast
+    FROM similar_films s
+    JOIN films f ON f.film_id = s.similar_film_id
+    WHERE s.film_id = %(film_id)s
+    ORDER BY s.rank
+    LIMIT %(limit)s
+'''
+
+@app.route('/api/films/<int:film_id>/similar')
+@cached
+def get_similar_films(film_id):
+    """Films with the most similar casts (Jaccard over actors), precomputed by the pipeline (?limit=)"""
+    try:
+        limit = parse_similar_limit(request.args)
+        film = fetch_rows(FILM_TITLE_SQL, {'film_id': film_id})
+        if not film:
+            return jsonify({'error': 'Film not found'}), 404
         return jsonify({
-            'status': 'success',
-            'message': f'Pipeline completed! Processed {len(films)} films and calculated ratings for all actors'
+            'film_id': film_id,
+            'title': film[0]['title'],
+            'items': fetch_rows(SIMILAR_FILMS_SQL, {'film_id': film_id, 'limit': limit})
+        })
+    except SimilarityError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/search')
+@cached
+def search():
+    """Ranked prefix/substring/typo-tolerant search over actors and films (?q=&type=&limit=)"""
+    try:
+        term, types, limit = parse_search(request.args)
+        sql, params = build_search(term, types, limit)
+        return jsonify({'query': term, 'items': shape_results(fetch_rows(sql, params))})
+    except SearchError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+def _run_pipeline_job(job):
+    """Background job: extract, score and store films, then calculate actor ratings"""
+    from etl.pipeline import run_film_pipeline
+    from etl.calculate_actor_ratings import calculate_actor_ratings
+    from etl.similarity import compute_similar_films
+    
+    print("🚀 Starting Actor Rating Pipeline...")
+    
+    # Steps 1-3: Extract, score and store new/changed films as overlapping stages
+    result = run_film_pipeline(limit=5, on_progress=job.update_stage)
+    films, report = result['films'], result['load']
+    print(f"✓ Processed {len(films)} films in {result['seconds']}s")
+    print(f"✓ Films: {report['inserted']} inserted, {report['updated']} updated, {report['unchanged']} unchanged")
+    print(f"✓ Links: +{report['links_added']} / -{report['links_removed']}")
+    
+    # Step 4: Similar films by shared cast (published by the ratings step's version bump)
+    job.time_stage('similar_films', compute_similar_films)
+    print("✓ Similar films computed")
+    
+    # Step 5: Calculate average actor ratings
+    job.time_stage('ratings', calculate_actor_ratings)
+    print("✓ Actor ratings calculated")
+    
+    return {
+        'message': f'Pipeline completed! Processed {len(films)} films ({report["inserted"]} new, {report["updated"]} updated, {report["unchanged"]} unchanged) and calculated ratings for all actors',
+        'films': {key: report[key] for key in ('inserted', 'updated', 'unchanged')},
+        'validation': result['validation']
+    }
+
+@app.route('/api/run-pipeline', methods=['POST'])
+def run_pipeline():
+    """Queue a pipeline run on the background worker; concurrent triggers share one job"""
+    try:
+        job, created = jobs.submit('pipeline', _run_pipeline_job)
+        status_url = url_for('get_job', job_id=job.id)
+        response = jsonify({
+            'status': job.status,
+            'job_id': job.id,
+            'status_url': status_url,
+            'deduplicated': not created,
+            'message': 'Pipeline queued' if created else 'Pipeline already in progress'
         })
+        response.headers['Location'] = status_url
+        return response, 202
     except Exception as e:
         logger.error(f"Pipeline error: {e}")
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
+@app.route('/api/jobs/<job_id>')
+def get_job(job_id):
+    """Status, progress and per-stage timings of a background job"""
+    job = jobs.get(job_id)
+    if job is None:
+        return jsonify({'error': f'Unknown job {job_id}'}), 404
+    return jsonify(job.to_dict())
+
 @app.route('/api/stats')
+@cached
 def get_stats():
-    """Get pipeline statistics"""
+    """Get pipeline statistics (one lookup in the trigger-maintained table_stats)"""
     try:
-        films_count = pd.read_sql("SELECT COUNT(*) as count FROM films", engine)['count'][0]
-        actors_count = pd.read_sql("SELECT COUNT(*) as count FROM actors", engine)['count'][0]
-        rated_actors = pd.read_sql("SELECT COUNT(*) as count FROM actor_ratings", engine)['count'][0]
-        avg_rating = pd.read_sql("SELECT AVG(average_rating) as avg FROM actor_ratings", engine)['avg'][0]
-        
-        return jsonify({
-            'total_films': int(films_count),
-            'total_actors': int(actors_count),
-            'rated_actors': int(rated_actors),
-            'average_actor_rating': round(float(avg_rating), 2) if avg_rating else 0
-        })
+        return jsonify(read_stats())
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/events')
+def events():
+    """Server-sent events: pipeline job progress ('job') and leaderboard diffs ('leaderboard')"""
+    # Claimed now and released when the server closes the response, even if the stream never starts
+    if _sync_streams is None or not _sync_streams.acquire(blocking=False):
+        return jsonify({'error': 'Too many live connections, retry later'}), 503
+    try:
+        # Make sure this worker's listener (which feeds the bus) is running
+        dataset_version.current()
+    except Exception:
+        _sync_streams.release()
+        raise
+    last_event_id = request.headers.get('Last-Event-ID')
+    
+    def generate():
+        subscription = event_bus.subscribe(last_event_id)
+        try:
+            yield f"retry: {SSE_RETRY_MS}\n\n"
+            deadline = time.monotonic() + SSE_MAX_SECONDS
+            while time.monotonic() < deadline:
+                event = subscription.get(timeout=SSE_KEEPALIVE_SECONDS)
+                yield format_sse(event) if event else ": keepalive\n\n"
+        finally:
+            subscription.close()
+    
+    response = Response(generate(), mimetype='text/event-stream')
+    response.call_on_close(_sync_streams.release)
+    response.headers['Cache-Control'] = 'no-cache'
+    # Keep reverse proxies from buffering the stream
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+@app.route('/metrics')
+def metrics():
+    """Prometheus text exposition of this process's request, HTTP and DB metrics"""
+    return Response(render_prometheus(), mimetype='text/plain; version=0.0.4')
+
+@app.before_request
+def start_timer():
+    g.request_start = time.perf_counter()
+
+@app.after_request
+def compress_response(response):
+    """Compress large uncached bodies (cached ones are precompressed in send_cached)"""
+    if (response.status_code != 200 or response.is_streamed or response.direct_passthrough
+            or 'Content-Encoding' in response.headers
+            or not is_compressible(response.mimetype, response.content_length or 0)):
+        return response
+    response.vary.add('Accept-Encoding')
+    encoding = choose_encoding(request.headers.get('Accept-Encoding'))
+    if encoding:
+        response.set_data(compress(response.get_data(), encoding))
+        response.headers['Content-Encoding'] = encoding
+    return response
+
+@app.after_request
+def record_request(response):
+    start = g.get('request_start')
+    if start is not None and request.endpoint and request.endpoint != 'metrics':
+        observe('web_request_seconds', time.perf_counter() - start,
+                endpoint=request.endpoint, status=response.status_code)
+    return response
+
 if __name__ == '__main__':
     port = int(os.getenv('PORT', '5000'))
     app.run(debug=True, host='0.0.0.0', port=port)
@@ -1,9 +1,16 @@
-﻿-- Drop existing tables to start fresh
+﻿-- Trigram matching for /api/search
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+-- Drop existing tables to start fresh
 DROP TABLE IF EXISTS actor_film CASCADE;
 DROP TABLE IF EXISTS actor_ratings CASCADE;
 DROP TABLE IF EXISTS recommendations CASCADE;
+DROP TABLE IF EXISTS similar_films CASCADE;
 DROP TABLE IF EXISTS films CASCADE;
 DROP TABLE IF EXISTS actors CASCADE;
+DROP TABLE IF EXISTS table_stats CASCADE;
+DROP TABLE IF EXISTS dataset_version CASCADE;
+DROP TABLE IF EXISTS leaderboard_snapshots CASCADE;
 
 -- Films Table with UNIQUE constraint on title and imdb_id
 CREATE TABLE films (
@@ -12,6 +19,8 @@ CREATE TABLE films (
     title VARCHAR(255) NOT NULL UNIQUE,
     rating FLOAT,
     year INT,
+    -- SHA-256 of title, rating, year and sorted cast; unchanged films are skipped on load
+    content_hash CHAR(64),
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
@@ -57,11 +66,186 @@ CREATE TABLE recommendations (
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
+-- Similar films by shared cast - the top-k films per film by Jaccard similarity
+-- of their casts (MinHash + LSH candidates, exact overlap), rewritten in bulk
+-- by etl.similarity before each ratings run
+CREATE TABLE similar_films (
+    film_id INTEGER NOT NULL,
+    rank SMALLINT NOT NULL,
+    similar_film_id INTEGER NOT NULL,
+    similarity FLOAT NOT NULL,
+    shared_cast INTEGER NOT NULL,
+    PRIMARY KEY (film_id, rank),
+    FOREIGN KEY (film_id) REFERENCES films(film_id) ON DELETE CASCADE,
+    FOREIGN KEY (similar_film_id) REFERENCES films(film_id) ON DELETE CASCADE
+);
+
 -- Indexes for performance
 CREATE INDEX IF NOT EXISTS idx_films_imdb_id ON films(imdb_id);
 CREATE INDEX IF NOT EXISTS idx_films_title ON films(title);
 CREATE INDEX IF NOT EXISTS idx_actors_name ON actors(name);
+-- Case-insensitive actor lookups (/api/actor/<name>)
+CREATE INDEX IF NOT EXISTS idx_actors_name_lower ON actors (lower(name));
+-- Fuzzy search: trigram GIN indexes serve LIKE '%term%' and word-similarity (<%) matches
+CREATE INDEX IF NOT EXISTS idx_actors_name_trgm ON actors USING GIN (lower(name) gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_films_title_trgm ON films USING GIN (lower(title) gin_trgm_ops);
 CREATE INDEX IF NOT EXISTS idx_actor_film_actor ON actor_film(actor_id);
 CREATE INDEX IF NOT EXISTS idx_actor_film_film ON actor_film(film_id);
 CREATE INDEX IF NOT EXISTS idx_actor_ratings_average ON actor_ratings(average_rating DESC);
+-- Keyset pagination: (sort key, id) in the same order the API pages through them
+CREATE INDEX IF NOT EXISTS idx_actor_ratings_keyset ON actor_ratings ((COALESCE(average_rating, -1)) DESC, actor_id DESC);
+CREATE INDEX IF NOT EXISTS idx_films_keyset ON films ((COALESCE(rating, -1)) DESC, film_id DESC);
 CREATE INDEX IF NOT EXISTS idx_recommendations_score ON recommendations(recommendation_score DESC);
+-- ON DELETE CASCADE from films looks similar films up by the referencing side too
+CREATE INDEX IF NOT EXISTS idx_similar_films_similar ON similar_films(similar_film_id);
+
+-- Table Statistics - row counts, rating sums and last-update times kept current
+-- by statement-level triggers, so counts are a single primary-key lookup
+-- instead of sequential scans
+CREATE TABLE table_stats (
+    table_name VARCHAR(50) PRIMARY KEY,
+    row_count BIGINT NOT NULL DEFAULT 0,
+    rating_sum DOUBLE PRECISION NOT NULL DEFAULT 0,
+    rating_count BIGINT NOT NULL DEFAULT 0,
+    last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+INSERT INTO table_stats (table_name) VALUES ('films'), ('actors'), ('actor_film'), ('actor_ratings');
+
+CREATE OR REPLACE FUNCTION bump_table_stats(tbl TEXT, d_rows BIGINT, d_sum DOUBLE PRECISION, d_rated BIGINT)
+RETURNS VOID AS $$
+    UPDATE table_stats
+    SET row_count = row_count + d_rows,
+        rating_sum = rating_sum + d_sum,
+        rating_count = rating_count + d_rated,
+        last_updated = CURRENT_TIMESTAMP
+    WHERE table_name = tbl;
+$$ LANGUAGE sql;
+
+-- Row counts only (actors, actor_film)
+CREATE OR REPLACE FUNCTION count_stats_trigger() RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        PERFORM bump_table_stats(TG_TABLE_NAME, COUNT(*), 0, 0) FROM new_rows;
+    ELSIF TG_OP = 'DELETE' THEN
+        PERFORM bump_table_stats(TG_TABLE_NAME, -COUNT(*), 0, 0) FROM old_rows;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Row counts plus the sum of films.rating
+CREATE OR REPLACE FUNCTION films_stats_trigger() RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        PERFORM bump_table_stats(TG_TABLE_NAME, COUNT(*), COALESCE(SUM(rating), 0), COUNT(rating)) FROM new_rows;
+    ELSIF TG_OP = 'DELETE' THEN
+        PERFORM bump_table_stats(TG_TABLE_NAME, -COUNT(*), -COALESCE(SUM(rating), 0), -COUNT(rating)) FROM old_rows;
+    ELSIF TG_OP = 'UPDATE' THEN
+        PERFORM bump_table_stats(
+            TG_TABLE_NAME, 0,
+            COALESCE((SELECT SUM(rating) FROM new_rows), 0) - COALESCE((SELECT SUM(rating) FROM old_rows), 0),
+            (SELECT COUNT(rating) FROM new_rows) - (SELECT COUNT(rating) FROM old_rows)
+        );
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Row counts plus the sum of actor_ratings.average_rating
+CREATE OR REPLACE FUNCTION actor_ratings_stats_trigger() RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        PERFORM bump_table_stats(TG_TABLE_NAME, COUNT(*), COALESCE(SUM(average_rating), 0), COUNT(average_rating)) FROM new_rows;
+    ELSIF TG_OP = 'DELETE' THEN
+        PERFORM bump_table_stats(TG_TABLE_NAME, -COUNT(*), -COALESCE(SUM(average_rating), 0), -COUNT(average_rating)) FROM old_rows;
+    ELSIF TG_OP = 'UPDATE' THEN
+        PERFORM bump_table_stats(
+            TG_TABLE_NAME, 0,
+            COALESCE((SELECT SUM(average_rating) FROM new_rows), 0) - COALESCE((SELECT SUM(average_rating) FROM old_rows), 0),
+            (SELECT COUNT(average_rating) FROM new_rows) - (SELECT COUNT(average_rating) FROM old_rows)
+        );
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION truncate_stats_trigger() RETURNS TRIGGER AS $$
+BEGIN
+    UPDATE table_stats
+    SET row_count = 0, rating_sum = 0, rating_count = 0, last_updated = CURRENT_TIMESTAMP
+    WHERE table_name = TG_TABLE_NAME;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Transition tables allow only one event per trigger, hence one trigger per event
+CREATE TRIGGER films_stats_insert AFTER INSERT ON films
+    REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION films_stats_trigger();
+CREATE TRIGGER films_stats_update AFTER UPDATE ON films
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION films_stats_trigger();
+CREATE TRIGGER films_stats_delete AFTER DELETE ON films
+    REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE FUNCTION films_stats_trigger();
+CREATE TRIGGER films_stats_truncate AFTER TRUNCATE ON films
+    FOR EACH STATEMENT EXECUTE FUNCTION truncate_stats_trigger();
+
+CREATE TRIGGER actors_stats_insert AFTER INSERT ON actors
+    REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION count_stats_trigger();
+CREATE TRIGGER actors_stats_delete AFTER DELETE ON actors
+    REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE FUNCTION count_stats_trigger();
+CREATE TRIGGER actors_stats_truncate AFTER TRUNCATE ON actors
+    FOR EACH STATEMENT EXECUTE FUNCTION truncate_stats_trigger();
+
+CREATE TRIGGER actor_film_stats_insert AFTER INSERT ON actor_film
+    REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION count_stats_trigger();
+CREATE TRIGGER actor_film_stats_delete AFTER DELETE ON actor_film
+    REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE FUNCTION count_stats_trigger();
+CREATE TRIGGER actor_film_stats_truncate AFTER TRUNCATE ON actor_film
+    FOR EACH STATEMENT EXECUTE FUNCTION truncate_stats_trigger();
+
+CREATE TRIGGER actor_ratings_stats_insert AFTER INSERT ON actor_ratings
+    REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION actor_ratings_stats_trigger();
+CREATE TRIGGER actor_ratings_stats_update AFTER UPDATE ON actor_ratings
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION actor_ratings_stats_trigger();
+CREATE TRIGGER actor_ratings_stats_delete AFTER DELETE ON actor_ratings
+    REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE FUNCTION actor_ratings_stats_trigger();
+CREATE TRIGGER actor_ratings_stats_truncate AFTER TRUNCATE ON actor_ratings
+    FOR EACH STATEMENT EXECUTE FUNCTION truncate_stats_trigger();
+
+-- Dataset Version - bumped by the ratings step whenever published data changes.
+-- Web workers cache responses per version and learn about new versions via
+-- LISTEN dataset_version. Versions are seeded from the clock so they keep
+-- increasing across schema resets and old cache entries never match again.
+CREATE TABLE dataset_version (
+    id BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (id),
+    version BIGINT NOT NULL,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+INSERT INTO dataset_version (version) VALUES ((EXTRACT(EPOCH FROM clock_timestamp()) * 1000)::BIGINT);
+
+CREATE OR REPLACE FUNCTION bump_dataset_version() RETURNS BIGINT AS $$
+DECLARE
+    new_version BIGINT;
+BEGIN
+    UPDATE dataset_version
+    SET version = GREATEST(version + 1, (EXTRACT(EPOCH FROM clock_timestamp()) * 1000)::BIGINT),
+        updated_at = CURRENT_TIMESTAMP
+    RETURNING version INTO new_version;
+    -- Delivered to listeners when the calling transaction commits
+    PERFORM pg_notify('dataset_version', new_version::TEXT);
+    RETURN new_version;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Leaderboard snapshots: one immutable gzip-compressed JSON document per dataset
+-- version (top actors, stats and actor cards), written by calculate_actor_ratings
+-- in the transaction that bumps the version
+CREATE TABLE leaderboard_snapshots (
+    version BIGINT PRIMARY KEY,
+    payload BYTEA NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- The schema was just (re)created: tell running web workers
+SELECT pg_notify('dataset_version', version::TEXT) FROM dataset_version;